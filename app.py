@@ -1,32 +1,129 @@
-from flask import Flask, jsonify, request, render_template, send_file, send_from_directory
-from services.video_generator import VideoGenerator
+from flask import Flask, Response, jsonify, request, render_template
+from werkzeug.exceptions import RequestedRangeNotSatisfiable
+from services.hls import MASTER_PLAYLIST
+from services.jobs import JobQueue, JobQueueError, JobQueueFullError
+from services.progress import emit
+from services.result_cache import ResultCache
+from services.retention import RetentionManager
+from services.video_index import VideoIndex, VideoIndexError
+from services.thumbnails import thumbnail_paths
+from services.video_generator import VideoGenerator, VideoGeneratorError
+from services.video_serving import send_video
+from services.workers import RenderWorkerPool, fork_available
+from services.downloader import RangedDownloader
 from coverr.analyzer import CoverrAnalyzer
 from pexels.analyzer import PexelsAnalyzer
 from pixabay.analyzer import PixabayAnalyzer
 from api.quotes import QuoteAPI
+import atexit
+import json
 import logging
 import os
+from datetime import datetime
+from pathlib import Path
 from api.tts_client import TTSClient
+from config import Config
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
+# Let a front proxy (nginx X-Accel/Apache mod_xsendfile) send video bodies
+app.config["USE_X_SENDFILE"] = Config.USE_X_SENDFILE
+
+# Renders run in pre-forked worker processes (render_workers, created last) unless disabled or unsupported
+RENDER_PROCESSES = Config.RENDER_PROCESSES and fork_available()
 
 # Initialize services
-generator = VideoGenerator()
+generator = VideoGenerator(
+    cache_dir=Config.CACHE_DIR,
+    clip_cache_max_mb=Config.CLIP_CACHE_MAX_MB,
+    background_cache_max_mb=Config.BACKGROUND_CACHE_MAX_MB,
+    render_engine=Config.RENDER_ENGINE,
+    downloader=RangedDownloader(
+        segments=Config.DOWNLOAD_SEGMENTS,
+        chunk_size=Config.DOWNLOAD_CHUNK_KB * 1024,
+        connect_timeout=Config.DOWNLOAD_CONNECT_TIMEOUT,
+        read_timeout=Config.DOWNLOAD_READ_TIMEOUT
+    ),
+    partial_fetch=Config.PARTIAL_FETCH,
+    # With worker processes the server schedules background finals itself (_run_render), so that
+    # approvals and discards coordinate with them
+    auto_finalize_drafts=Config.AUTO_FINALIZE_DRAFTS and not RENDER_PROCESSES,
+    memory_budget_mb=Config.MEMORY_BUDGET_MB,
+    render_segments=Config.RENDER_SEGMENTS,
+    hls_ladder=Config.HLS_LADDER
+)
 coverr_analyzer = CoverrAnalyzer()
 pexels_analyzer = PexelsAnalyzer()
 pixabay_analyzer = PixabayAnalyzer()
 quotes_api = QuoteAPI()
+# Renders run here so requests return immediately with a job id
+jobs = JobQueue(max_workers=Config.JOB_WORKERS, ttl=Config.JOB_TTL_SECONDS, max_queue=Config.JOB_QUEUE_SIZE)
+# Finished renders by request, so repeats are answered with the existing video
+result_cache = ResultCache(Path(Config.CACHE_DIR) / "results", ttl=Config.RESULT_CACHE_TTL_SECONDS)
 
 # Define the output directory path
 OUTPUT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'output')
 
+HLS_DIR = os.path.join(OUTPUT_DIR, 'hls')
+
+# Seconds between keep-alive comments on an idle job event stream
+JOB_HEARTBEAT_SECONDS = 15
+
 # Ensure the output directory exists
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
+# Rendered videos and their render metadata, for paginated listings
+video_index = VideoIndex(Path(Config.CACHE_DIR) / "videos.db", OUTPUT_DIR)
+
+def _files_in_use():
+    """
+    Files that queued or running jobs use: the preview and voiceover of drafts
+    being approved, and the inputs and outputs leased by renders running in
+    any process.
+    """
+    files = list(generator.leases.paths())
+    for job in jobs.unfinished():
+        draft = generator.drafts.get(job["key"].removeprefix("approve:")) if job["kind"] == "approve" else None
+        if draft:
+            files.append(Path(OUTPUT_DIR) / Path(draft["preview_path"]).name)
+            if draft.get("audio_path"):
+                files.append(Path(draft["audio_path"]))
+    return files
+
+DAY = 86400
+# Age and size budgets for outputs, drafts, caches and temp files
+retention = RetentionManager(
+    output_dir=Path(OUTPUT_DIR),
+    temp_dir=generator.temp_dir,
+    drafts=generator.drafts,
+    hls_dir=Path(HLS_DIR),
+    cache_dirs=[generator.overlay_cache.cache_dir, generator.clip_cache.tmp_dir],
+    result_cache=result_cache,
+    video_index=video_index,
+    max_output_bytes=Config.OUTPUT_MAX_MB * 1024 * 1024,
+    max_output_age=Config.OUTPUT_MAX_AGE_DAYS * DAY,
+    max_temp_age=Config.TEMP_MAX_AGE_SECONDS,
+    max_draft_age=Config.DRAFT_MAX_AGE_DAYS * DAY,
+    max_cache_age=Config.CACHE_MAX_AGE_DAYS * DAY,
+    in_use=_files_in_use
+)
+
+def _hls_url(video_path):
+    """Return the master playlist URL of a rendered video, or None if it has no HLS ladder."""
+    if generator.hls is None or not generator.hls.lookup(Path(video_path)):
+        return None
+    return f"/hls/{Path(video_path).stem}/{MASTER_PLAYLIST}"
+
+def _media_urls(video_path):
+    """Return the HLS playlist and poster/sprite URLs of a rendered video (None where missing)."""
+    urls = {"hls_url": _hls_url(video_path)}
+    for name, path in thumbnail_paths(Path(video_path)).items():
+        urls[f"{name}_url"] = f"/api/videos/{path.name}" if path.exists() else None
+    return urls
+
 @app.route('/')
 def index():
     return render_template('index.html')
@@ -47,7 +144,14 @@ def download_file(filename):
             logger.error(f"File not found: {filename}")
             return jsonify({"error": "File not found"}), 404
             
-        return send_file(filename, as_attachment=True)
+        return send_video(
+            os.path.dirname(filename),
+            os.path.basename(filename),
+            as_attachment=True,
+            max_age=Config.VIDEO_CACHE_MAX_AGE
+        )
+    except RequestedRangeNotSatisfiable:
+        raise
     except Exception as e:
         logger.error(f"Error downloading file: {e}")
         return jsonify({"error": "File not found"}), 404
@@ -56,7 +160,9 @@ def download_file(filename):
 def serve_video(filename):
     """Serve the video file for preview"""
     try:
-        return send_from_directory(OUTPUT_DIR, filename, mimetype='video/mp4')
+        return send_video(OUTPUT_DIR, filename, max_age=Config.VIDEO_CACHE_MAX_AGE)
+    except RequestedRangeNotSatisfiable:
+        raise
     except Exception as e:
         logger.error(f"Error serving video file: {e}")
         return jsonify({"success": False, "error": "Video file not found"}), 404
@@ -79,126 +185,412 @@ def get_random_quote():
         logger.error(f"Error fetching quote: {e}")
         return jsonify({"error": str(e), "success": False}), 500
 
-@app.route('/generate-video', methods=['POST'])
-def generate_video():
-    """
-    Generate a video with a random quote and matching background
-    Expects: {
-        "quote": "quote text", 
-        "author": "author name"
+def _get_analyzer(name):
+    """Return the stock-footage analyzer registered under name, or None if unknown."""
+    return {
+        "coverr": coverr_analyzer,
+        "pexels": pexels_analyzer,
+        "pixabay": pixabay_analyzer
+    }.get(name)
+
+def _generate_formats_result(quote, author, video_url, formats, tts_voice):
+    """Render every requested aspect ratio and return their filenames keyed by format."""
+    output_paths = generator.generate_video_formats(quote, author, video_url, formats=tuple(formats), tts_voice=tts_voice)
+    if not output_paths:
+        raise VideoGeneratorError("Failed to generate video")
+
+    video_paths = {name: os.path.basename(path) for name, path in output_paths.items()}
+    return {
+        "success": True,
+        "video_path": video_paths[formats[0]],
+        "video_paths": video_paths,
+        "hls_urls": {name: _hls_url(path) for name, path in output_paths.items()},
+        "quote": quote,
+        "author": author,
+        "render_stats": generator.last_render_stats
+    }
+
+def _generate_preview_result(quote, author, video_url, tts_voice, render_engine):
+    """Render a draft preview and return its filename and draft id."""
+    draft = generator.generate_preview(quote, author, video_url, tts_voice=tts_voice, render_engine=render_engine)
+    if not draft:
+        raise VideoGeneratorError("Failed to generate preview")
+
+    return {
+        "success": True,
+        "video_path": os.path.basename(draft["preview_path"]),
+        "draft_id": draft["id"],
+        "quote": quote,
+        "author": author
     }
+
+def _render_job(quote, author, analyzer_name, tts_voice, formats=None, draft=False, render_engine=None):
     """
-    try:
-        data = request.get_json()
-        if not data or "quote" not in data or "author" not in data:
-            return jsonify({"error": "Missing quote or author", "success": False}), 400
-            
-        quote = data["quote"]
-        author = data["author"]
-        analyzer_request = data["analyzer"]
-        if analyzer_request == "coverr":
-            analyzer = coverr_analyzer
-        elif analyzer_request == "pexels":
-            analyzer = pexels_analyzer
-        elif analyzer_request == "pixabay":
-            analyzer = pixabay_analyzer
-        else:
-            return jsonify({"error": "Invalid analyzer specified", "success": False}), 400
-        
-        tts_voice = data.get("voice", "en-US-Wavenet-D")
+    Find a background for the quote and render it; runs on a job worker.
 
-        # Get matching video URL
-        video_urls = analyzer.get_video_url(quote)
-        if not video_urls or not video_urls.get("high_quality"):
-            return jsonify({"error": "Failed to find matching video", "success": False}), 500
+    Returns the response body the synchronous endpoints used to send.
 
-        # Generate video
-        output_path = generator.generate_video(quote, author, video_urls["high_quality"], tts_voice=tts_voice)
-        
+    Raises:
+        VideoGeneratorError: If no background is found or the render fails
+    """
+    analyzer = _get_analyzer(analyzer_name)
+    emit("Finding background video", 0, 1)
+    # Get matching video URL, preferring the smallest rendition that covers the output
+    video_urls = analyzer.get_video_url(quote, target_size=generator.target_size)
+    video_url = generator.choose_video_url(video_urls)
+    if not video_url:
+        raise VideoGeneratorError("Failed to find matching video")
+    emit("Finding background video", 1, 1)
+
+    # Several aspect ratios from a single decode of the source
+    if formats:
+        result = _generate_formats_result(quote, author, video_url, formats, tts_voice)
+
+    # Fast low-resolution preview; the full render waits for approval
+    elif draft:
+        result = _generate_preview_result(quote, author, video_url, tts_voice, render_engine)
+
+    else:
+        output_path = generator.generate_video(
+            quote,
+            author,
+            video_url,
+            tts_voice=tts_voice,
+            render_engine=render_engine
+        )
         if not output_path:
-            return jsonify({"success": False, "error": "Failed to generate video"}), 500
+            raise VideoGeneratorError("Failed to generate video")
 
-        # Extract just the filename for client use
-        video_filename = os.path.basename(output_path)
-        
-        return jsonify({
+        result = {
             "success": True,
-            "video_path": video_filename,
+            "video_path": os.path.basename(output_path),
+            **_media_urls(output_path),
             "quote": quote,
-            "author": author
-        }), 200
+            "author": author,
+            "render_stats": generator.last_render_stats
+        }
+
+    _index_result(
+        result,
+        quote=quote,
+        author=author,
+        provider=analyzer_name,
+        voice=tts_voice,
+        render_engine=render_engine or generator.render_engine
+    )
+    return result
+
+def _approve_job(draft_id):
+    """
+    Render (or fetch the background render of) a draft's full-resolution video.
+
+    Runs on a job thread of the server, where drafts are scheduled; the render
+    itself goes through generator.final_renderer (a render worker).
+    """
+    output_path = generator.approve_draft(draft_id)
+    if not output_path:
+        raise VideoGeneratorError("Failed to generate video")
+
+    draft = generator.drafts.get(draft_id)
+    result = {
+        "success": True,
+        "video_path": os.path.basename(output_path),
+        **_media_urls(output_path),
+        "draft_id": draft_id,
+        "render_stats": draft.get("render_stats")
+    }
+    # The provider was only known when the preview was rendered
+    preview = video_index.get(os.path.basename(draft["preview_path"])) or {}
+    _index_result(
+        result,
+        quote=draft["quote"],
+        author=draft["author"],
+        provider=preview.get("provider"),
+        voice=draft.get("tts_voice"),
+        render_engine=draft.get("render_engine") or generator.render_engine
+    )
+    return result
+
+def _index_result(result, **metadata):
+    """Record the videos of a finished render, with its inputs, in the video index."""
+    try:
+        if result.get("video_paths"):
+            for name, filename in result["video_paths"].items():
+                video_index.record(Path(OUTPUT_DIR) / filename, format=name, **metadata)
+        else:
+            extra = {key: result[key] for key in ("draft_id", "render_stats") if result.get(key)}
+            video_index.record(Path(OUTPUT_DIR) / result["video_path"], **metadata, **extra)
+    except Exception as e:
+        # The periodic reconcile still picks the files up, without metadata
+        logger.warning(f"Failed to index {result.get('video_path')}: {e}")
+
+def _result_files(result):
+    """Output files a render result refers to."""
+    names = {result["video_path"], *result.get("video_paths", {}).values()}
+    return [Path(OUTPUT_DIR) / name for name in names]
+
+def _cached(cache_key, fn, *args, **kwargs):
+    """Run a render job function and record its result under cache_key."""
+    result = fn(*args, **kwargs)
+    if result_cache.ttl > 0:
+        result_cache.put(cache_key, result, _result_files(result))
+    return result
+
+def _run_in_worker(fn, *args, **kwargs):
+    """Run a job function in a render worker process, or on the job thread when processes are off."""
+    if render_workers is None:
+        return fn(*args, **kwargs)
+    return render_workers.run(fn, *args, **kwargs)
+
+def _run_render(fn, *args, **kwargs):
+    """Run a render job function in a worker, then schedule the background final of a new draft here."""
+    result = _run_in_worker(fn, *args, **kwargs)
+    if render_workers is not None and Config.AUTO_FINALIZE_DRAFTS and result.get("draft_id"):
+        generator.schedule_draft(result["draft_id"])
+    return result
+
+def _final_job(draft_id, background):
+    """Render a draft's final video; runs in a render worker."""
+    return generator.render_draft(draft_id, background)
+
+def _render_final(draft_id, background=False):
+    """generator.final_renderer with worker processes: drafts are scheduled here, rendered in a worker."""
+    return render_workers.run(_final_job, draft_id, background)
+
+def _worker_exited(pid):
+    """Return the render memory a dead worker process still had reserved."""
+    if generator.memory_budget is not None:
+        generator.memory_budget.release_process(pid)
 
+def _submit_job(kind, fn, *args, key=None, **kwargs):
+    """
+    Queue fn as a job and return the 202 response for it, or 429 with
+    Retry-After when the queue is full. Requests with the same key share
+    an unfinished job.
+    """
+    try:
+        job = jobs.submit(kind, fn, *args, key=key, **kwargs)
+    except JobQueueFullError as e:
+        logger.warning(f"Rejected {kind} job: {e}")
+        response = jsonify({"error": str(e), "success": False, "retry_after": e.retry_after})
+        response.status_code = 429
+        response.headers["Retry-After"] = str(e.retry_after)
+        return response
+
+    status_url = f"/jobs/{job['id']}"
+    response = jsonify({
+        "success": True,
+        "job_id": job["id"],
+        "status": job["status"],
+        "coalesced": job["requests"] > 1,
+        "status_url": status_url,
+        "events_url": f"{status_url}/events"
+    })
+    response.status_code = 202
+    response.headers["Location"] = status_url
+    return response
+
+def _submit_render(data):
+    """Validate a generate request and queue its render job."""
+    if not data or "quote" not in data or "author" not in data:
+        return jsonify({"error": "Missing quote or author", "success": False}), 400
+
+    if _get_analyzer(data.get("analyzer")) is None:
+        return jsonify({"error": "Invalid analyzer specified", "success": False}), 400
+
+    formats = data.get("formats")
+    unknown = [name for name in formats or () if name not in generator.OUTPUT_FORMATS]
+    if unknown:
+        return jsonify({"error": f"Unknown formats: {', '.join(unknown)}", "success": False}), 400
+
+    inputs = {
+        "quote": data["quote"],
+        "author": data["author"],
+        "analyzer": data["analyzer"],
+        "voice": data.get("voice", "en-US-Wavenet-D"),
+        "formats": formats or None,
+        "draft": bool(data.get("draft")),
+    }
+    args = (_render_job, inputs["quote"], inputs["author"], inputs["analyzer"], inputs["voice"])
+    kwargs = {"formats": formats, "draft": inputs["draft"], "render_engine": data.get("render_engine")}
+    if inputs["draft"]:
+        # Every draft gets its own draft_id to approve or discard, so drafts are
+        # neither shared between requests nor answered from the result cache
+        return _submit_job("render", _run_render, *args, **kwargs)
+
+    cache_key = ResultCache.key(**inputs, settings=generator.render_settings(data.get("render_engine")))
+    if result_cache.ttl > 0:
+        result = result_cache.get(cache_key)
+        if result is not None:
+            logger.info(f"Serving cached render {cache_key[:12]}")
+            if "hls_url" in result:
+                result.update(_media_urls(Path(OUTPUT_DIR) / result["video_path"]))
+            return jsonify({**result, "cached": True}), 200
+
+    return _submit_job("render", _run_render, _cached, cache_key, *args, key=cache_key, **kwargs)
+
+@app.route('/generate-video', methods=['POST'])
+def generate_video():
+    """
+    Queue a video render for a quote with a matching background
+    Expects: {
+        "quote": "quote text", 
+        "author": "author name",
+        "analyzer": "coverr" | "pexels" | "pixabay",
+        "formats": ["9:16", "1:1", "16:9"]  (optional),
+        "draft": true  (optional, fast preview; approve via /drafts/<id>/approve)
+    }
+    Returns 202 with the job id; follow /jobs/<id> or /jobs/<id>/events for the result
+    (429 with Retry-After when the job queue is full)
+    """
+    try:
+        return _submit_render(request.get_json())
     except Exception as e:
-        logger.error(f"Error generating video: {e}")
+        logger.error(f"Error queueing video: {e}")
         return jsonify({"error": str(e), "success": False}), 500
 
 @app.route('/generate-video-custom', methods=['POST'])
 def generate_video_custom():
     """
-    Generate a video with a custom quote
+    Queue a video render for a custom quote
     Expects JSON body with: {
         "quote": "your quote",
-        "author": "quote author"
+        "author": "quote author",
+        "analyzer": "coverr" | "pexels" | "pixabay",
+        "formats": ["9:16", "1:1", "16:9"]  (optional),
+        "draft": true  (optional, fast preview; approve via /drafts/<id>/approve)
     }
+    Returns 202 with the job id; follow /jobs/<id> or /jobs/<id>/events for the result
+    (429 with Retry-After when the job queue is full)
     """
     try:
-        data = request.get_json()
-        if not data or "quote" not in data or "author" not in data:
-            return jsonify({"error": "Missing quote or author", "success": False}), 400
-
-        analyzer = data.get("analyzer")
-        if analyzer == "coverr":
-            analyzer = coverr_analyzer
-        elif analyzer == "pexels":
-            analyzer = pexels_analyzer
-        elif analyzer == "pixabay":
-            analyzer = pixabay_analyzer
-
-        # Get matching video URL
-        video_urls = analyzer.get_video_url(data["quote"])
-        if not video_urls or not video_urls.get("high_quality"):
-            return jsonify({"error": "Failed to find matching video", "success": False}), 500
-
-        # Generate video
-        output_path = generator.generate_video(
-            quote=data["quote"],
-            author=data["author"],
-            video_url=video_urls["high_quality"],
-            tts_voice=data.get("voice", "en-US-Wavenet-D")
-        )
+        return _submit_render(request.get_json())
+    except Exception as e:
+        logger.error(f"Error queueing custom video: {e}")
+        return jsonify({"error": str(e), "success": False}), 500
 
-        if not output_path:
-            return jsonify({"error": "Failed to generate video", "success": False}), 500
+@app.route('/drafts/<draft_id>/approve', methods=['POST'])
+def approve_draft(draft_id):
+    """Queue the full-resolution render (or fetch the background render) of a draft preview"""
+    try:
+        if not generator.drafts.get(draft_id):
+            return jsonify({"error": "Draft not found", "success": False}), 404
 
-        # Return just the filename, not the full path
-        video_filename = os.path.basename(output_path)
-        
-        return jsonify({
-            "success": True,
-            "video_path": video_filename,
-            "quote": data["quote"],
-            "author": data["author"]
-        }), 200
+        return _submit_job("approve", _approve_job, draft_id, key=f"approve:{draft_id}")
+    except Exception as e:
+        logger.error(f"Error approving draft: {e}")
+        return jsonify({"error": str(e), "success": False}), 500
+
+@app.route('/jobs', methods=['GET'])
+def job_stats():
+    """Job counts, queue depth and recent/estimated wait times"""
+    return jsonify({
+        "success": True,
+        "render_processes": render_workers is not None,
+        **jobs.stats(),
+        "result_cache": result_cache.stats()
+    }), 200
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Status, latest stage progress and (once done) result or error of a job"""
+    job = jobs.get(job_id)
+    if not job:
+        return jsonify({"error": "Job not found", "success": False}), 404
+    return jsonify({"success": True, **job}), 200
+
+@app.route('/jobs/<job_id>/events', methods=['GET'])
+def stream_job_events(job_id):
+    """
+    Server-Sent Events stream of a job's status changes and stage progress.
+
+    Each event carries its sequence number as the SSE id, so a reconnecting
+    EventSource resumes after Last-Event-ID. The stream ends after the final
+    status event (done or failed).
+    """
+    if not jobs.get(job_id):
+        return jsonify({"error": "Job not found", "success": False}), 404
+
+    after = request.headers.get("Last-Event-ID") or request.args.get("after") or 0
+    try:
+        after = int(after)
+    except ValueError:
+        after = 0
+
+    def events():
+        last_seq = after
+        while True:
+            try:
+                batch = jobs.wait_events(job_id, after=last_seq, timeout=JOB_HEARTBEAT_SECONDS)
+            except JobQueueError:
+                return
+            if not batch:
+                # Comment line keeps proxies from closing an idle connection
+                yield ": keep-alive\n\n"
+                continue
+            for event in batch:
+                last_seq = event["seq"]
+                yield f"id: {event['seq']}\nevent: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
+                if event["event"] == "status" and event["data"]["status"] in ("done", "failed"):
+                    return
+
+    return Response(
+        events(),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
+@app.route('/drafts/<draft_id>', methods=['DELETE'])
+def discard_draft(draft_id):
+    """Discard a draft preview without rendering it at full resolution"""
+    try:
+        draft = generator.drafts.get(draft_id)
+        if draft is None or not generator.discard_draft(draft_id):
+            return jsonify({"error": "Draft not found", "success": False}), 404
+        video_index.remove(os.path.basename(draft["preview_path"]))
+        return jsonify({"success": True, "draft_id": draft_id}), 200
     except Exception as e:
-        logger.error(f"Error generating custom video: {e}")
+        logger.error(f"Error discarding draft: {e}")
         return jsonify({"error": str(e), "success": False}), 500
 
+def _parse_time(value):
+    """Parse a timestamp query parameter given as epoch seconds or an ISO 8601 date/time."""
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
 # Route to list available videos
 @app.route('/api/videos', methods=['GET'])
 def list_videos():
+    """
+    List rendered videos, newest first, one page at a time
+    Query: limit, cursor (next_cursor of the previous page),
+    sort (created|size|author|filename), order (asc|desc),
+    since/until (epoch seconds or ISO date), author, provider, voice
+    """
     try:
-        videos = []
-        for file in os.listdir(OUTPUT_DIR):
-            if file.endswith('.mp4'):
-                file_path = os.path.join(OUTPUT_DIR, file)
-                file_size = os.path.getsize(file_path)
-                videos.append({
-                    'filename': file,
-                    'size': file_size,
-                    'created': os.path.getctime(file_path)
-                })
-        return jsonify({"success": True, "videos": videos})
+        args = request.args
+        try:
+            videos, next_cursor = video_index.query(
+                sort=args.get("sort", "created"),
+                order=args.get("order", "desc"),
+                limit=int(args.get("limit", 50)),
+                cursor=args.get("cursor"),
+                since=_parse_time(args.get("since")),
+                until=_parse_time(args.get("until")),
+                author=args.get("author"),
+                provider=args.get("provider"),
+                voice=args.get("voice")
+            )
+        except (VideoIndexError, ValueError) as e:
+            return jsonify({"success": False, "error": str(e)}), 400
+
+        for video in videos:
+            video.update(_media_urls(os.path.join(OUTPUT_DIR, video["filename"])))
+        return jsonify({"success": True, "videos": videos, "next_cursor": next_cursor})
     except Exception as e:
         logger.error(f"Error listing videos: {e}")
         return jsonify({"success": False, "error": str(e)}), 500
@@ -214,12 +606,9 @@ def api_download_video(filename):
             return jsonify({"error": "File not found"}), 404
             
         # Send the file as an attachment (triggers download)
-        return send_from_directory(
-            OUTPUT_DIR, 
-            filename, 
-            as_attachment=True,
-            download_name=filename  # For Flask >= 2.0
-        )
+        return send_video(OUTPUT_DIR, filename, as_attachment=True, max_age=Config.VIDEO_CACHE_MAX_AGE)
+    except RequestedRangeNotSatisfiable:
+        raise
     except Exception as e:
         app.logger.error(f"Error downloading file: {e}")
         return jsonify({"error": "Unable to download file"}), 500
@@ -227,12 +616,31 @@ def api_download_video(filename):
 @app.route('/api/videos/<filename>')
 def api_serve_video(filename):
     try:
-        return send_from_directory(OUTPUT_DIR, filename, mimetype='video/mp4')
+        return send_video(OUTPUT_DIR, filename, max_age=Config.VIDEO_CACHE_MAX_AGE)
+    except RequestedRangeNotSatisfiable:
+        raise
     except Exception as e:
         app.logger.error(f"Error serving video: {e}")
         return jsonify({"error": "Video not found"}), 404
 
 
+@app.route('/hls/<path:filename>')
+def serve_hls(filename):
+    """Serve HLS master/media playlists and segments for streamed previews"""
+    try:
+        return send_video(HLS_DIR, filename, max_age=Config.VIDEO_CACHE_MAX_AGE)
+    except RequestedRangeNotSatisfiable:
+        raise
+    except Exception as e:
+        logger.error(f"Error serving HLS file: {e}")
+        return jsonify({"error": "HLS file not found"}), 404
+
+
+@app.route('/api/storage', methods=['GET'])
+def storage_stats():
+    """Budgets and bytes reclaimed by the last and all retention sweeps"""
+    return jsonify({"success": True, **retention.stats()}), 200
+
 @app.route('/list/voices', methods=['GET'])
 def list_voices():
     """List available voices"""
@@ -251,6 +659,17 @@ def list_voices():
 
 
 
+# Forked last, once every job function above exists, and before the server starts threads
+render_workers = (
+    RenderWorkerPool(Config.JOB_WORKERS, warm_up=generator.warm_up, on_worker_exit=_worker_exited)
+    if RENDER_PROCESSES else None
+)
+if render_workers is not None:
+    generator.final_renderer = _render_final
+# Started after the fork so workers do not inherit the threads
+video_index.start_reconciler(Config.VIDEO_INDEX_SCAN_SECONDS)
+retention.start(Config.RETENTION_INTERVAL_SECONDS)
+atexit.register(generator.shutdown)
 
 if __name__ == "__main__":
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
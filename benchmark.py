@@ -0,0 +1,261 @@
+"""
+Render benchmarks for VideoGenerator.
+
+Uses a synthetic background and voiceover generated with ffmpeg, so no API
+keys or network access are needed.
+
+    python benchmark.py engines --runs 3
+    python benchmark.py probe --runs 10
+    python benchmark.py batch --count 10
+    python benchmark.py loop --runs 3
+    python benchmark.py segments --engine moviepy --max-segments 8
+    python benchmark.py frames --frames 150
+"""
+import argparse
+import os
+import shutil
+import statistics
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from moviepy import VideoFileClip
+
+from services.ffmpeg_utils import run_ffmpeg
+from services.probe import probe_video
+from services.video_generator import VideoGenerator
+
+QUOTE = "The only way to do great work is to love what you do."
+AUTHOR = "Steve Jobs"
+
+
+def make_source(work_dir: Path, duration: float = 20, size: str = "1920x1080") -> Path:
+    """Write a synthetic 16:9 source clip."""
+    path = work_dir / f"source_{size}_{duration:g}s.mp4"
+    if not path.exists():
+        run_ffmpeg([
+            "-f", "lavfi", "-i", f"testsrc2=size={size}:rate=30",
+            "-t", str(duration), "-c:v", "libx264", "-preset", "ultrafast", str(path)
+        ])
+    return path
+
+
+def make_audio(work_dir: Path, duration: float = 12) -> Path:
+    """Write a synthetic voiceover track."""
+    path = work_dir / "voice.mp3"
+    if not path.exists():
+        run_ffmpeg(["-f", "lavfi", "-i", f"sine=frequency=440:duration={duration}", str(path)])
+    return path
+
+
+def timed(fn, runs: int) -> list:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def report(name: str, timings: list):
+    print(f"{name:<28} mean {statistics.mean(timings):7.2f}s  min {min(timings):7.2f}s  runs {len(timings)}")
+
+
+def bench_engines(args, work_dir: Path):
+    """Compare the render engines on the same inputs."""
+    generator = VideoGenerator(cache_dir=work_dir / "cache")
+    generator.output_dir = work_dir
+    source = make_source(work_dir)
+    source_info = probe_video(source)
+    audio = make_audio(work_dir)
+
+    for engine in VideoGenerator.RENDER_ENGINES:
+        render = getattr(generator, f"_render_with_{engine}")
+        output = work_dir / f"{engine}.mp4"
+        report(engine, timed(lambda: render(QUOTE, AUTHOR, source, source_info, audio, output), args.runs))
+
+
+def bench_probe(args, work_dir: Path):
+    """Compare the former VideoFileClip preview open with the header-only probe."""
+    source = make_source(work_dir, size="3840x2160")
+
+    def preview_open():
+        VideoFileClip(str(source), target_resolution=(540, 960), fps_source="fps").close()
+
+    report("VideoFileClip preview open", timed(preview_open, args.runs))
+    report("probe_video", timed(lambda: probe_video(source), args.runs))
+
+
+def bench_batch(args, work_dir: Path):
+    """Compare N sequential generate_video calls with one generate_videos batch over the same clip."""
+    generator = VideoGenerator(cache_dir=work_dir / "cache", render_engine=args.engine)
+    generator.output_dir = work_dir
+    url = "https://benchmark.invalid/source.mp4"
+    # Seed the clip cache so neither path touches the network
+    generator.clip_cache.put(url, shutil.copy(make_source(work_dir), generator.clip_cache.new_temp_path()))
+
+    items = [(f"{QUOTE} ({i + 1})", AUTHOR, None) for i in range(args.count)]
+
+    def sequential():
+        for quote, author, voice in items:
+            generator.generate_video(quote, author, url, tts_voice=voice)
+
+    def batch():
+        generator.generate_videos(items, url, max_workers=args.workers, outputs_per_process=args.per_process)
+
+    for name, fn in ((f"{args.count} x generate_video ({args.engine})", sequential), ("generate_videos", batch)):
+        timings = timed(fn, args.runs)
+        report(name, timings)
+        print(f"{'':<28} {args.count / statistics.mean(timings):7.2f} videos/s")
+
+
+def bench_loop(args, work_dir: Path):
+    """Compare concatenate_videoclips looping with time remapping over a bounded frame ring."""
+    from moviepy import concatenate_videoclips
+
+    from services.frame_loop import LoopedClip
+
+    generator = VideoGenerator(cache_dir=work_dir / "cache")
+    source = make_source(work_dir, duration=args.source_seconds)
+    duration = generator.target_duration
+    fps = generator.target_fps
+
+    def open_source():
+        clip = VideoFileClip(str(source), target_resolution=generator.target_size, audio=False)
+        return generator._resize_video(clip, generator.target_size)
+
+    def read_frames(clip):
+        for i in range(int(duration * fps)):
+            clip.get_frame(i / fps)
+
+    def concatenated():
+        video = open_source()
+        looped = concatenate_videoclips([video] * (int(duration / video.duration) + 1)).subclipped(0, duration)
+        read_frames(looped)
+        looped.close()
+        video.close()
+
+    def remapped():
+        looped = LoopedClip(open_source(), duration, max_bytes=generator.loop_frame_cache_mb * 1024 * 1024)
+        read_frames(looped)
+        looped.close()
+
+    report("concatenate_videoclips", timed(concatenated, args.runs))
+    report("LoopedClip (time remap)", timed(remapped, args.runs))
+
+
+def bench_segments(args, work_dir: Path):
+    """Scaling of segment-parallel rendering from 1 to N segments (one process per segment)."""
+    source = make_source(work_dir)
+    source_info = probe_video(source)
+    audio = make_audio(work_dir)
+    max_segments = args.max_segments or os.cpu_count() or 1
+    print(f"{os.cpu_count()} CPUs, engine {args.engine}")
+
+    baseline = None
+    for segments in sorted({1, *range(2, max_segments + 1, 2), max_segments}):
+        generator = VideoGenerator(cache_dir=work_dir / "cache", render_engine=args.engine, render_segments=segments)
+        generator.output_dir = work_dir
+        output = work_dir / f"segments_{segments}.mp4"
+        render = lambda: generator._render_within_budget(
+            QUOTE, AUTHOR, source, source_info, audio, output, args.engine
+        )
+        # Warm the normalized background and the worker pool outside the timing
+        render()
+        timings = timed(render, args.runs)
+        generator.segmented_renderer.close()
+
+        mean = statistics.mean(timings)
+        baseline = baseline or mean
+        report(f"{segments} segment(s)", timings)
+        print(f"{'':<28} speedup {baseline / mean:5.2f}x")
+
+
+def bench_frames(args, work_dir: Path):
+    """Per-frame transient allocations of MoviePy compositing vs the preallocated frame pipeline."""
+    generator = VideoGenerator(cache_dir=work_dir / "cache")
+    source = make_source(work_dir)
+    source_info = probe_video(source)
+    background = generator.background_cache.get_or_create(
+        source, source.stem, generator.target_size, generator.target_fps, generator.target_duration,
+        source_duration=source_info["duration"]
+    )
+    overlay = generator._get_overlay(QUOTE, AUTHOR)
+    fps = generator.target_fps
+    frame_bytes = generator.target_size[0] * generator.target_size[1] * 3
+    frames = min(args.frames, int(generator.target_duration * fps))
+
+    # What write_videofile does per frame: decode, blend a copy, serialize for the encoder pipe
+    clip = VideoFileClip(str(background), audio=False).image_transform(overlay.blend)
+    allocations = []
+    tracemalloc.start()
+    for i in range(frames):
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        clip.get_frame(i / fps).tobytes()
+        allocations.append(tracemalloc.get_traced_memory()[1] - baseline)
+    tracemalloc.stop()
+    clip.close()
+
+    stats = generator.frame_pipeline.render(
+        background, generator.target_size, overlay, None, work_dir / "pipeline.mp4",
+        generator.target_size, fps, frames / fps, trace_allocations=True
+    )
+
+    # Encode time is included for the pipeline only, so compare engine speed with `engines`
+    def row(name, mean, peak):
+        print(f"{name:<28} {mean / 1024:9.1f} KiB/frame  max {peak / 1024:9.1f} KiB  {mean / frame_bytes:5.2f} frames")
+
+    print(f"{frames} frames at {generator.target_size[0]}x{generator.target_size[1]} ({frame_bytes / 1024:.0f} KiB RGB)")
+    row("MoviePy get_frame+tobytes", statistics.mean(allocations), max(allocations))
+    row("FramePipeline", stats["alloc_bytes_per_frame_mean"], stats["alloc_bytes_per_frame_max"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--work-dir", type=Path, default=None, help="Keep inputs/outputs here instead of a temp dir")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    engines = subparsers.add_parser("engines", help="MoviePy vs single-pass ffmpeg render")
+    engines.add_argument("--runs", type=int, default=3)
+    engines.set_defaults(func=bench_engines)
+
+    probe = subparsers.add_parser("probe", help="Source preview open vs header-only probe")
+    probe.add_argument("--runs", type=int, default=10)
+    probe.set_defaults(func=bench_probe)
+
+    batch = subparsers.add_parser("batch", help="Sequential generate_video calls vs one shared-decode batch")
+    batch.add_argument("--runs", type=int, default=1)
+    batch.add_argument("--count", type=int, default=10, help="Quotes rendered over the same background")
+    batch.add_argument("--engine", choices=VideoGenerator.RENDER_ENGINES, default="ffmpeg")
+    batch.add_argument("--workers", type=int, default=2, help="Concurrent ffmpeg processes in the batch")
+    batch.add_argument("--per-process", type=int, default=8, help="Reels encoded per ffmpeg process")
+    batch.set_defaults(func=bench_batch)
+
+    loop = subparsers.add_parser("loop", help="Looping a short source: concatenate vs time remap")
+    loop.add_argument("--runs", type=int, default=3)
+    loop.add_argument("--source-seconds", type=float, default=2)
+    loop.set_defaults(func=bench_loop)
+
+    segments = subparsers.add_parser("segments", help="Segment-parallel encode scaling from 1 to N segments")
+    segments.add_argument("--runs", type=int, default=1)
+    segments.add_argument("--engine", choices=VideoGenerator.RENDER_ENGINES, default="moviepy")
+    segments.add_argument("--max-segments", type=int, default=None, help="Defaults to the CPU count")
+    segments.set_defaults(func=bench_segments)
+
+    frames = subparsers.add_parser("frames", help="Per-frame allocations: MoviePy compositing vs frame pipeline")
+    frames.add_argument("--frames", type=int, default=150)
+    frames.set_defaults(func=bench_frames)
+
+    args = parser.parse_args()
+    if args.work_dir:
+        args.work_dir.mkdir(parents=True, exist_ok=True)
+        args.func(args, args.work_dir)
+    else:
+        with tempfile.TemporaryDirectory() as work_dir:
+            args.func(args, Path(work_dir))
+
+
+if __name__ == "__main__":
+    main()
@@ -21,6 +21,63 @@ class Config:
     # Application Settings
     DEBUG = os.getenv('DEBUG', 'False').lower() == 'true'
     
+    # Render Cache Settings
+    CACHE_DIR = os.getenv('CACHE_DIR', 'cache')
+    CLIP_CACHE_MAX_MB = int(os.getenv('CLIP_CACHE_MAX_MB', '5120'))
+    BACKGROUND_CACHE_MAX_MB = int(os.getenv('BACKGROUND_CACHE_MAX_MB', '5120'))
+    
+    # Download Settings
+    DOWNLOAD_SEGMENTS = int(os.getenv('DOWNLOAD_SEGMENTS', '4'))
+    DOWNLOAD_CHUNK_KB = int(os.getenv('DOWNLOAD_CHUNK_KB', '1024'))
+    DOWNLOAD_CONNECT_TIMEOUT = float(os.getenv('DOWNLOAD_CONNECT_TIMEOUT', '5'))
+    DOWNLOAD_READ_TIMEOUT = float(os.getenv('DOWNLOAD_READ_TIMEOUT', '30'))
+    PARTIAL_FETCH = os.getenv('PARTIAL_FETCH', 'True').lower() == 'true'
+    
+    # Render Settings ("moviepy", "ffmpeg" or "pipeline")
+    RENDER_ENGINE = os.getenv('RENDER_ENGINE', 'moviepy')
+    # Render full-resolution videos for draft previews in the background instead of on approval
+    AUTO_FINALIZE_DRAFTS = os.getenv('AUTO_FINALIZE_DRAFTS', 'False').lower() == 'true'
+    # Memory reserved across concurrent renders in all worker processes; renders wait or run with fewer frames in flight (0 = unlimited)
+    MEMORY_BUDGET_MB = int(os.getenv('MEMORY_BUDGET_MB', '0'))
+    # Split each render into this many segments encoded in parallel processes (1 = single encode)
+    RENDER_SEGMENTS = int(os.getenv('RENDER_SEGMENTS', '1'))
+    # Short sides of the HLS ladder written after each render, e.g. "360,720,1080" (empty = MP4 only)
+    HLS_LADDER = tuple(int(rung) for rung in os.getenv('HLS_LADDER', '').split(',') if rung.strip())
+    
+    # Video Serving Settings
+    # Seconds browsers/CDNs may cache served videos before revalidating with the ETag
+    VIDEO_CACHE_MAX_AGE = int(os.getenv('VIDEO_CACHE_MAX_AGE', '3600'))
+    # Emit X-Sendfile and let the front web server send file bodies
+    USE_X_SENDFILE = os.getenv('USE_X_SENDFILE', 'False').lower() == 'true'
+
+    # Job Settings
+    # Renders run in the background, at most this many at once; further jobs wait queued
+    JOB_WORKERS = int(os.getenv('JOB_WORKERS', '2'))
+    # Jobs allowed to wait for a worker; beyond this requests get 429 with Retry-After
+    JOB_QUEUE_SIZE = int(os.getenv('JOB_QUEUE_SIZE', '8'))
+    # Run renders in pre-forked worker processes instead of threads of the server process
+    RENDER_PROCESSES = os.getenv('RENDER_PROCESSES', 'True').lower() == 'true'
+    # Seconds a finished job's status and result stay available at /jobs/<id>
+    JOB_TTL_SECONDS = int(os.getenv('JOB_TTL_SECONDS', '3600'))
+    # Seconds a finished render answers identical requests (same quote, author, analyzer, voice, settings); 0 disables
+    RESULT_CACHE_TTL_SECONDS = int(os.getenv('RESULT_CACHE_TTL_SECONDS', '86400'))
+    # Seconds between scans that sync the video index with files added or removed outside the app
+    VIDEO_INDEX_SCAN_SECONDS = int(os.getenv('VIDEO_INDEX_SCAN_SECONDS', '300'))
+
+    # Retention Settings (0 = unlimited)
+    # Opt-in: oldest finished videos (with thumbnails and HLS) are deleted to keep output/ under this size
+    OUTPUT_MAX_MB = int(os.getenv('OUTPUT_MAX_MB', '0'))
+    # Opt-in: finished videos older than this are deleted
+    OUTPUT_MAX_AGE_DAYS = float(os.getenv('OUTPUT_MAX_AGE_DAYS', '0'))
+    # Drafts (preview and voiceover) not approved within this long are deleted
+    DRAFT_MAX_AGE_DAYS = float(os.getenv('DRAFT_MAX_AGE_DAYS', '7'))
+    # Cached overlays and partial downloads unused for this long are deleted
+    CACHE_MAX_AGE_DAYS = float(os.getenv('CACHE_MAX_AGE_DAYS', '30'))
+    # Temp files and work directories left by crashed renders are deleted after this many seconds
+    TEMP_MAX_AGE_SECONDS = int(os.getenv('TEMP_MAX_AGE_SECONDS', '3600'))
+    # Seconds between retention sweeps (one also runs at startup)
+    RETENTION_INTERVAL_SECONDS = int(os.getenv('RETENTION_INTERVAL_SECONDS', '900'))
+
     @classmethod
     def validate_config(cls) -> bool:
         """
@@ -1,7 +1,8 @@
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 from api.gemini import GeminiAPI
 from coverr.coverr import CoverrAPI
 from api.gemini import GeminiAPIError
+from services.renditions import DEFAULT_TARGET_SIZE, rank_by_crop_efficiency
 import logging
 
 logging.basicConfig(
@@ -64,6 +65,20 @@ class CoverrAnalyzer:
             if not any(extracted_urls.values()):
                 logger.error("No valid URLs found in video data")
                 return None
+            
+            # Coverr only reports the source dimensions, which belong to the download rendition
+            renditions = [
+                {
+                    "url": urls.get("mp4_download"),
+                    "width": video_data.get("max_width"),
+                    "height": video_data.get("max_height"),
+                    "size": None,
+                    "quality": "high_quality"
+                },
+                {"url": urls.get("mp4"), "width": None, "height": None, "size": None, "quality": "standard"},
+                {"url": urls.get("mp4_preview"), "width": None, "height": None, "size": None, "quality": "preview"}
+            ]
+            extracted_urls["renditions"] = [r for r in renditions if r["url"]]
                 
             return extracted_urls
             
@@ -99,8 +114,8 @@ class CoverrAnalyzer:
         
         return None
 
-    def get_video_url(self, quote: str) -> Dict[str, str]:
-        """Get most relevant video URLs for the given quote"""
+    def get_video_url(self, quote: str, target_size: Tuple[int, int] = DEFAULT_TARGET_SIZE) -> Dict[str, str]:
+        """Get most relevant video URLs for the given quote, preferring sources that fit target_size"""
         try:
             # Get all categories and extract relevant info
             categories = self.coverr.get_video_all_categories()
@@ -136,9 +151,16 @@ class CoverrAnalyzer:
             if not category_videos:
                 logger.error(f"No videos found for category: {matched_category}")
                 return None
-            # Randomly select a video from the category
+            # Randomly select among the videos whose crop to the output wastes the fewest pixels
             import random
-            first_video = random.choice(category_videos["hits"])
+            ranked = rank_by_crop_efficiency(
+                category_videos["hits"],
+                lambda video: (video.get("max_width"), video.get("max_height")),
+                target_size
+            )
+            best_score = ranked[0][0]
+            first_video = random.choice([video for score, video in ranked if score == best_score])
+            logger.info(f"Coverr crop score {best_score} for video {first_video.get('id')}")
             video_urls = self._extract_video_urls(first_video)
             
             logger.info(f"Found video URLs for category '{matched_category}': {video_urls}")
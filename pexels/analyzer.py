@@ -1,7 +1,8 @@
 import logging
-from typing import Dict, Optional, List, Any
+from typing import Dict, Optional, List, Any, Tuple
 from pexels.pexels import PexelsAPI
 from api.gemini import GeminiAPI
+from services.renditions import DEFAULT_TARGET_SIZE, rank_by_crop_efficiency
 
 logging.basicConfig(
     level=logging.INFO,
@@ -69,15 +70,31 @@ class PexelsAnalyzer:
         if not any(urls.values()):
             logger.warning("Could not extract any valid video URLs from Pexels video_files.")
             return None
+
+        urls["renditions"] = [
+            {
+                "url": vf["link"],
+                "width": vf.get("width"),
+                "height": vf.get("height"),
+                "size": vf.get("size"),
+                "quality": vf.get("quality")
+            }
+            for vf in video_files if vf.get("link")
+        ]
             
         return urls
 
-    def get_video_url(self, quote: str, quote_type: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    def get_video_url(
+        self,
+        quote: str,
+        quote_type: Optional[str] = None,
+        target_size: Tuple[int, int] = DEFAULT_TARGET_SIZE
+    ) -> Optional[Dict[str, Any]]:
         """
         1. Get quote (Input parameter)
         2. Use Gemini API to generate a search parameter for Pexels.
-        3. Search videos on Pexels.
-        4. Extract video URLs.
+        3. Search videos on Pexels, portrait first.
+        4. Rank hits by how much of each frame survives the crop to target_size and extract video URLs.
         5. Return a dictionary with quote, search query, video URLs, and Pexels info.
         """
         if not self.gemini:
@@ -99,13 +116,18 @@ class PexelsAnalyzer:
             
             logger.info(f"PexelsAnalyzer: Generated Pexels search query: '{search_query}' for quote: '{quote}'")
 
-            # Adjust parameters as needed for your PexelsAPI client
-            response = self.pexels.search_videos(
-                query=search_query,
-                orientation="landscape", 
-                size="medium", 
-                per_page=5
-            )
+            # Portrait sources crop to 9:16 without discarding pixels; fall back to any orientation
+            response = None
+            for orientation in ("portrait", None):
+                response = self.pexels.search_videos(
+                    query=search_query,
+                    orientation=orientation,
+                    size="medium",
+                    per_page=15
+                )
+                if response and response.get("videos"):
+                    break
+                logger.info(f"PexelsAnalyzer: No {orientation} videos for query '{search_query}', widening search.")
 
             if response and response.get("videos"):
                 pexels_videos_found = response["videos"]
@@ -114,9 +136,16 @@ class PexelsAnalyzer:
                     return None
 
                 logger.info(f"PexelsAnalyzer: Found {len(pexels_videos_found)} videos on Pexels for query '{search_query}'.")
+
+                # Prefer videos whose crop to the output keeps the most decoded pixels
+                ranked = rank_by_crop_efficiency(
+                    pexels_videos_found,
+                    lambda video: (video.get("width"), video.get("height")),
+                    target_size
+                )
                 
                 # Iterate through videos to find one with good downloadable links
-                for video_hit in pexels_videos_found:
+                for score, video_hit in ranked:
                     video_id = video_hit.get("id")
                     video_files = video_hit.get("video_files")
                     user_info = video_hit.get("user", {})
@@ -126,6 +155,7 @@ class PexelsAnalyzer:
                         continue
                     
                     video_urls = self._extract_video_urls_from_pexels_hit(video_files) # Renamed to match the defined method
+                    logger.info(f"PexelsAnalyzer: Selected video ID {video_id} with crop score {score}.")
                 
                     return video_urls
                     
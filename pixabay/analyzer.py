@@ -1,7 +1,8 @@
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Tuple
 from api.gemini import GeminiAPI
 from pixabay.pixibay import PixabayAPI
 from api.gemini import GeminiAPIError
+from services.renditions import DEFAULT_TARGET_SIZE, rank_by_crop_efficiency
 import logging
 
 logging.basicConfig(
@@ -46,13 +47,40 @@ class PixabayAnalyzer:
             logger.error(f"Error extracting video URLs: {e}")
             return None
 
-    
+    @staticmethod
+    def _largest_dimensions(video_hit: Dict) -> Tuple[Optional[int], Optional[int]]:
+        """Return (width, height) of the largest rendition of a Pixabay hit"""
+        for quality in ("large", "medium", "small", "tiny"):
+            rendition = video_hit.get("videos", {}).get(quality) or {}
+            if rendition.get("width") and rendition.get("height"):
+                return rendition["width"], rendition["height"]
+        return None, None
 
-    def get_video_url(self, quote: str, quote_type: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    def _extract_renditions(self, pixabay_video_data: Dict) -> List[Dict[str, Any]]:
+        """List every Pixabay rendition (large/medium/small/tiny) with its dimensions and size"""
+        renditions = []
+        for quality in ("large", "medium", "small", "tiny"):
+            rendition = pixabay_video_data.get(quality) or {}
+            if rendition.get("url"):
+                renditions.append({
+                    "url": rendition["url"],
+                    "width": rendition.get("width"),
+                    "height": rendition.get("height"),
+                    "size": rendition.get("size"),
+                    "quality": quality
+                })
+        return renditions
+
+    def get_video_url(
+        self,
+        quote: str,
+        quote_type: Optional[str] = None,
+        target_size: Tuple[int, int] = DEFAULT_TARGET_SIZE
+    ) -> Optional[Dict[str, Any]]:
         """
         1. Get video Quote (Input parameter)
         2. Using the Gemini API to analyze the quote and get the most relevant search parameter for that quote to search for the video
-        3. Do the video search from the pixabay API
+        3. Do the video search from the pixabay API and rank hits by how much of each frame survives the crop to target_size
         4. Get the video download url from the pixabay API using _extract_video_urls
         5. Return a dictionary containing the video download urls and other relevant info.
         6. If there is no video found for the quote or an error occurs, then return None.
@@ -79,7 +107,7 @@ class PixabayAnalyzer:
                 query=search_query,
                 language="en",
                 video_type="film",
-                per_page=5 # Changed from 3 to 5 for similarity with Pexels
+                per_page=15 # Same as Pexels; more candidates to find portrait-friendly sources
             )
 
             if response and response.get("hits"):
@@ -90,8 +118,16 @@ class PixabayAnalyzer:
 
                 logger.info(f"Analyzer: Found {len(videos_found)} videos on Pixabay for query '{search_query}'.")
                 
+                # Pixabay has no orientation filter, so rank hits by crop efficiency
+                # using the dimensions of their largest rendition
+                ranked = rank_by_crop_efficiency(
+                    videos_found,
+                    self._largest_dimensions,
+                    target_size
+                )
+                
                 # Iterate through videos to find one with processable video data
-                for video_hit in videos_found:
+                for score, video_hit in ranked:
                     video_id = video_hit.get("id")
                     pixabay_video_data = video_hit.get("videos", {}) # Main data payload for URLs
 
@@ -113,8 +149,10 @@ class PixabayAnalyzer:
                     }
                     
                     video_urls = self._extract_video_urls(input_for_extraction)
+                    if video_urls:
+                        video_urls["renditions"] = self._extract_renditions(pixabay_video_data)
                 
-                    logger.info(f"Analyzer: Extracted video URLs for category '{quote_type}' from hit ID {video_id}: {video_urls}")
+                    logger.info(f"Analyzer: Extracted video URLs for category '{quote_type}' from hit ID {video_id} (crop score {score}): {video_urls}")
                     return video_urls # Return after processing the first hit with 'videos' data
                     
                 # This part is reached if all video_hits lacked 'videos' data
@@ -0,0 +1,125 @@
+import hashlib
+import logging
+import os
+import threading
+import uuid
+from pathlib import Path
+from typing import Optional, Tuple
+
+from services.ffmpeg_utils import cover_crop_filter, run_ffmpeg
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class BackgroundCache:
+    """
+    Cache of backgrounds already cropped, scaled, looped/trimmed and resampled
+    to the render geometry, so repeat renders only overlay text and mux audio.
+
+    Entries are short-GOP, fast-decode H.264 files keyed by the source identity
+    and the target size, fps and duration. Least recently used entries are
+    removed once ``max_bytes`` is exceeded.
+    """
+
+    # Bump when the normalization pipeline changes so stale entries are not reused
+    VERSION = 1
+
+    def __init__(self, cache_dir: Path, max_bytes: int = 5 * 1024 ** 3):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def key(self, source_id: str, target_size: Tuple[int, int], fps: int, duration: float) -> str:
+        """Return the cache key for a source rendered at the given geometry."""
+        raw = f"v{self.VERSION}|{source_id}|{target_size[0]}x{target_size[1]}|{fps}|{duration:.3f}"
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def lookup(self, source_id: str, target_size: Tuple[int, int], fps: int, duration: float) -> Optional[Path]:
+        """Return an existing normalized background without building one."""
+        path = self.cache_dir / f"{self.key(source_id, target_size, fps, duration)}.mp4"
+        if not path.exists():
+            return None
+        os.utime(path)
+        with self._lock:
+            self.hits += 1
+        logger.info(f"Using normalized background: {path}")
+        return path
+
+    def get_or_create(
+        self,
+        source_path: Path,
+        source_id: str,
+        target_size: Tuple[int, int],
+        fps: int,
+        duration: float,
+        source_duration: Optional[float] = None
+    ) -> Path:
+        """
+        Return a normalized background for source_path, building it on a miss.
+
+        Args:
+            source_path: Local source clip
+            source_id: Stable identity of the source (e.g. its content hash)
+            target_size: Output (width, height)
+            fps: Output frame rate
+            duration: Output duration in seconds; shorter sources are looped
+            source_duration: Probed source duration, if known, to skip looping long sources
+
+        Returns:
+            Path to the normalized background
+
+        Raises:
+            FFmpegError: If normalization fails
+        """
+        cached_path = self.lookup(source_id, target_size, fps, duration)
+        if cached_path:
+            return cached_path
+
+        path = self.cache_dir / f"{self.key(source_id, target_size, fps, duration)}.mp4"
+        with self._lock:
+            self.misses += 1
+
+        loop_args = [] if source_duration and source_duration >= duration else ["-stream_loop", "-1"]
+        tmp_path = self.cache_dir / f"{uuid.uuid4().hex}.part"
+        try:
+            run_ffmpeg([
+                *loop_args,
+                "-i", str(source_path),
+                "-t", f"{duration:.3f}",
+                "-vf", f"{cover_crop_filter(target_size)},fps={fps}",
+                "-an",
+                "-c:v", "libx264",
+                "-preset", "ultrafast",
+                "-tune", "fastdecode",
+                "-crf", "18",
+                "-g", str(fps),
+                "-pix_fmt", "yuv420p",
+                "-f", "mp4",
+                str(tmp_path)
+            ])
+            os.replace(tmp_path, path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+
+        logger.info(f"Normalized background written to: {path}")
+        self._evict(keep=path)
+        return path
+
+    def _evict(self, keep: Path):
+        """Remove least recently used entries until the cache fits its budget."""
+        with self._lock:
+            entries = sorted(self.cache_dir.glob("*.mp4"), key=lambda p: p.stat().st_mtime)
+            total = sum(p.stat().st_size for p in entries)
+            for entry in entries:
+                if total <= self.max_bytes:
+                    break
+                if entry == keep:
+                    continue
+                size = entry.stat().st_size
+                entry.unlink(missing_ok=True)
+                total -= size
+                logger.info(f"Evicted normalized background {entry.name} ({size} bytes)")
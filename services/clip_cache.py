@@ -0,0 +1,205 @@
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Optional
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class ClipCacheError(Exception):
+    """Custom exception for clip cache errors"""
+    pass
+
+
+class ClipCache:
+    """
+    Persistent on-disk cache for downloaded background clips.
+
+    Files are stored once per content hash under ``blobs/`` and looked up by
+    source URL, so the same clip served from different URLs is kept only once.
+    The cache is bounded by ``max_bytes`` and evicts least recently used blobs.
+
+    Several processes (e.g. render workers) may share one cache directory:
+    every operation re-reads the index under a file lock before changing and
+    rewriting it, so no process works from a stale copy.
+    """
+
+    INDEX_FILE = "index.json"
+    LOCK_FILE = "index.lock"
+
+    def __init__(self, cache_dir: Path, max_bytes: int = 5 * 1024 ** 3):
+        self.cache_dir = Path(cache_dir)
+        self.blobs_dir = self.cache_dir / "blobs"
+        self.tmp_dir = self.cache_dir / "tmp"
+        self.blobs_dir.mkdir(parents=True, exist_ok=True)
+        self.tmp_dir.mkdir(parents=True, exist_ok=True)
+
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._index_path = self.cache_dir / self.INDEX_FILE
+        self._lock_path = self.cache_dir / self.LOCK_FILE
+        self._urls: Dict[str, str] = {}
+        self._blobs: Dict[str, Dict] = {}
+        self._load_index()
+
+    @contextmanager
+    def _locked(self):
+        """Hold the cache lock across threads and processes, with the index freshly loaded."""
+        with self._lock, open(self._lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                self._load_index()
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _load_index(self):
+        """
+        Load the URL and blob index from disk (lock must be held).
+
+        Entries whose file is gone are dropped and blobs missing from the index
+        (e.g. after it became unreadable) are added back, so every blob on disk
+        counts against the budget.
+        """
+        try:
+            with open(self._index_path, "r") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            data = {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable clip cache index {self._index_path}: {e}")
+            data = {}
+
+        on_disk = {path.stem: path for path in self.blobs_dir.glob("*.mp4")}
+        self._blobs = {
+            digest: entry for digest, entry in data.get("blobs", {}).items()
+            if digest in on_disk
+        }
+        for digest, path in on_disk.items():
+            if digest not in self._blobs:
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                self._blobs[digest] = {"size": stat.st_size, "last_access": stat.st_mtime}
+        self._urls = {
+            url: digest for url, digest in data.get("urls", {}).items()
+            if digest in self._blobs
+        }
+
+    def _save_index(self):
+        """Atomically write the index next to the blobs (lock must be held)."""
+        tmp_path = self.tmp_dir / f"{self.INDEX_FILE}.{uuid.uuid4().hex}"
+        with open(tmp_path, "w") as f:
+            json.dump({"urls": self._urls, "blobs": self._blobs}, f)
+        os.replace(tmp_path, self._index_path)
+
+    def _blob_path(self, digest: str) -> Path:
+        return self.blobs_dir / f"{digest}.mp4"
+
+    @staticmethod
+    def _hash_file(path: Path) -> str:
+        sha = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                sha.update(block)
+        return sha.hexdigest()
+
+    def new_temp_path(self, suffix: str = ".part") -> Path:
+        """Return a unique path on the cache filesystem for an in-progress download."""
+        return self.tmp_dir / f"{uuid.uuid4().hex}{suffix}"
+
+    def partial_path(self, url: str) -> Path:
+        """Return the stable in-progress path for url, so interrupted downloads can resume."""
+        return self.tmp_dir / f"{hashlib.sha256(url.encode()).hexdigest()}.part"
+
+    def get(self, url: str) -> Optional[Path]:
+        """Return the cached file for ``url`` or None on a miss."""
+        with self._locked():
+            digest = self._urls.get(url)
+            path = self._blob_path(digest) if digest else None
+            if path is None or not path.exists():
+                if digest:
+                    self._forget(digest)
+                self.misses += 1
+                return None
+
+            self._blobs[digest]["last_access"] = time.time()
+            self.hits += 1
+            self._save_index()
+            return path
+
+    def put(self, url: str, source_path: Path) -> Path:
+        """
+        Move a completed download into the cache and map ``url`` to it.
+
+        Args:
+            url: Source URL the file was fetched from
+            source_path: Fully written file, ideally from ``new_temp_path``
+
+        Returns:
+            Path of the cached blob. ``source_path`` is consumed either way.
+        """
+        source_path = Path(source_path)
+        try:
+            digest = self._hash_file(source_path)
+        except OSError as e:
+            raise ClipCacheError(f"Failed to hash {source_path}: {e}")
+
+        with self._locked():
+            blob_path = self._blob_path(digest)
+            if blob_path.exists():
+                logger.info(f"Clip from {url} duplicates cached blob {digest[:12]}")
+                source_path.unlink(missing_ok=True)
+            else:
+                os.replace(source_path, blob_path)
+
+            # The blob may be on disk without an entry (unreadable index, another cache instance)
+            entry = self._blobs.setdefault(digest, {"size": blob_path.stat().st_size})
+            entry["last_access"] = time.time()
+            self._urls[url] = digest
+            self._evict(keep=digest)
+            self._save_index()
+            return blob_path
+
+    def _forget(self, digest: str):
+        """Drop a blob and every URL that points to it (lock must be held)."""
+        self._blobs.pop(digest, None)
+        self._urls = {url: d for url, d in self._urls.items() if d != digest}
+        self._blob_path(digest).unlink(missing_ok=True)
+
+    def _evict(self, keep: Optional[str] = None):
+        """Evict least recently used blobs until the cache fits its budget (lock must be held)."""
+        total = sum(entry["size"] for entry in self._blobs.values())
+        by_age = sorted(self._blobs.items(), key=lambda item: item[1].get("last_access", 0))
+        for digest, entry in by_age:
+            if total <= self.max_bytes:
+                break
+            if digest == keep:
+                continue
+            logger.info(f"Evicting cached clip {digest[:12]} ({entry['size']} bytes)")
+            self._forget(digest)
+            total -= entry["size"]
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters and current disk usage."""
+        with self._locked():
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._blobs),
+                "urls": len(self._urls),
+                "bytes": sum(entry["size"] for entry in self._blobs.values()),
+                "max_bytes": self.max_bytes,
+            }
@@ -0,0 +1,405 @@
+import fcntl
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import requests
+
+from services.mp4_index import MP4IndexError, leading_byte_end, parse_box_header
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class DownloadError(Exception):
+    """Custom exception for download errors"""
+    pass
+
+
+class DownloadCancelled(DownloadError):
+    """Raised when a download is cancelled through its cancel event"""
+    pass
+
+
+class PartialFetchUnsupported(DownloadError):
+    """Raised when only part of a file cannot be fetched (no Range support, unindexable layout)"""
+    pass
+
+
+class RangedDownloader:
+    """
+    HTTP downloader that fetches large files as parallel byte ranges.
+
+    Progress per segment is recorded in a ``<dest>.state`` file next to the
+    partial download, so a retry (in this call or a later one) resumes each
+    segment where it stopped instead of starting over. Only bytes already
+    flushed to the file are recorded, so a process killed mid-write never
+    leaves holes behind a resumed download. Downloads into the same ``dest``
+    are serialized across threads and processes with a ``<dest>.lock`` file.
+    Servers without Range support fall back to a single streaming GET.
+    """
+
+    def __init__(
+        self,
+        segments: int = 4,
+        chunk_size: int = 1024 * 1024,
+        connect_timeout: float = 5,
+        read_timeout: float = 30,
+        max_retries: int = 3,
+        min_segment_size: int = 4 * 1024 * 1024,
+        session: Optional[requests.Session] = None
+    ):
+        self.segments = max(1, segments)
+        self.chunk_size = chunk_size
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.min_segment_size = min_segment_size
+        self.checkpoint_bytes = 8 * 1024 * 1024
+        self.session = session or requests.Session()
+        self._locks: Dict[str, threading.RLock] = {}
+        self._locks_guard = threading.Lock()
+        # Nesting depth of lock() per dest; only touched by the thread holding its RLock
+        self._depth: Dict[str, int] = {}
+
+    @contextmanager
+    def lock(self, dest: Path):
+        """
+        Hold dest exclusively for the duration of the block, across threads and processes.
+
+        Reentrant within a thread, so callers can hold it around ``download``
+        (e.g. to check a cache again once they have it).
+        """
+        key = str(dest)
+        with self._locks_guard:
+            thread_lock = self._locks.setdefault(key, threading.RLock())
+        with thread_lock:
+            if self._depth.get(key):
+                self._depth[key] += 1
+                try:
+                    yield
+                finally:
+                    self._depth[key] -= 1
+                return
+
+            with open(f"{dest}.lock", "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                # Fresh mtime, so cleanup of stale partial files leaves a held lock alone
+                os.utime(lock_file.fileno())
+                self._depth[key] = 1
+                try:
+                    yield
+                finally:
+                    del self._depth[key]
+
+    def _probe(self, url: str) -> Dict:
+        """Ask for the first byte to learn the size, range support and validators."""
+        with self.session.get(url, headers={"Range": "bytes=0-0"}, stream=True, timeout=self.timeout) as response:
+            response.raise_for_status()
+            content_range = response.headers.get("Content-Range", "")
+            if response.status_code == 206 and "/" in content_range and not content_range.endswith("/*"):
+                total = int(content_range.rsplit("/", 1)[1])
+                ranged = True
+            else:
+                total = int(response.headers.get("Content-Length", 0))
+                ranged = False
+            return {
+                "total": total,
+                "ranged": ranged,
+                "validator": response.headers.get("ETag") or response.headers.get("Last-Modified"),
+            }
+
+    def _plan(self, total: int) -> List[Dict]:
+        """Split [0, total) into contiguous segments."""
+        count = max(1, min(self.segments, total // self.min_segment_size))
+        size = -(-total // count)
+        return [
+            {"start": start, "end": min(start + size, total), "done": 0, "flushed": 0}
+            for start in range(0, total, size)
+        ]
+
+    @staticmethod
+    def _state_path(dest: Path) -> Path:
+        return dest.with_name(dest.name + ".state")
+
+    def _load_state(self, dest: Path, url: str, info: Dict) -> Optional[List[Dict]]:
+        """Return the saved segment plan if it belongs to the same remote file."""
+        state_path = self._state_path(dest)
+        try:
+            with open(state_path, "r") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if (
+            state.get("url") != url
+            or state.get("total") != info["total"]
+            or state.get("validator") != info["validator"]
+            or not dest.exists()
+        ):
+            return None
+        return [{**segment, "flushed": segment["done"]} for segment in state["segments"]]
+
+    def _save_state(self, dest: Path, url: str, info: Dict, segments: List[Dict]):
+        """Record each segment as done up to its flushed offset; written but unflushed bytes are fetched again."""
+        state_path = self._state_path(dest)
+        tmp_path = state_path.with_name(state_path.name + ".tmp")
+        saved = [
+            {"start": segment["start"], "end": segment["end"], "done": segment["flushed"]}
+            for segment in segments
+        ]
+        with open(tmp_path, "w") as f:
+            json.dump({"url": url, "total": info["total"], "validator": info["validator"], "segments": saved}, f)
+        os.replace(tmp_path, state_path)
+
+    def download(
+        self,
+        url: str,
+        dest: Path,
+        cancel_event: Optional[threading.Event] = None,
+        progress: Optional[Callable[[int], None]] = None
+    ) -> Path:
+        """
+        Download url into dest, resuming a previous partial download of the same file.
+
+        Args:
+            url: Remote file URL
+            dest: Destination path; also the location of the resumable partial file
+            cancel_event: Optional event that aborts the download when set
+            progress: Optional callback receiving the number of new bytes written
+
+        Returns:
+            dest once it holds the complete file
+
+        Raises:
+            DownloadCancelled: If cancel_event was set
+            DownloadError: If the download failed after all retries
+        """
+        dest = Path(dest)
+        with self.lock(dest):
+            try:
+                info = self._probe(url)
+            except requests.exceptions.RequestException as e:
+                raise DownloadError(f"Failed to reach {url}: {e}")
+
+            if not info["ranged"] or info["total"] == 0:
+                return self._download_single(url, dest, cancel_event, progress)
+
+            segments = self._load_state(dest, url, info)
+            if segments is None:
+                segments = self._plan(info["total"])
+                with open(dest, "wb") as f:
+                    f.truncate(info["total"])
+            self._fetch_segments(url, dest, info, segments, cancel_event, progress)
+            return dest
+
+    def download_leading(
+        self,
+        url: str,
+        dest: Path,
+        seconds: float,
+        cancel_event: Optional[threading.Event] = None,
+        progress: Optional[Callable[[int], None]] = None
+    ) -> int:
+        """
+        Fetch only the bytes of an MP4 needed to decode its first seconds.
+
+        The ``moov`` index is located with small Range requests, and the sample
+        tables give the last byte of the leading samples. That prefix and ``moov``
+        are written at their original offsets into a sparse file of the full
+        size, so decoders see a valid MP4 whose first seconds are complete.
+
+        Args:
+            url: Remote MP4 URL
+            dest: Destination path (resumable like ``download``)
+            seconds: Leading duration needed
+            cancel_event: Optional event that aborts the download when set
+            progress: Optional callback receiving the number of new bytes written
+
+        Returns:
+            Number of bytes transferred for the media prefix and index
+
+        Raises:
+            PartialFetchUnsupported: If the server or file layout does not allow it
+            DownloadCancelled: If cancel_event was set
+            DownloadError: If the download failed after all retries
+        """
+        dest = Path(dest)
+        with self.lock(dest):
+            try:
+                info = self._probe(url)
+                if not info["ranged"] or info["total"] == 0:
+                    raise PartialFetchUnsupported(f"{url} does not support Range requests")
+                moov_start, moov = self._find_moov(url, info["total"])
+                needed_end = leading_byte_end(moov, seconds)
+            except MP4IndexError as e:
+                raise PartialFetchUnsupported(f"Cannot index {url}: {e}")
+            except requests.exceptions.RequestException as e:
+                raise DownloadError(f"Failed to reach {url}: {e}")
+
+            segments = self._load_state(dest, url, info)
+            if segments is None:
+                segments = self._plan(needed_end)
+                with open(dest, "wb") as f:
+                    f.truncate(info["total"])
+            with open(dest, "r+b") as f:
+                f.seek(moov_start)
+                f.write(moov)
+
+            self._fetch_segments(url, dest, info, segments, cancel_event, progress)
+            logger.info(
+                f"Fetched the first {seconds}s of {url}: {needed_end + len(moov)} of {info['total']} bytes"
+            )
+            return needed_end + len(moov)
+
+    def _fetch_range(self, url: str, start: int, end: int) -> bytes:
+        """Return bytes [start, end) of url."""
+        headers = {"Range": f"bytes={start}-{end - 1}"}
+        response = self.session.get(url, headers=headers, timeout=self.timeout)
+        response.raise_for_status()
+        if response.status_code != 206:
+            raise PartialFetchUnsupported(f"Range request for {url} returned {response.status_code}")
+        return response.content
+
+    def _find_moov(self, url: str, total: int) -> Tuple[int, bytes]:
+        """Walk the top-level boxes with small Range requests and return (offset, moov box)."""
+        offset = 0
+        while offset < total:
+            header = self._fetch_range(url, offset, min(offset + 16, total))
+            box_type, _, size = parse_box_header(header)
+            if box_type == "moov":
+                end = total if size == 0 else offset + size
+                return offset, self._fetch_range(url, offset, end)
+            if box_type == "moof":
+                raise MP4IndexError("Fragmented MP4 has no global sample index")
+            if size == 0:
+                break
+            offset += size
+        raise MP4IndexError("No moov box found")
+
+    def _fetch_segments(
+        self,
+        url: str,
+        dest: Path,
+        info: Dict,
+        segments: List[Dict],
+        cancel_event: Optional[threading.Event],
+        progress: Optional[Callable[[int], None]]
+    ):
+        """Fetch the planned segments in parallel, checkpointing progress for resumption."""
+        resumed = sum(segment["done"] for segment in segments)
+        if resumed:
+            logger.info(f"Resuming download of {url} at {resumed} bytes")
+            if progress:
+                progress(resumed)
+        self._save_state(dest, url, info, segments)
+
+        state_lock = threading.Lock()
+
+        def checkpoint():
+            with state_lock:
+                self._save_state(dest, url, info, segments)
+
+        with ThreadPoolExecutor(max_workers=len(segments), thread_name_prefix="download") as executor:
+            futures = [
+                executor.submit(self._download_segment, url, dest, segment, checkpoint, cancel_event, progress)
+                for segment in segments
+            ]
+            errors = [future.exception() for future in futures if future.exception() is not None]
+
+        checkpoint()
+        if errors:
+            if any(isinstance(error, DownloadCancelled) for error in errors):
+                raise DownloadCancelled(f"Download of {url} cancelled")
+            raise DownloadError(f"Failed to download {url}: {errors[0]}")
+
+        self._state_path(dest).unlink(missing_ok=True)
+
+    def _download_segment(
+        self,
+        url: str,
+        dest: Path,
+        segment: Dict,
+        checkpoint: Callable[[], None],
+        cancel_event: Optional[threading.Event],
+        progress: Optional[Callable[[int], None]]
+    ):
+        """Fetch one byte range, retrying from the last written offset on errors."""
+        attempt = 0
+        while segment["start"] + segment["done"] < segment["end"]:
+            offset = segment["start"] + segment["done"]
+            headers = {"Range": f"bytes={offset}-{segment['end'] - 1}"}
+            done_before = segment["done"]
+            try:
+                with self.session.get(url, headers=headers, stream=True, timeout=self.timeout) as response:
+                    if response.status_code != 206:
+                        raise DownloadError(f"Expected 206 for range {headers['Range']}, got {response.status_code}")
+                    with open(dest, "r+b") as f:
+                        f.seek(offset)
+                        unsaved = 0
+                        for chunk in response.iter_content(chunk_size=self.chunk_size):
+                            if cancel_event is not None and cancel_event.is_set():
+                                raise DownloadCancelled("Download cancelled")
+                            if not chunk:
+                                continue
+                            chunk = chunk[:segment["end"] - (segment["start"] + segment["done"])]
+                            f.write(chunk)
+                            segment["done"] += len(chunk)
+                            unsaved += len(chunk)
+                            if progress:
+                                progress(len(chunk))
+                            # Persist progress regularly so a crash loses little work
+                            if unsaved >= self.checkpoint_bytes:
+                                f.flush()
+                                segment["flushed"] = segment["done"]
+                                checkpoint()
+                                unsaved = 0
+                    # Closed, so every byte written so far is in the file
+                    segment["flushed"] = segment["done"]
+                    checkpoint()
+                if segment["start"] + segment["done"] < segment["end"]:
+                    raise DownloadError(f"Response for {headers['Range']} ended early")
+            except (requests.exceptions.RequestException, DownloadError) as e:
+                # Raised inside the file block, whose exit has closed (and flushed) the file
+                segment["flushed"] = segment["done"]
+                if isinstance(e, DownloadCancelled):
+                    raise
+                checkpoint()
+                # Only count attempts that made no progress, so slow flaky links still finish
+                if segment["done"] == done_before:
+                    attempt += 1
+                if attempt > self.max_retries:
+                    raise DownloadError(f"Segment {headers['Range']} failed after {self.max_retries} retries: {e}")
+                logger.warning(f"Segment {headers['Range']} interrupted ({e}), resuming at byte {segment['start'] + segment['done']}")
+                time.sleep(min(2 ** attempt * 0.1, 2))
+
+    def _download_single(
+        self,
+        url: str,
+        dest: Path,
+        cancel_event: Optional[threading.Event],
+        progress: Optional[Callable[[int], None]]
+    ) -> Path:
+        """Plain streaming GET for servers without Range support."""
+        for attempt in range(self.max_retries + 1):
+            try:
+                with self.session.get(url, stream=True, timeout=self.timeout) as response:
+                    response.raise_for_status()
+                    with open(dest, "wb") as f:
+                        for chunk in response.iter_content(chunk_size=self.chunk_size):
+                            if cancel_event is not None and cancel_event.is_set():
+                                raise DownloadCancelled("Download cancelled")
+                            if chunk:
+                                f.write(chunk)
+                                if progress:
+                                    progress(len(chunk))
+                return dest
+            except requests.exceptions.RequestException as e:
+                if attempt == self.max_retries:
+                    raise DownloadError(f"Failed to download {url}: {e}")
+                logger.warning(f"Download of {url} interrupted ({e}), retry {attempt + 1}/{self.max_retries}")
+        return dest
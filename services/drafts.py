@@ -0,0 +1,101 @@
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, List, Optional
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class DraftStoreError(Exception):
+    """Custom exception for draft store errors"""
+    pass
+
+
+class DraftStore:
+    """
+    Records the inputs of preview renders so the full-resolution render can run
+    later, either when the user approves the preview or in the background.
+
+    Each draft is one JSON file under ``drafts_dir``; files the draft owns (the
+    voiceover) live next to it so the final render does not repeat TTS.
+    """
+
+    STATUSES = ("preview", "rendering", "done", "failed")
+
+    def __init__(self, drafts_dir: Path):
+        self.drafts_dir = Path(drafts_dir)
+        self.drafts_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def _path(self, draft_id: str) -> Path:
+        if not draft_id or not all(c in "0123456789abcdef" for c in draft_id):
+            raise DraftStoreError(f"Invalid draft id: {draft_id!r}")
+        return self.drafts_dir / f"{draft_id}.json"
+
+    def _write(self, draft: Dict):
+        path = self._path(draft["id"])
+        tmp_path = path.with_suffix(f".{uuid.uuid4().hex}.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(draft, f)
+        os.replace(tmp_path, path)
+
+    def new_id(self) -> str:
+        return uuid.uuid4().hex
+
+    def asset_path(self, draft_id: str, suffix: str) -> Path:
+        """Return the path of a file owned by the draft, e.g. its voiceover."""
+        return self._path(draft_id).with_suffix(suffix)
+
+    def create(self, draft_id: str, **inputs) -> Dict:
+        """Record a new draft in the "preview" state."""
+        draft = {"id": draft_id, "status": "preview", "created": time.time(), "output_path": None, **inputs}
+        with self._lock:
+            self._write(draft)
+        return draft
+
+    def get(self, draft_id: str) -> Optional[Dict]:
+        """Return the draft or None if it does not exist."""
+        try:
+            with open(self._path(draft_id), "r") as f:
+                return json.load(f)
+        except (FileNotFoundError, DraftStoreError):
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable draft {draft_id}: {e}")
+            return None
+
+    def list_drafts(self) -> List[Dict]:
+        """Return every readable draft."""
+        drafts = []
+        for path in self.drafts_dir.glob("*.json"):
+            draft = self.get(path.stem)
+            if draft is not None:
+                drafts.append(draft)
+        return drafts
+
+    def update(self, draft_id: str, **fields) -> Dict:
+        """Update fields of an existing draft and return it."""
+        with self._lock:
+            draft = self.get(draft_id)
+            if draft is None:
+                raise DraftStoreError(f"Draft not found: {draft_id}")
+            if "status" in fields and fields["status"] not in self.STATUSES:
+                raise DraftStoreError(f"Unknown draft status: {fields['status']}")
+            draft.update(fields)
+            self._write(draft)
+            return draft
+
+    def delete(self, draft_id: str) -> Optional[Dict]:
+        """Remove the draft record and the files it owns; returns the removed draft."""
+        with self._lock:
+            draft = self.get(draft_id)
+            if draft is None:
+                return None
+            for asset in self.drafts_dir.glob(f"{draft_id}.*"):
+                asset.unlink(missing_ok=True)
+            return draft
@@ -0,0 +1,369 @@
+import logging
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+from services.ffmpeg_utils import FASTSTART_ARGS, cover_crop_filter, run_ffmpeg
+from services.thumbnails import ThumbnailCapture
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class FFmpegRenderer:
+    """
+    Render engine that runs the whole pipeline as one native ffmpeg filtergraph:
+    loop/trim the background, crop and scale it, overlay a pre-rasterized quote
+    image and mux the voiceover, without pulling frames into Python.
+    """
+
+    def __init__(
+        self,
+        preset: str = "ultrafast",
+        crf: int = 23,
+        niceness: int = 0,
+        threads: Optional[int] = None,
+        decoder_threads: Optional[int] = None
+    ):
+        self.preset = preset
+        self.crf = crf
+        # Raised for renders that should yield the CPU to interactive work
+        self.niceness = niceness
+        # Each decoder/encoder thread keeps a frame in flight; None lets ffmpeg pick per core count
+        self.threads = threads
+        self.decoder_threads = decoder_threads
+
+    def _background_input_args(self, background_path: Path, loop: bool) -> list:
+        """Return the input options and -i for the background/source clip."""
+        args = ["-threads", str(self.decoder_threads)] if self.decoder_threads else []
+        if loop:
+            args += ["-stream_loop", "-1"]
+        return args + ["-i", str(background_path)]
+
+    def build_filtergraph(self, target_size: Tuple[int, int], fps: int, overlay_scale: float = 1.0) -> str:
+        """
+        Return the filtergraph mapping [0:v] (background) and [1:v] (overlay) to [v].
+
+        overlay_scale resizes the overlay, so a full-size overlay can be reused
+        for a downscaled render with the same text layout.
+        """
+        overlay = "[1:v]"
+        graph = f"[0:v]{cover_crop_filter(target_size)},fps={fps}[bg];"
+        if overlay_scale != 1.0:
+            overlay = "[ov]"
+            graph += f"[1:v]scale=trunc(iw*{overlay_scale}):trunc(ih*{overlay_scale})[ov];"
+        return graph + f"[bg]{overlay}overlay=x=(W-w)/2:y=(H-h)/2:format=auto,format=yuv420p[v]"
+
+    def build_command(
+        self,
+        background_path: Path,
+        overlay_path: Path,
+        audio_path: Optional[Path],
+        output_path: Path,
+        target_size: Tuple[int, int],
+        fps: int,
+        duration: float,
+        loop: bool = True,
+        overlay_scale: float = 1.0,
+        thumbnails: Optional[ThumbnailCapture] = None
+    ) -> list:
+        """Return the ffmpeg arguments for a render (without the binary)."""
+        args = self._background_input_args(background_path, loop)
+        args += ["-i", str(overlay_path)]
+        if audio_path:
+            args += ["-i", str(audio_path)]
+
+        graph = self.build_filtergraph(target_size, fps, overlay_scale)
+        video = "[v]"
+        if thumbnails:
+            # Poster and sprite branches split off the composited frames in the same process
+            graph += ";" + thumbnails.filtergraph("v", "vout")
+            video = "[vout]"
+        args += [
+            "-filter_complex", graph,
+            "-map", video,
+        ]
+        if audio_path:
+            args += ["-map", "2:a", "-c:a", "aac"]
+
+        args += self._encode_args(duration, output_path)
+        if thumbnails:
+            args += thumbnails.output_args()
+        return args
+
+    def _encode_args(self, duration: float, output_path: Path) -> list:
+        """Return the per-output duration and libx264 arguments."""
+        args = [
+            "-t", f"{duration:.3f}",
+            "-c:v", "libx264",
+            "-preset", self.preset,
+            "-crf", str(self.crf),
+            *FASTSTART_ARGS,
+        ]
+        if self.threads:
+            args += ["-threads", str(self.threads)]
+        return args + [str(output_path)]
+
+    def render(
+        self,
+        background_path: Path,
+        overlay_path: Path,
+        audio_path: Optional[Path],
+        output_path: Path,
+        target_size: Tuple[int, int],
+        fps: int,
+        duration: float,
+        loop: bool = True,
+        overlay_scale: float = 1.0,
+        thumbnails: Optional[ThumbnailCapture] = None
+    ):
+        """
+        Render a reel in a single ffmpeg invocation.
+
+        Args:
+            background_path: Source or normalized background clip; looped if too short
+            overlay_path: RGBA image centered over the background
+            audio_path: Optional voiceover to mux as AAC
+            output_path: Destination MP4
+            target_size: Output (width, height)
+            fps: Output frame rate
+            duration: Output duration in seconds
+            loop: Loop the background; only needed when it is shorter than duration
+            overlay_scale: Resize factor for the overlay image
+            thumbnails: Also write its poster and sprite JPEGs from the composited frames
+
+        Raises:
+            FFmpegError: If ffmpeg fails
+        """
+        run_ffmpeg(self.build_command(
+            background_path, overlay_path, audio_path, output_path, target_size, fps, duration, loop, overlay_scale,
+            thumbnails
+        ), niceness=self.niceness)
+        logger.info(f"ffmpeg render written to: {output_path}")
+
+    def build_batch_command(
+        self,
+        background_path: Path,
+        outputs: List[Tuple[Path, Optional[Path], Path]],
+        target_size: Tuple[int, int],
+        fps: int,
+        duration: float,
+        loop: bool = True
+    ) -> list:
+        """
+        Return the ffmpeg arguments for rendering several reels over one background.
+
+        The background is decoded, cropped and scaled once, then split to one
+        overlay and encoder per output.
+
+        Args:
+            outputs: (overlay_path, audio_path or None, output_path) per reel
+        """
+        count = len(outputs)
+        args = self._background_input_args(background_path, loop)
+        for overlay_path, _, _ in outputs:
+            args += ["-i", str(overlay_path)]
+
+        audio_inputs = {}
+        for index, (_, audio_path, _) in enumerate(outputs):
+            if audio_path:
+                audio_inputs[index] = 1 + count + len(audio_inputs)
+                args += ["-i", str(audio_path)]
+
+        branches = "".join(f"[b{i}]" for i in range(count))
+        graph = [f"[0:v]{cover_crop_filter(target_size)},fps={fps},split={count}{branches}"]
+        graph += [
+            f"[b{i}][{i + 1}:v]overlay=x=(W-w)/2:y=(H-h)/2:format=auto,format=yuv420p[v{i}]"
+            for i in range(count)
+        ]
+        args += ["-filter_complex", ";".join(graph)]
+
+        for index, (_, _, output_path) in enumerate(outputs):
+            args += ["-map", f"[v{index}]"]
+            if index in audio_inputs:
+                args += ["-map", f"{audio_inputs[index]}:a", "-c:a", "aac"]
+            args += self._encode_args(duration, output_path)
+        return args
+
+    def render_batch(
+        self,
+        background_path: Path,
+        outputs: List[Tuple[Path, Optional[Path], Path]],
+        target_size: Tuple[int, int],
+        fps: int,
+        duration: float,
+        loop: bool = True
+    ):
+        """
+        Render several reels sharing one background in a single ffmpeg invocation.
+
+        Args:
+            background_path: Source or normalized background clip; looped if too short
+            outputs: (overlay_path, audio_path or None, output_path) per reel
+            target_size: Output (width, height)
+            fps: Output frame rate
+            duration: Output duration in seconds
+            loop: Loop the background; only needed when it is shorter than duration
+
+        Raises:
+            FFmpegError: If ffmpeg fails
+        """
+        run_ffmpeg(
+            self.build_batch_command(background_path, outputs, target_size, fps, duration, loop),
+            niceness=self.niceness
+        )
+        logger.info(f"ffmpeg batch render wrote {len(outputs)} reels")
+
+    def build_multi_format_command(
+        self,
+        source_path: Path,
+        outputs: List[Tuple[Tuple[int, int], Path, Path]],
+        audio_path: Optional[Path],
+        fps: int,
+        duration: float,
+        loop: bool = True,
+        thumbnails: Optional[Sequence[Optional[ThumbnailCapture]]] = None
+    ) -> list:
+        """
+        Return the ffmpeg arguments for rendering one reel in several aspect ratios.
+
+        The source is decoded once and split before cropping, so each format
+        gets its own crop/scale/overlay branch and encoder.
+
+        Args:
+            outputs: (target_size, overlay_path, output_path) per format
+            thumbnails: Optional capture per output (with distinct labels)
+        """
+        thumbnails = thumbnails or [None] * len(outputs)
+        count = len(outputs)
+        args = self._background_input_args(source_path, loop)
+        for _, overlay_path, _ in outputs:
+            args += ["-i", str(overlay_path)]
+        if audio_path:
+            args += ["-i", str(audio_path)]
+
+        branches = "".join(f"[s{i}]" for i in range(count))
+        graph = [f"[0:v]fps={fps},split={count}{branches}"]
+        graph += [
+            f"[s{i}]{cover_crop_filter(target_size)}[bg{i}];"
+            f"[bg{i}][{i + 1}:v]overlay=x=(W-w)/2:y=(H-h)/2:format=auto,format=yuv420p[v{i}]"
+            for i, (target_size, _, _) in enumerate(outputs)
+        ]
+        # Poster and sprite branches split off each format's composited frames
+        graph += [
+            capture.filtergraph(f"v{i}", f"vout{i}") for i, capture in enumerate(thumbnails) if capture
+        ]
+        args += ["-filter_complex", ";".join(graph)]
+
+        for index, (_, _, output_path) in enumerate(outputs):
+            args += ["-map", f"[vout{index}]" if thumbnails[index] else f"[v{index}]"]
+            if audio_path:
+                args += ["-map", f"{count + 1}:a", "-c:a", "aac"]
+            args += self._encode_args(duration, output_path)
+            if thumbnails[index]:
+                args += thumbnails[index].output_args()
+        return args
+
+    def render_multi_format(
+        self,
+        source_path: Path,
+        outputs: List[Tuple[Tuple[int, int], Path, Path]],
+        audio_path: Optional[Path],
+        fps: int,
+        duration: float,
+        loop: bool = True,
+        thumbnails: Optional[Sequence[Optional[ThumbnailCapture]]] = None
+    ):
+        """
+        Render the same reel in several aspect ratios from a single decode of the source.
+
+        Args:
+            source_path: Source clip; looped if too short
+            outputs: (target_size, overlay_path, output_path) per format
+            audio_path: Optional voiceover muxed as AAC into every output
+            fps: Output frame rate
+            duration: Output duration in seconds
+            loop: Loop the source; only needed when it is shorter than duration
+            thumbnails: Optional capture per output, written by the same ffmpeg process
+
+        Raises:
+            FFmpegError: If ffmpeg fails
+        """
+        run_ffmpeg(
+            self.build_multi_format_command(source_path, outputs, audio_path, fps, duration, loop, thumbnails),
+            niceness=self.niceness
+        )
+        logger.info(f"ffmpeg multi-format render wrote {len(outputs)} outputs")
+
+    def build_segment_command(
+        self,
+        background_path: Path,
+        overlay_path: Path,
+        output_path: Path,
+        target_size: Tuple[int, int],
+        fps: int,
+        start_frame: int,
+        frame_count: int
+    ) -> list:
+        """
+        Return the ffmpeg arguments for one video-only segment of a segmented render.
+
+        The background must already cover the whole duration (no looping); it is
+        input-seeked to the segment start, and exactly frame_count frames are
+        encoded so that segments concatenate without gaps.
+        """
+        args = ["-threads", str(self.decoder_threads)] if self.decoder_threads else []
+        args += [
+            "-ss", f"{start_frame / fps:.6f}",
+            "-i", str(background_path),
+            "-i", str(overlay_path),
+            "-filter_complex", self.build_filtergraph(target_size, fps),
+            "-map", "[v]",
+            "-frames:v", str(frame_count),
+            "-an",
+            "-c:v", "libx264",
+            "-preset", self.preset,
+            "-crf", str(self.crf),
+        ]
+        if self.threads:
+            args += ["-threads", str(self.threads)]
+        return args + [str(output_path)]
+
+    def build_concat_command(
+        self,
+        list_path: Path,
+        audio_path: Optional[Path],
+        output_path: Path,
+        duration: float
+    ) -> list:
+        """Return the ffmpeg arguments that stream-copy concatenated segments and mux the audio once."""
+        args = ["-f", "concat", "-safe", "0", "-i", str(list_path)]
+        if audio_path:
+            args += ["-i", str(audio_path)]
+        args += ["-map", "0:v", "-c:v", "copy"]
+        if audio_path:
+            args += ["-map", "1:a", "-c:a", "aac"]
+        return args + ["-t", f"{duration:.3f}", *FASTSTART_ARGS, str(output_path)]
+
+    def concat_segments(
+        self,
+        segment_paths: List[Path],
+        audio_path: Optional[Path],
+        output_path: Path,
+        duration: float
+    ):
+        """
+        Join segments that each start on a keyframe with a stream copy, muxing the voiceover.
+
+        Raises:
+            FFmpegError: If ffmpeg fails
+        """
+        list_path = output_path.with_name(f"{output_path.stem}.segments.txt")
+        try:
+            with open(list_path, "w") as f:
+                for segment_path in segment_paths:
+                    escaped = str(Path(segment_path).resolve()).replace("'", "'\\''")
+                    f.write(f"file '{escaped}'\n")
+            run_ffmpeg(self.build_concat_command(list_path, audio_path, output_path, duration), niceness=self.niceness)
+        finally:
+            list_path.unlink(missing_ok=True)
+        logger.info(f"Concatenated {len(segment_paths)} segments into: {output_path}")
@@ -0,0 +1,54 @@
+import logging
+import shutil
+import subprocess
+from typing import List, Tuple
+
+from moviepy.config import FFMPEG_BINARY
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Served outputs put the moov atom first so browsers can start playback (and seek) before the download ends
+FASTSTART_ARGS = ["-movflags", "+faststart"]
+
+
+class FFmpegError(Exception):
+    """Custom exception for ffmpeg invocation errors"""
+    pass
+
+
+def ffmpeg_command(args: List[str]) -> List[str]:
+    """Return the full ffmpeg argv (bundled binary, overwrite, errors only) for args."""
+    return [FFMPEG_BINARY, "-y", "-hide_banner", "-loglevel", "error", *args]
+
+
+def run_ffmpeg(args: List[str], niceness: int = 0) -> None:
+    """
+    Run the ffmpeg binary bundled with MoviePy.
+
+    Args:
+        args: Arguments passed after the binary, without ``-y``/``-loglevel``
+        niceness: Scheduling priority increment for the ffmpeg process, applied
+            through ``nice`` when it is on PATH
+
+    Raises:
+        FFmpegError: If ffmpeg exits with a non-zero status
+    """
+    cmd = ffmpeg_command(args)
+    # Callers run in job threads, where a preexec_fn between fork and exec is not safe
+    nice = shutil.which("nice") if niceness else None
+    if nice:
+        cmd = [nice, "-n", str(niceness), *cmd]
+    logger.debug(f"Running: {' '.join(cmd)}")
+    result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    if result.returncode != 0:
+        raise FFmpegError(f"ffmpeg failed ({result.returncode}): {result.stderr.decode(errors='replace').strip()}")
+
+
+def cover_crop_filter(target_size: Tuple[int, int]) -> str:
+    """Return a filter that center-crops any input to the aspect ratio of target_size and scales it."""
+    target_w, target_h = target_size
+    return (
+        f"crop=w='min(iw,ih*{target_w}/{target_h})':h='min(ih,iw*{target_h}/{target_w})',"
+        f"scale={target_w}:{target_h},setsar=1"
+    )
@@ -0,0 +1,95 @@
+import logging
+import threading
+from typing import Callable, Dict
+
+import numpy as np
+from moviepy import VideoClip
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class FrameRing:
+    """
+    Bounded in-memory store of a short clip's decoded frames, keyed by frame index.
+
+    Looping replays frames in the same cyclic order, where LRU eviction would
+    drop every frame just before it is needed again. Frames are therefore kept
+    from the start of the clip until ``max_bytes`` is reached and the remainder
+    is decoded on every pass. Stored frames are read-only so callers that blend
+    in place have to copy them.
+    """
+
+    def __init__(self, frame_function: Callable[[float], np.ndarray], fps: float, duration: float, max_bytes: int):
+        self.frame_function = frame_function
+        self.fps = fps
+        self.duration = duration
+        self.frame_count = max(1, int(duration * fps))
+        self.max_bytes = max_bytes
+
+        self.hits = 0
+        self.misses = 0
+        self._bytes = 0
+        self._full = False
+        self._frames: Dict[int, np.ndarray] = {}
+        self._lock = threading.Lock()
+
+    def frame_index(self, t: float) -> int:
+        """Map output time to a source frame index, wrapping at the clip duration."""
+        return min(int((t % self.duration) * self.fps + 1e-6), self.frame_count - 1)
+
+    def get_frame(self, t: float) -> np.ndarray:
+        index = self.frame_index(t)
+        with self._lock:
+            frame = self._frames.get(index)
+            if frame is not None:
+                self.hits += 1
+                return frame
+            self.misses += 1
+
+        frame = self.frame_function(index / self.fps)
+        with self._lock:
+            if not self._full and index not in self._frames:
+                if self._bytes + frame.nbytes <= self.max_bytes:
+                    frame.flags.writeable = False
+                    self._frames[index] = frame
+                    self._bytes += frame.nbytes
+                else:
+                    self._full = True
+                    logger.info(
+                        f"Loop frame cache full at {len(self._frames)}/{self.frame_count} frames "
+                        f"({self._bytes / 1024 ** 2:.0f} MB); decoding the rest on each pass"
+                    )
+        return frame
+
+    def clear(self):
+        with self._lock:
+            self._frames.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "frames": len(self._frames),
+                "frame_count": self.frame_count,
+                "bytes": self._bytes,
+            }
+
+
+class LoopedClip(VideoClip):
+    """Video clip that plays ``source`` repeatedly by mapping output time to ``t mod source.duration``."""
+
+    def __init__(self, source: VideoClip, duration: float, max_bytes: int = 512 * 1024 ** 2):
+        fps = source.fps or 30
+        self.source = source
+        self.ring = FrameRing(source.get_frame, fps, source.duration, max_bytes)
+        super().__init__(frame_function=self.ring.get_frame, duration=duration)
+        self.fps = fps
+
+    def close(self):
+        logger.info(f"Looped background frame cache: {self.ring.stats()}")
+        self.ring.clear()
+        self.source.close()
+        super().close()
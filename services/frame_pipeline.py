@@ -0,0 +1,286 @@
+import logging
+import queue
+import subprocess
+import threading
+import time
+import tracemalloc
+from collections import deque
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from services.ffmpeg_utils import FASTSTART_ARGS, FFmpegError, ffmpeg_command
+from services.overlay import QuoteOverlay
+from services.thumbnails import ThumbnailCapture
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Last stderr lines of each ffmpeg process kept for error messages
+STDERR_TAIL_LINES = 20
+
+
+def cover_decode_size(source_size: Tuple[int, int], target_size: Tuple[int, int]) -> Tuple[int, int]:
+    """Return the smallest aspect-preserving (width, height) of the source that covers target_size."""
+    source_w, source_h = source_size
+    target_w, target_h = target_size
+    scale = max(target_w / source_w, target_h / source_h)
+    return max(target_w, round(source_w * scale)), max(target_h, round(source_h * scale))
+
+
+def _drain_stderr(process: subprocess.Popen) -> Tuple[threading.Thread, deque]:
+    """
+    Read a process's stderr on a thread, keeping only its last lines.
+
+    An undrained pipe fills up and blocks a verbose ffmpeg, which would then
+    never finish writing frames or exit.
+    """
+    tail: deque = deque(maxlen=STDERR_TAIL_LINES)
+
+    def drain():
+        with process.stderr:
+            for line in iter(process.stderr.readline, b""):
+                tail.append(line)
+
+    thread = threading.Thread(target=drain, name="ffmpeg-stderr", daemon=True)
+    thread.start()
+    return thread, tail
+
+
+def _tail_text(tail: deque) -> str:
+    return b"".join(tail).decode(errors="replace").strip()
+
+
+class FramePipeline:
+    """
+    Decode, composite and encode frames through a ring of preallocated buffers.
+
+    A decoder ffmpeg process writes raw RGB frames that are read straight into
+    the buffers with ``readinto``. The center crop is a view of the buffer, the
+    overlay is blended in place with a reused scratch array, and the frame is
+    handed to the encoder's stdin as a memoryview. Steady-state frames allocate
+    no frame-sized arrays; a reader thread keeps decoding ahead while the main
+    thread composites and encodes.
+    """
+
+    def __init__(self, buffers: int = 3, preset: str = "ultrafast", crf: int = 23, threads: Optional[int] = None):
+        self.buffers = max(2, buffers)
+        self.preset = preset
+        self.crf = crf
+        self.threads = threads
+
+    def decode_command(
+        self,
+        source_path: Path,
+        decode_size: Tuple[int, int],
+        fps: int,
+        start: float,
+        frame_count: int,
+        loop: bool
+    ) -> List[str]:
+        """Return ffmpeg arguments that emit frame_count raw RGB frames at decode_size on stdout."""
+        args = ["-stream_loop", "-1"] if loop else []
+        if start:
+            args += ["-ss", f"{start:.6f}"]
+        return args + [
+            "-i", str(source_path),
+            "-an",
+            "-vf", f"scale={decode_size[0]}:{decode_size[1]},setsar=1,fps={fps}",
+            "-frames:v", str(frame_count),
+            "-f", "rawvideo",
+            "-pix_fmt", "rgb24",
+            "-"
+        ]
+
+    def encode_command(
+        self,
+        frame_size: Tuple[int, int],
+        fps: int,
+        audio_path: Optional[Path],
+        output_path: Path,
+        duration: float
+    ) -> List[str]:
+        """Return ffmpeg arguments that encode raw RGB frames from stdin (plus optional audio) with libx264."""
+        args = [
+            "-f", "rawvideo",
+            "-pix_fmt", "rgb24",
+            "-s", f"{frame_size[0]}x{frame_size[1]}",
+            "-r", str(fps),
+            "-i", "-",
+        ]
+        if audio_path:
+            args += ["-i", str(audio_path), "-map", "0:v", "-map", "1:a", "-c:a", "aac"]
+        args += [
+            "-t", f"{duration:.3f}",
+            "-c:v", "libx264",
+            "-preset", self.preset,
+            "-crf", str(self.crf),
+            "-pix_fmt", "yuv420p",
+            *FASTSTART_ARGS,
+        ]
+        if self.threads:
+            args += ["-threads", str(self.threads)]
+        return args + [str(output_path)]
+
+    def render(
+        self,
+        source_path: Path,
+        source_size: Tuple[int, int],
+        overlay: QuoteOverlay,
+        audio_path: Optional[Path],
+        output_path: Path,
+        target_size: Tuple[int, int],
+        fps: int,
+        duration: float,
+        start_frame: int = 0,
+        frame_count: Optional[int] = None,
+        loop: bool = False,
+        trace_allocations: bool = False,
+        thumbnails: Optional[ThumbnailCapture] = None
+    ) -> Dict:
+        """
+        Render output_path by compositing overlay onto the source frames.
+
+        Args:
+            source_path: Background clip (normalized or raw source)
+            source_size: Source (width, height), used to decode just large enough to crop
+            overlay: Overlay positioned for target_size
+            audio_path: Optional voiceover muxed as AAC
+            output_path: Destination MP4
+            target_size: Output (width, height)
+            fps: Output frame rate
+            duration: Output duration in seconds
+            start_frame: First output frame (for segmented renders)
+            frame_count: Frames to render; defaults to duration * fps
+            loop: Loop the source; only needed when it is shorter than duration
+            trace_allocations: Measure per-frame transient allocations with tracemalloc
+            thumbnails: Receives each composited frame (by output frame number) for the poster/sprite
+
+        Returns:
+            Stats: frames written, seconds, and with trace_allocations the mean/max
+            bytes allocated per frame
+
+        Raises:
+            FFmpegError: If the decoder or encoder fails
+        """
+        frame_count = frame_count or int(round(duration * fps))
+        target_w, target_h = target_size
+        decode_w, decode_h = cover_decode_size(source_size, target_size)
+        x0, y0 = (decode_w - target_w) // 2, (decode_h - target_h) // 2
+
+        # Preallocated ring; the crop is a view into each buffer
+        frames = [np.empty((decode_h, decode_w, 3), dtype=np.uint8) for _ in range(self.buffers)]
+        crops = [frame[y0:y0 + target_h, x0:x0 + target_w] for frame in frames]
+        contiguous = crops[0].flags.c_contiguous
+        # Only a width crop leaves rows strided; those are packed into one reused output buffer
+        packed = None if contiguous else np.empty((target_h, target_w, 3), dtype=np.uint8)
+        scratch = overlay.new_scratch()
+        read_views = [memoryview(frame).cast("B") for frame in frames]
+        write_views = [memoryview(crop).cast("B") for crop in crops] if contiguous else [memoryview(packed).cast("B")]
+
+        decoder = subprocess.Popen(
+            ffmpeg_command(self.decode_command(
+                source_path, (decode_w, decode_h), fps, start_frame / fps, frame_count, loop
+            )),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            bufsize=0
+        )
+        encoder = subprocess.Popen(
+            ffmpeg_command(self.encode_command(
+                target_size, fps, audio_path, output_path, frame_count / fps
+            )),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE
+        )
+        decoder_drain, decoder_errors = _drain_stderr(decoder)
+        encoder_drain, encoder_errors = _drain_stderr(encoder)
+
+        free: "queue.Queue[Optional[int]]" = queue.Queue()
+        filled: "queue.Queue[Optional[int]]" = queue.Queue()
+        for index in range(self.buffers):
+            free.put(index)
+        stop = threading.Event()
+
+        def read_frames():
+            try:
+                for _ in range(frame_count):
+                    index = free.get()
+                    if index is None or stop.is_set():
+                        return
+                    view, size, read = read_views[index], len(read_views[index]), 0
+                    while read < size:
+                        chunk = decoder.stdout.readinto(view[read:])
+                        if not chunk:
+                            return
+                        read += chunk
+                    filled.put(index)
+            finally:
+                filled.put(None)
+
+        reader = threading.Thread(target=read_frames, name="frame-reader", daemon=True)
+        reader.start()
+
+        written, allocations = 0, []
+        started_tracing = trace_allocations and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        start = time.perf_counter()
+        try:
+            while True:
+                index = filled.get()
+                if index is None:
+                    break
+                if trace_allocations:
+                    tracemalloc.reset_peak()
+                    baseline = tracemalloc.get_traced_memory()[0]
+
+                crop = crops[index]
+                overlay.blend_into(crop, scratch)
+                if thumbnails:
+                    thumbnails.observe(start_frame + written, crop)
+                if contiguous:
+                    encoder.stdin.write(write_views[index])
+                else:
+                    np.copyto(packed, crop)
+                    encoder.stdin.write(write_views[0])
+
+                if trace_allocations:
+                    allocations.append(tracemalloc.get_traced_memory()[1] - baseline)
+                free.put(index)
+                written += 1
+        except BrokenPipeError:
+            pass
+        finally:
+            # All frames are read by now; killing the decoder also unblocks a reader stuck in readinto
+            stop.set()
+            free.put(None)
+            decoder.kill()
+            reader.join()
+            decoder.wait()
+            decoder.stdout.close()
+            try:
+                encoder.stdin.close()
+            except BrokenPipeError:
+                pass
+            encoder.wait()
+            decoder_drain.join()
+            encoder_drain.join()
+            if started_tracing:
+                tracemalloc.stop()
+
+        if encoder.returncode != 0:
+            raise FFmpegError(f"Encoder failed ({encoder.returncode}): {_tail_text(encoder_errors)}")
+        if written < frame_count:
+            error = _tail_text(decoder_errors)
+            if written == 0:
+                raise FFmpegError(f"Decoder produced no frames: {error}")
+            logger.warning(f"Decoder produced {written}/{frame_count} frames: {error}")
+
+        stats = {"frames": written, "seconds": round(time.perf_counter() - start, 3)}
+        if allocations:
+            stats["alloc_bytes_per_frame_mean"] = int(sum(allocations) / len(allocations))
+            stats["alloc_bytes_per_frame_max"] = max(allocations)
+        return stats
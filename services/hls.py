@@ -0,0 +1,159 @@
+import logging
+import os
+import shutil
+import uuid
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+from services.ffmpeg_utils import run_ffmpeg
+from services.probe import probe_video
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Rungs named by their short side, so 720 is 720x1280 for a 9:16 reel and 1280x720 for 16:9
+DEFAULT_LADDER = (360, 720, 1080)
+# Video bitrate per pixel per frame; ~0.55/2.2/5 Mbit/s for 360p/720p/1080p at 30 fps
+BITS_PER_PIXEL = 0.08
+AUDIO_BITRATE = "96k"
+MASTER_PLAYLIST = "master.m3u8"
+
+
+def ladder_sizes(frame_size: Tuple[int, int], ladder: Sequence[int]) -> List[Tuple[str, int, int]]:
+    """
+    Return (name, width, height) for every rung no larger than frame_size.
+
+    Dimensions keep the aspect ratio and are rounded to even numbers for yuv420p.
+    A frame smaller than every rung gets a single rung at its own size.
+    """
+    width, height = frame_size
+    short = min(width, height)
+    sizes = []
+    for rung in sorted(set(ladder)):
+        if rung > short:
+            continue
+        scale = rung / short
+        sizes.append((f"{rung}p", round(width * scale / 2) * 2, round(height * scale / 2) * 2))
+    return sizes or [(f"{short}p", width - width % 2, height - height % 2)]
+
+
+class HLSPackager:
+    """
+    Segments rendered videos into an HLS rendition ladder for in-browser previews.
+
+    Each video gets ``<hls_dir>/<stem>/master.m3u8`` plus one media playlist and
+    set of MPEG-TS segments per rung. All rungs are encoded in one ffmpeg
+    process from a single decode, with keyframes at every segment boundary so
+    players can switch rungs between segments. The ladder is written to a
+    scratch directory and renamed into place, so a playlist is never served
+    half-written.
+    """
+
+    def __init__(
+        self,
+        hls_dir: Path,
+        ladder: Sequence[int] = DEFAULT_LADDER,
+        segment_seconds: int = 2,
+        preset: str = "veryfast"
+    ):
+        self.hls_dir = Path(hls_dir)
+        self.hls_dir.mkdir(parents=True, exist_ok=True)
+        self.ladder = tuple(ladder)
+        self.segment_seconds = segment_seconds
+        self.preset = preset
+
+    def playlist_path(self, video_path: Path) -> Path:
+        """Master playlist location for a rendered video (it may not exist yet)."""
+        return self.hls_dir / Path(video_path).stem / MASTER_PLAYLIST
+
+    def lookup(self, video_path: Path) -> Optional[Path]:
+        """Return the master playlist of video_path if it has been packaged."""
+        path = self.playlist_path(video_path)
+        return path if path.exists() else None
+
+    def build_command(
+        self,
+        video_path: Path,
+        work_dir: Path,
+        frame_size: Tuple[int, int],
+        fps: float,
+        has_audio: bool
+    ) -> list:
+        """Return the ffmpeg arguments that encode every rung and write the playlists into work_dir."""
+        sizes = ladder_sizes(frame_size, self.ladder)
+        gop = max(1, round(fps * self.segment_seconds))
+
+        labels = "".join(f"[v{i}]" for i in range(len(sizes)))
+        graph = [f"[0:v]split={len(sizes)}{labels}"]
+        graph += [f"[v{i}]scale={w}:{h},setsar=1[out{i}]" for i, (_, w, h) in enumerate(sizes)]
+
+        args = ["-i", str(video_path), "-filter_complex", ";".join(graph)]
+        stream_map = []
+        for i, (name, w, h) in enumerate(sizes):
+            bitrate = round(w * h * fps * BITS_PER_PIXEL / 1000)
+            args += ["-map", f"[out{i}]"]
+            args += [
+                f"-b:v:{i}", f"{bitrate}k",
+                f"-maxrate:v:{i}", f"{round(bitrate * 1.1)}k",
+                f"-bufsize:v:{i}", f"{bitrate * 2}k",
+            ]
+            if has_audio:
+                args += ["-map", "0:a:0"]
+            stream_map.append(f"v:{i},a:{i},name:{name}" if has_audio else f"v:{i},name:{name}")
+
+        args += [
+            "-c:v", "libx264",
+            "-preset", self.preset,
+            "-pix_fmt", "yuv420p",
+            "-g", str(gop),
+            "-keyint_min", str(gop),
+            "-sc_threshold", "0",
+        ]
+        if has_audio:
+            args += ["-c:a", "aac", "-b:a", AUDIO_BITRATE, "-ac", "2"]
+        return args + [
+            "-f", "hls",
+            "-hls_time", str(self.segment_seconds),
+            "-hls_playlist_type", "vod",
+            "-hls_flags", "independent_segments",
+            "-hls_segment_filename", str(work_dir / "%v" / "segment_%03d.ts"),
+            "-master_pl_name", MASTER_PLAYLIST,
+            "-var_stream_map", " ".join(stream_map),
+            str(work_dir / "%v" / "index.m3u8")
+        ]
+
+    def package(self, video_path: Path) -> Path:
+        """
+        Package a rendered video as an HLS ladder, replacing any earlier one.
+
+        Args:
+            video_path: Rendered MP4
+
+        Returns:
+            Path of the master playlist
+
+        Raises:
+            FFmpegError: If ffmpeg fails
+            VideoProbeError: If the video cannot be read
+        """
+        video_path = Path(video_path)
+        info = probe_video(video_path, min_duration=0, min_size=0)
+        work_dir = self.hls_dir / f".{video_path.stem}.{uuid.uuid4().hex}.part"
+        work_dir.mkdir(parents=True)
+        try:
+            run_ffmpeg(self.build_command(
+                video_path, work_dir, (info["width"], info["height"]), info["fps"], info["has_audio"]
+            ))
+            final_dir = self.hls_dir / video_path.stem
+            if final_dir.exists():
+                shutil.rmtree(final_dir)
+            os.replace(work_dir, final_dir)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+        logger.info(f"HLS ladder for {video_path.name}: {final_dir / MASTER_PLAYLIST}")
+        return final_dir / MASTER_PLAYLIST
+
+    def remove(self, video_path: Path):
+        """Delete the ladder of video_path, if any."""
+        shutil.rmtree(self.hls_dir / Path(video_path).stem, ignore_errors=True)
@@ -0,0 +1,247 @@
+import logging
+import math
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+from services.progress import report_progress
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+# Run time assumed for the wait estimate until a job has finished
+DEFAULT_JOB_SECONDS = 60.0
+# Recent jobs averaged for the wait and run time estimates
+TIMING_WINDOW = 50
+
+
+class JobQueueError(Exception):
+    """Custom exception for job queue errors"""
+    pass
+
+
+class JobQueueFullError(JobQueueError):
+    """Custom exception for jobs rejected because the queue is full"""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class JobQueue:
+    """
+    Runs long requests (renders) on a bounded worker pool and tracks their state.
+
+    Each job records its status (queued, running, done, failed), the latest
+    stage progress and its result or error, plus an ordered event log that
+    clients can follow: every status change and progress update is appended
+    with a sequence number, and ``wait_events`` blocks until events after a
+    given sequence number arrive (used for Server-Sent Events). Finished jobs
+    are kept for ``ttl`` seconds.
+
+    Submissions with the same ``key`` while a job for it is queued or running
+    share that job instead of starting another (e.g. double-clicked requests).
+
+    At most ``max_queue`` jobs wait for a worker; further submissions are
+    rejected with JobQueueFullError carrying a retry-after estimate, so a
+    burst is turned away instead of slowing every queued job down.
+    """
+
+    STATUSES = ("queued", "running", "done", "failed")
+
+    def __init__(self, max_workers: int = 2, ttl: float = 3600, max_queue: Optional[int] = None):
+        self.max_workers = max_workers
+        self.ttl = ttl
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs: Dict[str, Dict] = {}
+        self._events: Dict[str, List[Dict]] = {}
+        # Coalescing key -> id of the unfinished job for it
+        self._active: Dict[str, str] = {}
+        self._condition = threading.Condition()
+        # Seconds recent jobs spent queued and running
+        self._wait_times = deque(maxlen=TIMING_WINDOW)
+        self._run_times = deque(maxlen=TIMING_WINDOW)
+
+    def submit(self, kind: str, fn: Callable[..., Dict], *args, key: Optional[str] = None, **kwargs) -> Dict:
+        """
+        Queue fn(*args, **kwargs) and return the new job.
+
+        With a key, an unfinished job submitted with the same key is returned
+        instead (its "requests" count goes up) and fn is not queued again.
+
+        fn runs on a worker thread; the dict it returns becomes the job's result,
+        and an exception marks the job failed with its message as the error.
+        Stage progress it reports through services.progress is recorded on the job.
+
+        Raises:
+            JobQueueFullError: If max_queue jobs are already waiting
+        """
+        job_id = uuid.uuid4().hex
+        job = {
+            "id": job_id,
+            "kind": kind,
+            "key": key,
+            "requests": 1,
+            "status": "queued",
+            "created": time.time(),
+            "started": None,
+            "finished": None,
+            "progress": None,
+            "result": None,
+            "error": None,
+        }
+        with self._condition:
+            self._prune()
+            if key and key in self._active:
+                existing = self._jobs[self._active[key]]
+                existing["requests"] += 1
+                logger.info(f"Coalesced {kind} request into job {existing['id']}")
+                return dict(existing)
+            queued = self._count("queued")
+            if self.max_queue is not None and queued >= self.max_queue:
+                retry_after = max(1, math.ceil(self._mean(self._run_times, DEFAULT_JOB_SECONDS) / self.max_workers))
+                raise JobQueueFullError(f"Job queue is full ({queued} waiting)", retry_after)
+            self._jobs[job_id] = job
+            if key:
+                self._active[key] = job_id
+            self._events[job_id] = []
+            self._append_event(job_id, "status", {"status": "queued"})
+        self._executor.submit(self._run, job_id, fn, args, kwargs)
+        logger.info(f"Queued {kind} job {job_id}")
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """Return a snapshot of a job, or None if it is unknown or expired."""
+        with self._condition:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def wait_events(self, job_id: str, after: int = 0, timeout: Optional[float] = None) -> List[Dict]:
+        """
+        Return the job's events with a sequence number above `after`, waiting up
+        to timeout seconds for one to arrive. Returns an empty list on timeout.
+
+        Raises:
+            JobQueueError: If the job is unknown or expired
+        """
+        with self._condition:
+            if job_id not in self._events:
+                raise JobQueueError(f"Job not found: {job_id}")
+            self._condition.wait_for(
+                lambda: job_id not in self._events or (self._events[job_id] and self._events[job_id][-1]["seq"] > after),
+                timeout
+            )
+            return [event for event in self._events.get(job_id, []) if event["seq"] > after]
+
+    def unfinished(self) -> List[Dict]:
+        """Return snapshots of the queued and running jobs."""
+        with self._condition:
+            return [dict(job) for job in self._jobs.values() if job["status"] in ("queued", "running")]
+
+    def is_finished(self, job_id: str) -> bool:
+        job = self.get(job_id)
+        return job is None or job["status"] in ("done", "failed")
+
+    def stats(self) -> Dict:
+        """
+        Return job counts by status plus queue depth and wait times.
+
+        wait_seconds_mean is how long recent jobs waited for a worker, and
+        estimated_wait_seconds how long a job submitted now would wait
+        (recent mean run time per round of workers ahead of it).
+        """
+        with self._condition:
+            stats = {status: self._count(status) for status in self.STATUSES}
+            queued_since = [job["created"] for job in self._jobs.values() if job["status"] == "queued"]
+            run_seconds = self._mean(self._run_times, DEFAULT_JOB_SECONDS)
+            busy = stats["running"] + stats["queued"]
+            stats.update({
+                "workers": self.max_workers,
+                "queue_depth": stats["queued"],
+                "max_queue": self.max_queue,
+                "oldest_queued_seconds": round(time.time() - min(queued_since), 3) if queued_since else 0.0,
+                "wait_seconds_mean": round(self._mean(self._wait_times, 0.0), 3),
+                "run_seconds_mean": round(run_seconds, 3),
+                "estimated_wait_seconds": round(
+                    (busy // self.max_workers) * run_seconds if busy >= self.max_workers else 0.0, 3
+                )
+            })
+            return stats
+
+    def _count(self, status: str) -> int:
+        return sum(1 for job in self._jobs.values() if job["status"] == status)
+
+    @staticmethod
+    def _mean(values, default: float) -> float:
+        return sum(values) / len(values) if values else default
+
+    def shutdown(self, wait: bool = False):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+    def _append_event(self, job_id: str, event: str, data: Dict):
+        # Called with the condition held
+        events = self._events[job_id]
+        events.append({"seq": len(events) + 1, "event": event, "data": data})
+        self._condition.notify_all()
+
+    def _update(self, job_id: str, event: Optional[Tuple[str, Dict]] = None, **fields):
+        with self._condition:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            job.update(fields)
+            if job["status"] in ("done", "failed") and job["key"] and self._active.get(job["key"]) == job_id:
+                del self._active[job["key"]]
+            if event:
+                self._append_event(job_id, *event)
+
+    def _run(self, job_id: str, fn: Callable[..., Dict], args: tuple, kwargs: dict):
+        started = time.time()
+        with self._condition:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                self._wait_times.append(started - job["created"])
+        self._update(job_id, ("status", {"status": "running"}), status="running", started=started)
+
+        def on_progress(stage: str, n: float, total: Optional[float]):
+            progress = {"stage": stage, "n": n, "total": total}
+            self._update(job_id, ("progress", progress), progress=progress)
+
+        try:
+            with report_progress(on_progress):
+                result = fn(*args, **kwargs)
+        except Exception as e:
+            logger.error(f"Job {job_id} failed: {e}", exc_info=True)
+            with self._condition:
+                self._run_times.append(time.time() - started)
+            self._update(
+                job_id, ("status", {"status": "failed", "error": str(e)}),
+                status="failed", error=str(e), finished=time.time()
+            )
+            return
+
+        with self._condition:
+            self._run_times.append(time.time() - started)
+        self._update(
+            job_id, ("status", {"status": "done", "result": result}),
+            status="done", result=result, finished=time.time()
+        )
+        logger.info(f"Job {job_id} done")
+
+    def _prune(self):
+        # Called with the condition held; drops finished jobs older than ttl
+        cutoff = time.time() - self.ttl
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job["finished"] is not None and job["finished"] < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+            del self._events[job_id]
+        if expired:
+            self._condition.notify_all()
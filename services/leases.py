@@ -0,0 +1,100 @@
+import contextvars
+import json
+import logging
+import os
+import threading
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional, Set
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class Lease:
+    """Files one running render reads or writes, kept in a lease file while the render runs."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.files: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def add(self, *paths: Path):
+        # Pre-render stages add from their own threads
+        with self._lock:
+            new = {str(Path(path).resolve()) for path in paths if path} - self.files
+            if not new:
+                return
+            self.files |= new
+            tmp_path = self.path.with_suffix(".tmp")
+            with open(tmp_path, "w") as f:
+                json.dump({"pid": os.getpid(), "files": sorted(self.files)}, f)
+            os.replace(tmp_path, self.path)
+
+
+_lease: contextvars.ContextVar[Optional[Lease]] = contextvars.ContextVar("file_lease", default=None)
+
+
+class FileLeases:
+    """
+    Registry of the files running renders use, shared by every process with the same ``leases_dir``.
+
+    A render holds a lease for its duration and adds its inputs and outputs to
+    it with ``use`` as it learns them; ``paths`` lists the files of every lease
+    whose process is still alive, so cleanup in another process (retention)
+    leaves them alone. Leases of processes that died are removed.
+    """
+
+    def __init__(self, leases_dir: Path):
+        self.leases_dir = Path(leases_dir)
+        self.leases_dir.mkdir(parents=True, exist_ok=True)
+
+    @contextmanager
+    def hold(self, *paths: Path):
+        """Hold a lease on paths for the duration of the block; ``use`` adds to it from this context."""
+        lease = Lease(self.leases_dir / f"{os.getpid()}_{uuid.uuid4().hex}.json")
+        lease.add(*paths)
+        token = _lease.set(lease)
+        try:
+            yield lease
+        finally:
+            _lease.reset(token)
+            lease.path.unlink(missing_ok=True)
+
+    def paths(self) -> Set[Path]:
+        """Return the files leased by live processes."""
+        files: Set[Path] = set()
+        for lease_path in self.leases_dir.glob("*.json"):
+            try:
+                with open(lease_path) as f:
+                    data = json.load(f)
+                pid = data["pid"]
+            except FileNotFoundError:
+                continue
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                logger.warning(f"Ignoring unreadable lease {lease_path}: {e}")
+                continue
+            if not _alive(pid):
+                logger.info(f"Dropping lease {lease_path.name} of exited process {pid}")
+                lease_path.unlink(missing_ok=True)
+                continue
+            files.update(Path(path) for path in data.get("files", []))
+        return files
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def use(*paths: Path):
+    """Add paths to the lease held in the current context (and contexts copied from it), if any."""
+    lease = _lease.get()
+    if lease is not None:
+        lease.add(*paths)
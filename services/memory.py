@@ -0,0 +1,245 @@
+import logging
+import multiprocessing
+import os
+import resource
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+PROC = Path("/proc")
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+# Fixed per-process overhead of an ffmpeg decode/encode (libraries, codec state), beyond frame buffers
+FFMPEG_PROCESS_BYTES = 96 * 1024 ** 2
+# Frames an H.264 decoder keeps alive (DPB plus output queue) and an ultrafast x264 encoder references
+DECODER_REFERENCE_FRAMES = 8
+ENCODER_REFERENCE_FRAMES = 4
+
+
+class MemoryBudgetError(Exception):
+    """Custom exception for memory budget errors"""
+    pass
+
+
+def _process_rss(pid: int) -> int:
+    try:
+        with open(PROC / str(pid) / "statm") as f:
+            return int(f.read().split()[1]) * PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def _descendant_pids(pid: int) -> List[int]:
+    """Return every descendant of pid, using /proc/<pid>/task/*/children when the kernel provides it."""
+    children_by_parent: Optional[Dict[int, List[int]]] = None
+    found, pending = [], [pid]
+    while pending:
+        parent = pending.pop()
+        children = []
+        task_files = list((PROC / str(parent) / "task").glob("*/children"))
+        if task_files:
+            for task_file in task_files:
+                try:
+                    children += [int(child) for child in task_file.read_text().split()]
+                except (OSError, ValueError):
+                    pass
+        else:
+            if children_by_parent is None:
+                children_by_parent = {}
+                for stat in PROC.glob("[0-9]*/stat"):
+                    try:
+                        # The command name may contain spaces; fields resume after its closing paren
+                        ppid = int(stat.read_text().rsplit(")", 1)[1].split()[1])
+                        children_by_parent.setdefault(ppid, []).append(int(stat.parent.name))
+                    except (OSError, ValueError, IndexError):
+                        pass
+            children = children_by_parent.get(parent, [])
+        found += children
+        pending += children
+    return found
+
+
+def process_tree_rss() -> int:
+    """Resident set size of this process plus its child processes (ffmpeg readers/writers), in bytes."""
+    pid = os.getpid()
+    return _process_rss(pid) + sum(_process_rss(child) for child in _descendant_pids(pid))
+
+
+class RSSMonitor:
+    """
+    Samples the RSS of this process and its children while a render runs.
+
+    Used as a context manager; ``peak_bytes`` holds the highest sample and
+    ``baseline_bytes`` the RSS when the render started. The samples are
+    process-wide (``scope``): renders running concurrently in the same
+    process, and their ffmpeg processes, are counted too, so the difference
+    is what the render added only when it ran alone (as in a render worker).
+    Where /proc is unavailable it falls back to getrusage maxima, which are
+    process-lifetime rather than per-render peaks.
+    """
+
+    # What the samples cover, reported alongside them in render stats
+    scope = "process"
+
+    def __init__(self, interval: float = 0.1):
+        self.interval = interval
+        self.peak_bytes = 0
+        self.baseline_bytes = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._use_proc = (PROC / str(os.getpid()) / "statm").exists()
+
+    def _sample(self):
+        self.peak_bytes = max(self.peak_bytes, process_tree_rss())
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def __enter__(self) -> "RSSMonitor":
+        if self._use_proc:
+            self._sample()
+            self.baseline_bytes = self.peak_bytes
+            self._thread = threading.Thread(target=self._run, name="rss-monitor", daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._thread:
+            self._stop.set()
+            self._thread.join()
+            self._sample()
+        else:
+            # ru_maxrss is KiB on Linux and bytes on macOS
+            scale = 1 if sys.platform == "darwin" else 1024
+            self.peak_bytes = max(
+                resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+            ) * scale
+        return False
+
+
+def estimate_render_bytes(
+    source_size: Tuple[int, int],
+    target_size: Tuple[int, int],
+    engine: str,
+    decoder_threads: int,
+    encoder_threads: int,
+    loop_cache_bytes: int = 0
+) -> int:
+    """
+    Estimate the frame-buffer and reader memory of one render.
+
+    Args:
+        source_size: Decoded (width, height) of the background input
+        target_size: Output (width, height)
+        engine: "moviepy", "ffmpeg" or "pipeline"
+        decoder_threads: Frame threads of the background decoder; each holds a frame
+        encoder_threads: libx264 threads; each holds a frame in flight
+        loop_cache_bytes: Budget of the in-memory loop ring (MoviePy fallback only)
+
+    Returns:
+        Estimated bytes
+    """
+    source_yuv = source_size[0] * source_size[1] * 3 // 2
+    target_yuv = target_size[0] * target_size[1] * 3 // 2
+    target_rgb = target_size[0] * target_size[1] * 3
+
+    decoder = source_yuv * (DECODER_REFERENCE_FRAMES + decoder_threads)
+    encoder = target_yuv * (ENCODER_REFERENCE_FRAMES + encoder_threads)
+    if engine == "ffmpeg":
+        # One process: decoder, crop/scale/overlay frames, encoder
+        return FFMPEG_PROCESS_BYTES + decoder + target_yuv * 4 + encoder
+
+    # Reader and writer processes, RGB frames piped through Python: MoviePy's read, blend copy and
+    # write, or the pipeline's ring of reused buffers plus a packed output frame
+    python_frames = target_rgb * 4
+    return 2 * FFMPEG_PROCESS_BYTES + decoder + python_frames + encoder + loop_cache_bytes
+
+
+class MemoryBudget:
+    """
+    Admission control for concurrent renders: each render reserves its estimated
+    memory and waits while the reservations in flight would exceed ``max_bytes``.
+    A render larger than the whole budget runs once nothing else is reserved.
+
+    Reservations live in shared memory, so processes forked after the budget
+    is created (render workers) all reserve against the same total. Each one
+    is recorded with its process id; ``release_process`` returns what a
+    process that died still held.
+    """
+
+    # Reservations that can be held at once, across all processes
+    SLOTS = 64
+
+    def __init__(self, max_bytes: int):
+        if max_bytes <= 0:
+            raise MemoryBudgetError(f"Memory budget must be positive, got {max_bytes}")
+        self.max_bytes = max_bytes
+        self._condition = multiprocessing.Condition()
+        # (pid, bytes) per slot; pid 0 marks a free slot. Only accessed under the condition.
+        self._slots = multiprocessing.Array("q", 2 * self.SLOTS, lock=False)
+
+    @property
+    def reserved(self) -> int:
+        with self._condition:
+            return sum(self._slots[1::2])
+
+    def available(self) -> int:
+        with self._condition:
+            return self.max_bytes - self.reserved
+
+    def _free_slot(self) -> Optional[int]:
+        pids = self._slots[0::2]
+        return pids.index(0) if 0 in pids else None
+
+    @contextmanager
+    def reserve(self, nbytes: int, timeout: Optional[float] = None):
+        """
+        Reserve nbytes for the duration of the block.
+
+        Raises:
+            MemoryBudgetError: If the reservation could not be made within timeout
+        """
+        nbytes = min(nbytes, self.max_bytes)
+        start = time.perf_counter()
+        with self._condition:
+            fits = lambda: self.reserved + nbytes <= self.max_bytes and self._free_slot() is not None
+            if not self._condition.wait_for(fits, timeout):
+                raise MemoryBudgetError(
+                    f"Timed out waiting for {nbytes / 1024 ** 2:.0f} MB of render memory "
+                    f"({self.reserved / 1024 ** 2:.0f}/{self.max_bytes / 1024 ** 2:.0f} MB reserved)"
+                )
+            slot = self._free_slot()
+            self._slots[2 * slot] = os.getpid()
+            self._slots[2 * slot + 1] = nbytes
+        waited = time.perf_counter() - start
+        if waited > 0.01:
+            logger.info(f"Waited {waited:.2f}s for {nbytes / 1024 ** 2:.0f} MB of render memory")
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._slots[2 * slot] = 0
+                self._slots[2 * slot + 1] = 0
+                self._condition.notify_all()
+
+    def release_process(self, pid: int) -> int:
+        """Drop the reservations of a process that exited without releasing them; returns the bytes freed."""
+        freed = 0
+        with self._condition:
+            for slot in range(self.SLOTS):
+                if self._slots[2 * slot] == pid:
+                    freed += self._slots[2 * slot + 1]
+                    self._slots[2 * slot] = 0
+                    self._slots[2 * slot + 1] = 0
+            if freed:
+                logger.warning(f"Released {freed / 1024 ** 2:.0f} MB of render memory held by exited process {pid}")
+                self._condition.notify_all()
+        return freed
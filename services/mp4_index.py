@@ -0,0 +1,167 @@
+"""
+Just enough ISO-BMFF (MP4) parsing to find which bytes of a file hold its
+first N seconds: walk boxes, read each track's sample tables from ``moov``
+and map the leading samples to absolute file offsets.
+"""
+import struct
+from typing import Iterator, List, Optional, Tuple
+
+
+class MP4IndexError(Exception):
+    """Custom exception for MP4 files whose sample index cannot be used"""
+    pass
+
+
+def parse_box_header(data: bytes, offset: int = 0) -> Tuple[str, int, int]:
+    """
+    Parse the box header at offset.
+
+    Returns:
+        Tuple of (box type, header size, box size); a box size of 0 means "to end of file"
+    """
+    if len(data) < offset + 8:
+        raise MP4IndexError("Truncated box header")
+    size, box_type = struct.unpack_from(">I4s", data, offset)
+    header_size = 8
+    if size == 1:
+        if len(data) < offset + 16:
+            raise MP4IndexError("Truncated 64-bit box header")
+        size = struct.unpack_from(">Q", data, offset + 8)[0]
+        header_size = 16
+    return box_type.decode("latin-1"), header_size, size
+
+
+def iter_boxes(data: bytes, start: int = 0, end: Optional[int] = None) -> Iterator[Tuple[str, int, int]]:
+    """Yield (type, payload start, box end) for the sibling boxes in data[start:end]."""
+    end = len(data) if end is None else end
+    offset = start
+    while offset + 8 <= end:
+        box_type, header_size, size = parse_box_header(data, offset)
+        box_end = end if size == 0 else offset + size
+        if box_end > end or size and size < header_size:
+            raise MP4IndexError(f"Box {box_type!r} overruns its parent")
+        yield box_type, offset + header_size, box_end
+        offset = box_end
+
+
+def _children(data: bytes, start: int, end: int, box_type: str) -> List[Tuple[int, int]]:
+    return [(s, e) for t, s, e in iter_boxes(data, start, end) if t == box_type]
+
+
+def _child(data: bytes, start: int, end: int, box_type: str) -> Optional[Tuple[int, int]]:
+    found = _children(data, start, end, box_type)
+    return found[0] if found else None
+
+
+def _track_sample_ends(moov: bytes, start: int, end: int, seconds: float) -> Optional[int]:
+    """Return the file offset just past the last sample of this track that starts before seconds."""
+    mdia = _child(moov, start, end, "mdia")
+    if not mdia:
+        return None
+    mdhd = _child(moov, *mdia, "mdhd")
+    minf = _child(moov, *mdia, "minf")
+    stbl = _child(moov, *minf, "stbl") if minf else None
+    if not mdhd or not stbl:
+        return None
+
+    version = moov[mdhd[0]]
+    timescale = struct.unpack_from(">I", moov, mdhd[0] + (20 if version == 1 else 12))[0]
+    if not timescale:
+        raise MP4IndexError("Track has no timescale")
+    limit = seconds * timescale
+
+    # stts: how many samples start before the limit (decode order)
+    stts = _child(moov, *stbl, "stts")
+    if not stts:
+        raise MP4IndexError("Track has no stts")
+    (entry_count,) = struct.unpack_from(">I", moov, stts[0] + 4)
+    needed, elapsed = 0, 0
+    for i in range(entry_count):
+        count, delta = struct.unpack_from(">II", moov, stts[0] + 8 + i * 8)
+        if delta == 0:
+            needed += count
+            continue
+        take = min(count, max(0, int(-(-(limit - elapsed) // delta))))
+        needed += take
+        elapsed += take * delta
+        if take < count:
+            break
+    if needed == 0:
+        return None
+
+    # stsz: per-sample sizes
+    stsz = _child(moov, *stbl, "stsz")
+    if not stsz:
+        raise MP4IndexError("Track has no stsz")
+    uniform_size, sample_count = struct.unpack_from(">II", moov, stsz[0] + 4)
+    needed = min(needed, sample_count)
+
+    def sample_size(index: int) -> int:
+        if uniform_size:
+            return uniform_size
+        return struct.unpack_from(">I", moov, stsz[0] + 12 + index * 4)[0]
+
+    # stco/co64: chunk offsets
+    stco = _child(moov, *stbl, "stco")
+    co64 = _child(moov, *stbl, "co64")
+    if stco:
+        (chunk_count,) = struct.unpack_from(">I", moov, stco[0] + 4)
+        chunk_offsets = struct.unpack_from(f">{chunk_count}I", moov, stco[0] + 8)
+    elif co64:
+        (chunk_count,) = struct.unpack_from(">I", moov, co64[0] + 4)
+        chunk_offsets = struct.unpack_from(f">{chunk_count}Q", moov, co64[0] + 8)
+    else:
+        raise MP4IndexError("Track has no chunk offsets")
+
+    # stsc: samples per chunk, as runs starting at first_chunk (1-based)
+    stsc = _child(moov, *stbl, "stsc")
+    if not stsc:
+        raise MP4IndexError("Track has no stsc")
+    (run_count,) = struct.unpack_from(">I", moov, stsc[0] + 4)
+    runs = [struct.unpack_from(">III", moov, stsc[0] + 8 + i * 12)[:2] for i in range(run_count)]
+
+    max_end, sample = 0, 0
+    for run_index, (first_chunk, samples_per_chunk) in enumerate(runs):
+        last_chunk = runs[run_index + 1][0] - 1 if run_index + 1 < len(runs) else chunk_count
+        for chunk in range(first_chunk, last_chunk + 1):
+            offset = chunk_offsets[chunk - 1]
+            for _ in range(samples_per_chunk):
+                if sample >= needed:
+                    return max_end
+                size = sample_size(sample)
+                max_end = max(max_end, offset + size)
+                offset += size
+                sample += 1
+    return max_end
+
+
+def leading_byte_end(moov: bytes, seconds: float) -> int:
+    """
+    Return the absolute file offset that covers every track's samples for the first seconds.
+
+    Args:
+        moov: Full ``moov`` box, header included
+        seconds: Leading duration to cover
+
+    Raises:
+        MP4IndexError: If the file is fragmented or its sample tables are unusable
+    """
+    box_type, header_size, size = parse_box_header(moov)
+    if box_type != "moov":
+        raise MP4IndexError(f"Expected moov, got {box_type!r}")
+    end = len(moov) if size == 0 else size
+    if _child(moov, header_size, end, "mvex"):
+        raise MP4IndexError("Fragmented MP4 has no global sample index")
+
+    ends = []
+    try:
+        for trak_start, trak_end in _children(moov, header_size, end, "trak"):
+            track_end = _track_sample_ends(moov, trak_start, trak_end, seconds)
+            if track_end:
+                ends.append(track_end)
+    except struct.error as e:
+        raise MP4IndexError(f"Corrupt sample table: {e}")
+
+    if not ends:
+        raise MP4IndexError("No samples found in moov")
+    return max(ends)
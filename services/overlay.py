@@ -0,0 +1,155 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, Tuple
+
+import numpy as np
+from PIL import Image
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class QuoteOverlay:
+    """
+    A quote/author overlay rasterized once and blended into frames by region.
+
+    Only the bounding box of the non-transparent pixels is kept, as premultiplied
+    color plus inverse alpha, so per-frame blending touches that region alone.
+    """
+
+    def __init__(self, key: str, rgba: np.ndarray, frame_size: Tuple[int, int]):
+        self.key = key
+        self.rgba = rgba  # straight alpha, full text image (used for PNG export)
+        frame_w, frame_h = frame_size
+        full_h, full_w = rgba.shape[:2]
+
+        # Overlay is centered on the frame, like with_position("center")
+        origin_x = (frame_w - full_w) // 2
+        origin_y = (frame_h - full_h) // 2
+
+        ys, xs = np.nonzero(rgba[..., 3])
+        if ys.size == 0:
+            y0 = y1 = x0 = x1 = 0
+        else:
+            y0, y1 = ys.min(), ys.max() + 1
+            x0, x1 = xs.min(), xs.max() + 1
+
+        # Clip the bounding box to the frame
+        y0, y1 = max(y0, -origin_y), min(y1, frame_h - origin_y)
+        x0, x1 = max(x0, -origin_x), min(x1, frame_w - origin_x)
+        y1, x1 = max(y0, y1), max(x0, x1)
+
+        region = rgba[y0:y1, x0:x1]
+        alpha = region[..., 3:4].astype(np.float32) / 255.0
+        self.premultiplied = region[..., :3].astype(np.float32) * alpha
+        # Expanded to all three channels: a broadcast multiply would allocate a buffer per call
+        self.inverse_alpha = np.repeat(1.0 - alpha, 3, axis=2)
+        self.x = int(origin_x + x0)
+        self.y = int(origin_y + y0)
+        self.w = int(x1 - x0)
+        self.h = int(y1 - y0)
+
+    def new_scratch(self) -> np.ndarray:
+        """Return a float32 work buffer for blend_into, reusable across frames."""
+        return np.empty((self.h, self.w, 3), dtype=np.float32)
+
+    def blend_into(self, frame: np.ndarray, scratch: np.ndarray):
+        """Blend the overlay into a writable RGB frame in place, using scratch instead of temporaries."""
+        if self.w == 0 or self.h == 0:
+            return
+        roi = frame[self.y:self.y + self.h, self.x:self.x + self.w]
+        # Casting copies rather than a mixed-type multiply, which would allocate cast buffers
+        np.copyto(scratch, roi)
+        scratch *= self.inverse_alpha
+        scratch += self.premultiplied
+        np.rint(scratch, out=scratch)
+        np.copyto(roi, scratch, casting="unsafe")
+
+    def blend(self, frame: np.ndarray) -> np.ndarray:
+        """Blend the overlay into an RGB frame, touching only its bounding box."""
+        if self.w == 0 or self.h == 0:
+            return frame
+        if not frame.flags.writeable:
+            frame = frame.copy()
+        self.blend_into(frame, self.new_scratch())
+        return frame
+
+
+class OverlayCache:
+    """
+    In-memory LRU of rasterized overlays, keyed by text, author, font settings
+    and frame size, with PNG copies on disk for the ffmpeg engine.
+    """
+
+    def __init__(self, cache_dir: Path, max_entries: int = 64):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, QuoteOverlay]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(quote: str, author: str, text_settings: Dict, frame_size: Tuple[int, int]) -> str:
+        raw = json.dumps([quote, author, text_settings, list(frame_size)], sort_keys=True)
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def get_or_render(
+        self,
+        quote: str,
+        author: str,
+        text_settings: Dict,
+        frame_size: Tuple[int, int],
+        render: Callable[[], np.ndarray]
+    ) -> QuoteOverlay:
+        """
+        Return the overlay for these inputs, rasterizing it on a miss.
+
+        Args:
+            quote: Quote text
+            author: Quote author
+            text_settings: Font settings used by the rasterizer
+            frame_size: Frame (width, height) the overlay is centered on
+            render: Callable returning the straight-alpha RGBA image
+
+        Returns:
+            QuoteOverlay ready for blending
+        """
+        key = self.key(quote, author, text_settings, frame_size)
+        with self._lock:
+            overlay = self._entries.get(key)
+            if overlay is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return overlay
+            self.misses += 1
+
+        overlay = QuoteOverlay(key, render(), frame_size)
+        with self._lock:
+            self._entries[key] = overlay
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return overlay
+
+    def png_path(self, overlay: QuoteOverlay) -> Path:
+        """Return a PNG of the overlay on disk, writing it once."""
+        path = self.cache_dir / f"{overlay.key}.png"
+        try:
+            # Marks the PNG as recently used for age-based cache cleanup
+            os.utime(path)
+        except FileNotFoundError:
+            tmp_path = self.cache_dir / f"{uuid.uuid4().hex}.part"
+            try:
+                Image.fromarray(overlay.rgba, mode="RGBA").save(tmp_path, format="PNG")
+                os.replace(tmp_path, path)
+            finally:
+                tmp_path.unlink(missing_ok=True)
+        return path
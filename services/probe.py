@@ -0,0 +1,65 @@
+import logging
+from pathlib import Path
+from typing import Dict
+
+from moviepy.video.io.ffmpeg_reader import ffmpeg_parse_infos
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Codecs the bundled ffmpeg decodes reliably and fast enough for rendering
+SUPPORTED_CODECS = {"h264", "hevc", "vp8", "vp9", "av1", "mpeg4", "prores"}
+
+
+class VideoProbeError(Exception):
+    """Custom exception for unreadable or unusable source videos"""
+    pass
+
+
+def probe_video(path: Path, min_duration: float = 1.0, min_size: int = 240) -> Dict:
+    """
+    Read only the container headers of a video and validate it as a background source.
+
+    Args:
+        path: Local video file
+        min_duration: Shortest accepted duration in seconds
+        min_size: Smallest accepted width/height in pixels
+
+    Returns:
+        Dict with ``width``, ``height``, ``fps``, ``duration``, ``codec`` and
+        ``has_audio`` (width/height already account for rotation metadata)
+
+    Raises:
+        VideoProbeError: If the file cannot be parsed or is unusable
+    """
+    try:
+        infos = ffmpeg_parse_infos(str(path))
+    except Exception as e:
+        raise VideoProbeError(f"Could not read video headers of {path}: {e}")
+
+    if not infos.get("video_found"):
+        raise VideoProbeError(f"No video stream in {path}")
+
+    width, height = infos.get("video_size") or (0, 0)
+    if infos.get("video_rotation", 0) in (90, 270):
+        width, height = height, width
+
+    metadata = {
+        "width": width,
+        "height": height,
+        "fps": infos.get("video_fps") or 0,
+        "duration": infos.get("video_duration") or infos.get("duration") or 0,
+        "codec": infos.get("video_codec_name"),
+        "has_audio": bool(infos.get("audio_found")),
+    }
+
+    if metadata["codec"] not in SUPPORTED_CODECS:
+        raise VideoProbeError(f"Unsupported video codec {metadata['codec']!r} in {path}")
+    if metadata["duration"] < min_duration:
+        raise VideoProbeError(f"Video too short ({metadata['duration']}s < {min_duration}s): {path}")
+    if min(width, height) < min_size:
+        raise VideoProbeError(f"Video too small ({width}x{height}): {path}")
+    if metadata["fps"] <= 0:
+        raise VideoProbeError(f"Video has no usable frame rate: {path}")
+
+    return metadata
@@ -0,0 +1,72 @@
+import contextvars
+import logging
+import time
+from contextlib import contextmanager
+from typing import Callable, Optional
+
+import tqdm
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Byte-counting bars (downloads) update constantly; listeners hear at most this often
+MIN_EMIT_INTERVAL = 0.25
+
+ProgressListener = Callable[[str, float, Optional[float]], None]
+_listener: contextvars.ContextVar[Optional[ProgressListener]] = contextvars.ContextVar(
+    "progress_listener", default=None
+)
+
+
+@contextmanager
+def report_progress(listener: ProgressListener):
+    """Send progress of the stages run in this context (and contexts copied from it) to listener(stage, n, total)."""
+    token = _listener.set(listener)
+    try:
+        yield
+    finally:
+        _listener.reset(token)
+
+
+def current_listener() -> Optional[ProgressListener]:
+    """Return the progress listener of the current context, if any."""
+    return _listener.get()
+
+
+def emit(stage: str, n: float, total: Optional[float] = None):
+    """Report a stage position to the current listener, if any."""
+    listener = _listener.get()
+    if listener is None:
+        return
+    try:
+        listener(stage, n, total)
+    except Exception as e:
+        logger.debug(f"Progress listener failed: {e}")
+
+
+class ProgressBar(tqdm.tqdm):
+    """tqdm bar that also forwards its position to the progress listener of the current context."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._listener = _listener.get()
+        self._last_emit = 0.0
+        self._emit(force=True)
+
+    def update(self, n=1):
+        displayed = super().update(n)
+        self._emit()
+        return displayed
+
+    def _emit(self, force: bool = False):
+        if self._listener is None:
+            return
+        now = time.monotonic()
+        finished = self.total is not None and self.n >= self.total
+        if not force and not finished and now - self._last_emit < MIN_EMIT_INTERVAL:
+            return
+        self._last_emit = now
+        try:
+            self._listener(self.desc, self.n, self.total)
+        except Exception as e:
+            logger.debug(f"Progress listener failed: {e}")
@@ -0,0 +1,83 @@
+import logging
+from typing import Callable, Dict, List, Optional, Tuple
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Default output geometry the analyzers rank sources for (9:16)
+DEFAULT_TARGET_SIZE = (1080, 1920)
+
+
+def crop_box(width: int, height: int, target_size: Tuple[int, int]) -> Tuple[int, int]:
+    """Return the (width, height) of the centered crop with the target aspect ratio."""
+    target_w, target_h = target_size
+    return min(width, height * target_w / target_h), min(height, width * target_h / target_w)
+
+
+def crop_efficiency(width: int, height: int, target_size: Tuple[int, int]) -> float:
+    """Fraction of the decoded pixels that survive the centered crop to the target aspect ratio."""
+    crop_w, crop_h = crop_box(width, height, target_size)
+    return (crop_w * crop_h) / (width * height)
+
+
+def crop_score(width: Optional[int], height: Optional[int], target_size: Tuple[int, int]) -> Tuple:
+    """
+    Sort key for source candidates, higher is better: known dimensions first,
+    then sources that need no upscaling, then crop efficiency (to 2 decimals).
+
+    Efficiency only breaks ties: a source too small for the target would be
+    upscaled, which costs more quality than decoding pixels the crop drops.
+    """
+    if not width or not height:
+        return (0, 0, 0.0)
+    covers = covers_target({"width": width, "height": height}, target_size)
+    return (1, int(covers), round(crop_efficiency(width, height, target_size), 2))
+
+
+def rank_by_crop_efficiency(
+    candidates: List[Dict],
+    dimensions: Callable[[Dict], Tuple[Optional[int], Optional[int]]],
+    target_size: Tuple[int, int]
+) -> List[Tuple[Tuple, Dict]]:
+    """
+    Rank source candidates so we decode as few discarded pixels as possible.
+
+    Args:
+        candidates: Provider search hits, in relevance order
+        dimensions: Returns (width, height) for a candidate, None when unknown
+        target_size: Output (width, height)
+
+    Returns:
+        List of (score, candidate), best first; ties keep relevance order
+    """
+    scored = [(crop_score(*dimensions(candidate), target_size), candidate) for candidate in candidates]
+    return sorted(scored, key=lambda item: item[0], reverse=True)
+
+
+def covers_target(rendition: Dict, target_size: Tuple[int, int]) -> bool:
+    """True if the rendition's crop box is at least target_size, i.e. no upscaling is needed."""
+    crop_w, crop_h = crop_box(rendition["width"], rendition["height"], target_size)
+    return crop_w >= target_size[0] and crop_h >= target_size[1]
+
+
+def select_rendition(renditions: List[Dict], target_size: Tuple[int, int]) -> Optional[Dict]:
+    """
+    Pick the smallest rendition whose crop box still covers target_size.
+
+    Args:
+        renditions: Dicts with ``url`` and, when known, ``width``/``height``/``size``
+        target_size: Output (width, height)
+
+    Returns:
+        The chosen rendition. If none covers the target, the largest known one;
+        if no dimensions are known, the first rendition with a URL.
+    """
+    candidates = [r for r in renditions if r.get("url")]
+    known = [r for r in candidates if r.get("width") and r.get("height")]
+
+    covering = [r for r in known if covers_target(r, target_size)]
+    if covering:
+        return min(covering, key=lambda r: (r["width"] * r["height"], r.get("size") or 0))
+    if known:
+        return max(known, key=lambda r: r["width"] * r["height"])
+    return candidates[0] if candidates else None
@@ -0,0 +1,137 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def normalize_text(text: str) -> str:
+    """Collapse runs of whitespace and trim, so retyped or re-pasted quotes hash alike."""
+    return " ".join(str(text).split())
+
+
+class ResultCache:
+    """
+    Persistent index of finished render results, keyed by a hash of the
+    normalized request inputs and the render settings.
+
+    Each entry is one JSON file under ``results_dir`` holding the response
+    body of the render and the output files it refers to. An entry is only
+    returned while it is younger than ``ttl`` seconds and every one of its
+    files still exists; otherwise it is dropped, so deleted or cleaned-up
+    videos are rendered again.
+    """
+
+    def __init__(self, results_dir: Path, ttl: float = 86400):
+        self.results_dir = Path(results_dir)
+        self.results_dir.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(**inputs) -> str:
+        """
+        Hash request inputs (and render settings) into a cache key.
+
+        String values have their whitespace normalized; other values must be
+        JSON-serializable and are hashed as-is.
+        """
+        normalized = {
+            name: normalize_text(value) if isinstance(value, str) else value
+            for name, value in inputs.items()
+        }
+        payload = json.dumps(normalized, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.results_dir / f"{key}.json"
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Return the cached result for key, or None if missing, expired or its files are gone."""
+        path = self._path(key)
+        try:
+            with open(path, "r") as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            entry = None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable result cache entry {path}: {e}")
+            entry = None
+
+        result = None
+        if entry is not None:
+            try:
+                if time.time() - entry["created"] > self.ttl:
+                    logger.info(f"Result cache entry {key[:12]} expired")
+                elif not all(Path(file).exists() for file in entry["files"]):
+                    logger.info(f"Result cache entry {key[:12]} lost its output files")
+                else:
+                    result = entry["result"]
+            except (KeyError, TypeError) as e:
+                logger.warning(f"Ignoring unreadable result cache entry {path}: {e}")
+            if result is None:
+                path.unlink(missing_ok=True)
+
+        with self._lock:
+            if result is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return result
+
+    def put(self, key: str, result: Dict, files: Iterable[Path]):
+        """Record a finished render's result and the output files it depends on."""
+        entry = {"created": time.time(), "files": [str(Path(file).resolve()) for file in files], "result": result}
+        path = self._path(key)
+        tmp_path = path.with_suffix(f".{uuid.uuid4().hex}.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
+
+    def prune(self) -> Dict[str, int]:
+        """
+        Delete entries that are expired or whose output files are gone.
+
+        Returns:
+            Number of entries removed and the bytes they took
+        """
+        removed = {"files": 0, "bytes": 0}
+        now = time.time()
+        for path in self.results_dir.glob("*.json"):
+            try:
+                size = path.stat().st_size
+                with open(path, "r") as f:
+                    entry = json.load(f)
+                stale = now - entry["created"] > self.ttl or not all(Path(file).exists() for file in entry["files"])
+            except FileNotFoundError:
+                continue
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                logger.warning(f"Removing unreadable result cache entry {path}: {e}")
+                stale = True
+            if stale:
+                path.unlink(missing_ok=True)
+                removed["files"] += 1
+                removed["bytes"] += size
+        return removed
+
+    def remove(self, key: str):
+        self._path(key).unlink(missing_ok=True)
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters and the number of stored entries."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": sum(1 for _ in self.results_dir.glob("*.json")),
+                "ttl": self.ttl,
+            }
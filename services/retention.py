@@ -0,0 +1,303 @@
+import logging
+import re
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Set
+
+from services.drafts import DraftStore
+from services.result_cache import ResultCache
+from services.thumbnails import thumbnail_paths
+from services.video_index import VideoIndex
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+CATEGORIES = ("temp", "drafts", "orphans", "outputs", "caches")
+THUMBNAIL_SUFFIXES = (".poster.jpg", ".sprite.jpg", ".sprite.vtt")
+
+
+def _size(path: Path) -> int:
+    """Bytes used by a file or directory tree (0 if it is gone)."""
+    try:
+        if path.is_dir():
+            return sum(child.stat().st_size for child in path.rglob("*") if child.is_file())
+        return path.stat().st_size
+    except FileNotFoundError:
+        return 0
+
+
+class RetentionManager:
+    """
+    Keeps the output, temp and cache directories within age and size budgets.
+
+    Each ``sweep`` removes, in order:
+
+    - temp files of crashed renders (voiceovers, segment and HLS work
+      directories) older than ``max_temp_age``
+    - drafts older than ``max_draft_age`` with their preview and voiceover
+    - orphans: thumbnails, HLS ladders, previews and voiceovers whose video
+      or draft no longer exists
+    - final videos (with their thumbnails and HLS ladder) older than
+      ``max_output_age``, then the oldest ones until the output directory
+      fits ``max_output_bytes``
+    - files in ``cache_dirs`` unused for ``max_cache_age`` and stale render
+      result cache entries
+
+    Files in use are never touched: anything modified within ``grace``
+    seconds (renders still writing), drafts that are rendering, paths
+    returned by ``in_use``, and the thumbnails, HLS ladder and work
+    directories named after a video returned by ``in_use``. Budgets of 0 are
+    unlimited. The clip and
+    background caches enforce their own size budgets and are not swept here.
+    """
+
+    def __init__(
+        self,
+        output_dir: Path,
+        temp_dir: Path,
+        drafts: DraftStore,
+        hls_dir: Optional[Path] = None,
+        cache_dirs: Sequence[Path] = (),
+        result_cache: Optional[ResultCache] = None,
+        video_index: Optional[VideoIndex] = None,
+        max_output_bytes: int = 0,
+        max_output_age: float = 0,
+        max_temp_age: float = 3600,
+        max_draft_age: float = 7 * 86400,
+        max_cache_age: float = 30 * 86400,
+        grace: float = 900,
+        in_use: Optional[Callable[[], Iterable[Path]]] = None
+    ):
+        self.output_dir = Path(output_dir)
+        self.temp_dir = Path(temp_dir)
+        self.drafts = drafts
+        self.hls_dir = Path(hls_dir) if hls_dir else None
+        self.cache_dirs = [Path(path) for path in cache_dirs]
+        self.result_cache = result_cache
+        self.video_index = video_index
+        self.max_output_bytes = max_output_bytes
+        self.max_output_age = max_output_age
+        self.max_temp_age = max_temp_age
+        self.max_draft_age = max_draft_age
+        self.max_cache_age = max_cache_age
+        self.grace = grace
+        self.in_use = in_use
+
+        self.last_sweep: Optional[Dict] = None
+        self.total_reclaimed_bytes = 0
+        self._lock = threading.Lock()
+
+    def sweep(self) -> Dict:
+        """
+        Run one retention pass.
+
+        Returns:
+            Files and bytes reclaimed per category, the totals and the pass duration
+        """
+        with self._lock:
+            start = time.time()
+            self._now = start
+            self._in_use: Set[Path] = {Path(path).resolve() for path in self.in_use()} if self.in_use else set()
+            # "<stem>.poster.jpg", "hls/<stem>", ".segments_<stem>.<id>", "hls/.<stem>.<id>.part"
+            stems = [re.escape(path.stem) for path in self._in_use if path.suffix == ".mp4"]
+            self._in_use_names = re.compile(rf"(^|[._])({'|'.join(stems)})(\.|$)") if stems else None
+            self._reclaimed = {category: {"files": 0, "bytes": 0} for category in CATEGORIES}
+
+            self._sweep_temp()
+            live_previews = self._sweep_drafts()
+            self._sweep_orphans(live_previews)
+            self._sweep_outputs(live_previews)
+            self._sweep_caches()
+
+            report = {
+                **self._reclaimed,
+                "reclaimed_files": sum(entry["files"] for entry in self._reclaimed.values()),
+                "reclaimed_bytes": sum(entry["bytes"] for entry in self._reclaimed.values()),
+                "output_bytes": self._output_bytes(),
+                "finished": time.time(),
+                "seconds": round(time.time() - start, 3),
+            }
+            self.last_sweep = report
+            self.total_reclaimed_bytes += report["reclaimed_bytes"]
+
+        if report["reclaimed_files"]:
+            logger.info(
+                f"Retention sweep reclaimed {report['reclaimed_bytes'] / 1024 / 1024:.1f}MB "
+                f"in {report['reclaimed_files']} files ({report['seconds']:.2f}s)"
+            )
+        return report
+
+    def start(self, interval: float) -> threading.Event:
+        """Sweep now and then every interval seconds on a daemon thread; set the returned event to stop."""
+        stop = threading.Event()
+
+        def run():
+            while True:
+                try:
+                    self.sweep()
+                except Exception as e:
+                    logger.error(f"Retention sweep failed: {e}", exc_info=True)
+                if stop.wait(interval):
+                    return
+
+        threading.Thread(target=run, name="retention", daemon=True).start()
+        return stop
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "last_sweep": self.last_sweep,
+                "total_reclaimed_bytes": self.total_reclaimed_bytes,
+                "max_output_bytes": self.max_output_bytes,
+                "max_output_age": self.max_output_age,
+            }
+
+    def _age(self, path: Path) -> float:
+        try:
+            return self._now - path.stat().st_mtime
+        except FileNotFoundError:
+            return 0.0
+
+    def _protected(self, path: Path) -> bool:
+        if path.resolve() in self._in_use or self._age(path) < self.grace:
+            return True
+        return bool(self._in_use_names and self._in_use_names.search(path.name))
+
+    def _remove(self, category: str, path: Path) -> int:
+        size = _size(path)
+        try:
+            if path.is_dir():
+                shutil.rmtree(path)
+            else:
+                path.unlink()
+        except FileNotFoundError:
+            return 0
+        except OSError as e:
+            logger.warning(f"Could not remove {path}: {e}")
+            return 0
+        logger.debug(f"Removed {path} ({category}, {size} bytes)")
+        self._reclaimed[category]["files"] += 1
+        self._reclaimed[category]["bytes"] += size
+        return size
+
+    def _sweep_temp(self):
+        # Leftovers of renders that crashed before their cleanup ran
+        candidates = list(self.temp_dir.iterdir()) if self.temp_dir.exists() else []
+        candidates += self.output_dir.glob(".segments_*")
+        if self.hls_dir and self.hls_dir.exists():
+            candidates += self.hls_dir.glob(".*.part")
+        for path in candidates:
+            if self.max_temp_age and self._age(path) > self.max_temp_age and not self._protected(path):
+                self._remove("temp", path)
+
+    def _sweep_drafts(self) -> Set[str]:
+        """Remove expired drafts; returns the preview filenames of the drafts kept."""
+        live_previews = set()
+        for draft in self.drafts.list_drafts():
+            preview = Path(draft["preview_path"])
+            expired = self.max_draft_age and self._now - draft["created"] > self.max_draft_age
+            if not expired or draft["status"] == "rendering" or preview.resolve() in self._in_use:
+                live_previews.add(preview.name)
+                continue
+            size = sum(_size(asset) for asset in self.drafts.drafts_dir.glob(f"{draft['id']}.*"))
+            if self.drafts.delete(draft["id"]) is not None:
+                self._reclaimed["drafts"]["files"] += 1
+                self._reclaimed["drafts"]["bytes"] += size
+            self._remove_preview("drafts", self.output_dir / preview.name)
+        return live_previews
+
+    def _videos(self) -> List[Path]:
+        return [path for path in self.output_dir.glob("*.mp4") if path.is_file()]
+
+    def _sweep_orphans(self, live_previews: Set[str]):
+        videos = {path.stem for path in self._videos()}
+        for path in self.output_dir.glob("preview_*.mp4"):
+            if path.name not in live_previews and not self._protected(path):
+                self._remove_preview("orphans", path)
+                videos.discard(path.stem)
+
+        for path in self.output_dir.iterdir():
+            suffix = next((suffix for suffix in THUMBNAIL_SUFFIXES if path.name.endswith(suffix)), None)
+            if suffix and path.name[:-len(suffix)] not in videos and not self._protected(path):
+                self._remove("orphans", path)
+
+        if self.hls_dir and self.hls_dir.exists():
+            for path in self.hls_dir.iterdir():
+                if path.name.startswith(".") or not path.is_dir():
+                    continue
+                if path.name not in videos and not self._protected(path):
+                    self._remove("orphans", path)
+
+        # Voiceovers whose draft record is gone
+        for path in self.drafts.drafts_dir.glob("*.mp3"):
+            if not path.with_suffix(".json").exists() and not self._protected(path):
+                self._remove("orphans", path)
+
+    def _video_files(self, video: Path) -> List[Path]:
+        """A final video and the files derived from it."""
+        files = [video, *thumbnail_paths(video).values()]
+        if self.hls_dir:
+            files.append(self.hls_dir / video.stem)
+        return files
+
+    def _unindex(self, video: Path):
+        if self.video_index is not None:
+            self.video_index.remove(video.name)
+
+    def _remove_preview(self, category: str, preview: Path):
+        self._remove(category, preview)
+        self._unindex(preview)
+
+    def _remove_video(self, video: Path) -> int:
+        reclaimed = sum(self._remove("outputs", path) for path in self._video_files(video) if path.exists())
+        self._unindex(video)
+        return reclaimed
+
+    def _output_bytes(self) -> int:
+        total = sum(_size(path) for path in self.output_dir.iterdir() if path.is_file())
+        if self.hls_dir and self.hls_dir.exists():
+            total += _size(self.hls_dir)
+        return total
+
+    def _sweep_outputs(self, live_previews: Set[str]):
+        if not self.max_output_age and not self.max_output_bytes:
+            return
+        # Oldest first; previews belong to their drafts and expire with them
+        videos = sorted(
+            (path for path in self._videos() if path.name not in live_previews),
+            key=lambda path: path.stat().st_mtime
+        )
+        videos = [video for video in videos if not self._protected(video)]
+
+        if self.max_output_age:
+            expired = [video for video in videos if self._age(video) > self.max_output_age]
+            for video in expired:
+                self._remove_video(video)
+            videos = videos[len(expired):]
+
+        if self.max_output_bytes:
+            total = self._output_bytes()
+            for video in videos:
+                if total <= self.max_output_bytes:
+                    break
+                total -= self._remove_video(video)
+            if total > self.max_output_bytes:
+                logger.warning(
+                    f"Output directory still uses {total / 1024 / 1024:.1f}MB of a "
+                    f"{self.max_output_bytes / 1024 / 1024:.1f}MB budget; the rest is in use or recent"
+                )
+
+    def _sweep_caches(self):
+        if self.max_cache_age:
+            for cache_dir in self.cache_dirs:
+                if not cache_dir.exists():
+                    continue
+                for path in cache_dir.iterdir():
+                    if self._age(path) > self.max_cache_age and not self._protected(path):
+                        self._remove("caches", path)
+        if self.result_cache is not None:
+            pruned = self.result_cache.prune()
+            self._reclaimed["caches"]["files"] += pruned["files"]
+            self._reclaimed["caches"]["bytes"] += pruned["bytes"]
@@ -0,0 +1,184 @@
+"""
+Segment-parallel rendering: split the timeline into N frame ranges, composite
+and encode each in its own process, then join them with a stream-copy concat.
+Every segment is a separate libx264 encode, so each starts on a keyframe and
+the concat needs no re-encode.
+"""
+import logging
+import multiprocessing
+import shutil
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+from services.ffmpeg_renderer import FFmpegRenderer
+from services.frame_pipeline import FramePipeline
+from services.ffmpeg_utils import run_ffmpeg
+from services.overlay import QuoteOverlay
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def segment_bounds(total_frames: int, segments: int) -> List[Tuple[int, int]]:
+    """Split total_frames into up to `segments` contiguous (start_frame, frame_count) ranges."""
+    segments = max(1, min(segments, total_frames))
+    edges = [total_frames * i // segments for i in range(segments + 1)]
+    return [(edges[i], edges[i + 1] - edges[i]) for i in range(segments)]
+
+
+def _load_overlay(overlay_png: str, frame_size: Tuple[int, int]) -> QuoteOverlay:
+    return QuoteOverlay(Path(overlay_png).stem, np.asarray(Image.open(overlay_png).convert("RGBA")), frame_size)
+
+
+def render_moviepy_segment(
+    background_path: str,
+    overlay_png: str,
+    frame_size: Tuple[int, int],
+    fps: int,
+    start_frame: int,
+    frame_count: int,
+    output_path: str,
+    preset: str = "ultrafast",
+    threads: int = 1
+):
+    """Composite and encode one segment with MoviePy (runs in a worker process)."""
+    from moviepy import VideoFileClip
+
+    overlay = _load_overlay(overlay_png, frame_size)
+    clip = VideoFileClip(background_path, audio=False)
+    try:
+        start = start_frame / fps
+        segment = clip.subclipped(start, min(clip.duration, start + frame_count / fps))
+        segment.image_transform(overlay.blend).write_videofile(
+            output_path,
+            fps=fps,
+            codec="libx264",
+            preset=preset,
+            audio=False,
+            threads=threads,
+            logger=None
+        )
+    finally:
+        clip.close()
+
+
+class SegmentedRenderer:
+    """
+    Renders a reel as N segments in parallel processes and joins them.
+
+    The MoviePy engine composites each segment in a process from a shared
+    pool; the ffmpeg engine runs one ffmpeg process per segment and the
+    pipeline engine one decoder/encoder pair per segment. The voiceover
+    is muxed once during the concat so no audio priming gaps appear at joins.
+    """
+
+    def __init__(
+        self,
+        segments: int,
+        ffmpeg_renderer: Optional[FFmpegRenderer] = None,
+        frame_pipeline: Optional[FramePipeline] = None
+    ):
+        self.segments = segments
+        self.ffmpeg_renderer = ffmpeg_renderer or FFmpegRenderer()
+        self.frame_pipeline = frame_pipeline or FramePipeline(preset=self.ffmpeg_renderer.preset)
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def _process_pool(self) -> ProcessPoolExecutor:
+        # Spawned workers do not inherit the server's threads or locks
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.segments,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._pool
+
+    def render(
+        self,
+        engine: str,
+        background_path: Path,
+        overlay_path: Path,
+        audio_path: Optional[Path],
+        output_path: Path,
+        target_size: Tuple[int, int],
+        fps: int,
+        duration: float,
+        segments: Optional[int] = None,
+        ffmpeg_renderer: Optional[FFmpegRenderer] = None
+    ):
+        """
+        Render output_path from a background that already covers the whole duration.
+
+        Args:
+            engine: "moviepy", "ffmpeg" or "pipeline"
+            background_path: Normalized background (target size and fps, at least duration long)
+            overlay_path: RGBA overlay PNG, centered
+            audio_path: Optional voiceover muxed during the concat
+            output_path: Destination MP4
+            target_size: Output (width, height)
+            fps: Output frame rate
+            duration: Output duration in seconds
+            segments: Overrides the renderer's segment count for this render
+            ffmpeg_renderer: Overrides the renderer's encode settings and priority for this render
+
+        Raises:
+            FFmpegError: If a segment encode or the concat fails
+        """
+        ffmpeg_renderer = ffmpeg_renderer or self.ffmpeg_renderer
+        bounds = segment_bounds(int(round(duration * fps)), segments or self.segments)
+        # Named after the output so cleanup can tell it belongs to a render in progress
+        work_dir = output_path.parent / f".segments_{output_path.stem}.{uuid.uuid4().hex}"
+        work_dir.mkdir(parents=True)
+        segment_paths = [work_dir / f"segment_{i:03d}.mp4" for i in range(len(bounds))]
+
+        try:
+            if engine == "ffmpeg":
+                with ThreadPoolExecutor(max_workers=len(bounds), thread_name_prefix="segment") as executor:
+                    futures = [
+                        executor.submit(run_ffmpeg, ffmpeg_renderer.build_segment_command(
+                            background_path, overlay_path, path, target_size, fps, start, count
+                        ), ffmpeg_renderer.niceness)
+                        for path, (start, count) in zip(segment_paths, bounds)
+                    ]
+                    for future in futures:
+                        future.result()
+            elif engine == "pipeline":
+                # The pipeline's heavy lifting happens in ffmpeg and GIL-releasing NumPy, so threads suffice
+                overlay = _load_overlay(str(overlay_path), target_size)
+                with ThreadPoolExecutor(max_workers=len(bounds), thread_name_prefix="segment") as executor:
+                    futures = [
+                        executor.submit(
+                            self.frame_pipeline.render,
+                            background_path, target_size, overlay, None, path,
+                            target_size, fps, count / fps, start, count
+                        )
+                        for path, (start, count) in zip(segment_paths, bounds)
+                    ]
+                    for future in futures:
+                        future.result()
+            else:
+                pool = self._process_pool()
+                futures = [
+                    pool.submit(
+                        render_moviepy_segment,
+                        str(background_path), str(overlay_path), target_size, fps,
+                        start, count, str(path), ffmpeg_renderer.preset
+                    )
+                    for path, (start, count) in zip(segment_paths, bounds)
+                ]
+                for future in futures:
+                    future.result()
+
+            ffmpeg_renderer.concat_segments(segment_paths, audio_path, output_path, duration)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    def close(self):
+        """Shut down the MoviePy segment worker pool; it is recreated if another render needs it."""
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
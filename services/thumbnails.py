@@ -0,0 +1,176 @@
+import logging
+import math
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+from services.ffmpeg_utils import run_ffmpeg
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+POSTER_WIDTH = 540
+SPRITE_TILE_WIDTH = 108
+SPRITE_COLUMNS = 5
+SPRITE_INTERVAL = 1.0  # seconds between sprite tiles
+JPEG_QUALITY = 85
+
+
+def thumbnail_paths(video_path: Path) -> Dict[str, Path]:
+    """Poster, sprite sheet and sprite WebVTT locations stored next to a rendered video."""
+    video_path = Path(video_path)
+    return {
+        "poster": video_path.with_name(f"{video_path.stem}.poster.jpg"),
+        "sprite": video_path.with_name(f"{video_path.stem}.sprite.jpg"),
+        "sprite_vtt": video_path.with_name(f"{video_path.stem}.sprite.vtt"),
+    }
+
+
+def _even_size(frame_size: Tuple[int, int], width: int) -> Tuple[int, int]:
+    frame_w, frame_h = frame_size
+    width = min(width, frame_w)
+    return width - width % 2, max(2, round(frame_h * width / frame_w / 2) * 2)
+
+
+class ThumbnailCapture:
+    """
+    Captures a poster frame and a sprite sheet from composited frames while a
+    render is being encoded, so thumbnails cost no second decode of the output.
+
+    Python-compositing engines hand frames to ``observe`` as they go to the
+    encoder; only the poster frame and one frame per ``SPRITE_INTERVAL`` are
+    touched. The ffmpeg engine adds ``filtergraph``/``output_args`` to its
+    command so the same ffmpeg process writes the JPEGs. ``finish`` writes the
+    sprite sheet (when Python captured it) and a WebVTT file that maps each
+    tile to its time range, the format video players use for scrub previews.
+    """
+
+    def __init__(
+        self,
+        video_path: Path,
+        frame_size: Tuple[int, int],
+        fps: int,
+        duration: float,
+        poster_time: float = 1.0,
+        label: str = "thumb"
+    ):
+        self.paths = thumbnail_paths(video_path)
+        # Prefix of the filtergraph labels, unique per capture when one ffmpeg writes several videos
+        self.label = label
+        self.fps = fps
+        self.frame_count = max(1, int(round(duration * fps)))
+        self.poster_index = min(int(round(poster_time * fps)), self.frame_count - 1)
+        self.poster_size = _even_size(frame_size, POSTER_WIDTH)
+        self.tile_size = _even_size(frame_size, SPRITE_TILE_WIDTH)
+        self.tile_step = max(1, int(round(SPRITE_INTERVAL * fps)))
+        self.tile_count = math.ceil(self.frame_count / self.tile_step)
+        self.columns = min(SPRITE_COLUMNS, self.tile_count)
+        self.rows = math.ceil(self.tile_count / self.columns)
+
+        self._sprite: Optional[np.ndarray] = None
+        self._lock = threading.Lock()
+
+    def observe(self, index: int, frame: np.ndarray):
+        """Record frame number index (an RGB array, possibly a strided view) if it is a thumbnail frame."""
+        if index == self.poster_index:
+            Image.fromarray(np.ascontiguousarray(frame)).resize(self.poster_size, Image.BILINEAR).save(
+                self.paths["poster"], quality=JPEG_QUALITY
+            )
+        if index % self.tile_step == 0 and index < self.frame_count:
+            tile_w, tile_h = self.tile_size
+            tile = np.asarray(Image.fromarray(np.ascontiguousarray(frame)).resize(self.tile_size, Image.BILINEAR))
+            position = index // self.tile_step
+            row, column = divmod(position, self.columns)
+            with self._lock:
+                if self._sprite is None:
+                    self._sprite = np.zeros((self.rows * tile_h, self.columns * tile_w, 3), dtype=np.uint8)
+                self._sprite[row * tile_h:(row + 1) * tile_h, column * tile_w:(column + 1) * tile_w] = tile
+
+    def observe_time(self, t: float, frame: np.ndarray) -> np.ndarray:
+        """observe() keyed by timestamp, returning the frame so it can sit in a MoviePy transform."""
+        self.observe(int(round(t * self.fps)), frame)
+        return frame
+
+    def filtergraph(self, source: str, output: Optional[str] = None) -> str:
+        """
+        Return filtergraph chains that split [source] into [output] plus poster/sprite branches.
+
+        Both branches are trimmed to the render's frame count, so a looped
+        background does not feed tiles from past the end of the video.
+        Without output, [source] only feeds the thumbnails.
+        """
+        poster_w, poster_h = self.poster_size
+        tile_w, tile_h = self.tile_size
+        label = self.label
+        split = f"split=3[{output}]" if output else "split=2"
+        return (
+            f"[{source}]{split}[{label}_poster_in][{label}_sprite_in];"
+            f"[{label}_poster_in]trim=end_frame={self.frame_count},select='eq(n\\,{self.poster_index})',"
+            f"scale={poster_w}:{poster_h}[{label}_poster];"
+            f"[{label}_sprite_in]trim=end_frame={self.frame_count},select='not(mod(n\\,{self.tile_step}))',"
+            f"scale={tile_w}:{tile_h},tile={self.columns}x{self.rows}[{label}_sprite]"
+        )
+
+    def output_args(self) -> List[str]:
+        """Return the ffmpeg output options that write the poster and sprite JPEGs from filtergraph()."""
+        return [
+            "-map", f"[{self.label}_poster]", "-frames:v", "1", "-q:v", "3", str(self.paths["poster"]),
+            "-map", f"[{self.label}_sprite]", "-frames:v", "1", "-q:v", "4", str(self.paths["sprite"]),
+        ]
+
+    def extract(self, video_path: Path):
+        """
+        Write the poster and sprite by decoding a finished video once.
+
+        Only for renders whose frames never pass through one process, such as
+        segmented renders joined by a stream copy.
+
+        Raises:
+            FFmpegError: If ffmpeg fails
+        """
+        run_ffmpeg(["-i", str(video_path), "-filter_complex", self.filtergraph("0:v"), *self.output_args()])
+
+    def _vtt(self) -> str:
+        tile_w, tile_h = self.tile_size
+        duration = self.frame_count / self.fps
+
+        def timestamp(seconds: float) -> str:
+            minutes, seconds = divmod(seconds, 60)
+            return f"{int(minutes // 60):02d}:{int(minutes % 60):02d}:{seconds:06.3f}"
+
+        cues = ["WEBVTT", ""]
+        for position in range(self.tile_count):
+            start = position * self.tile_step / self.fps
+            end = min(duration, (position + 1) * self.tile_step / self.fps)
+            row, column = divmod(position, self.columns)
+            cues += [
+                f"{timestamp(start)} --> {timestamp(end)}",
+                f"{self.paths['sprite'].name}#xywh={column * tile_w},{row * tile_h},{tile_w},{tile_h}",
+                ""
+            ]
+        return "\n".join(cues)
+
+    def finish(self) -> Dict[str, Path]:
+        """
+        Write the sprite sheet captured in Python (if any) and the sprite WebVTT.
+
+        Returns:
+            The thumbnail files that exist, keyed like thumbnail_paths()
+        """
+        with self._lock:
+            if self._sprite is not None:
+                Image.fromarray(self._sprite).save(self.paths["sprite"], quality=JPEG_QUALITY)
+                self._sprite = None
+        if self.paths["sprite"].exists():
+            self.paths["sprite_vtt"].write_text(self._vtt())
+        return {name: path for name, path in self.paths.items() if path.exists()}
+
+    def discard(self):
+        """Remove any thumbnails written so far (e.g. after a failed render)."""
+        with self._lock:
+            self._sprite = None
+        for path in self.paths.values():
+            path.unlink(missing_ok=True)
@@ -1,14 +1,35 @@
+import contextlib
+import contextvars
 import logging
 import os
 import tempfile
+import threading
 import time
+import uuid
+from concurrent.futures import FIRST_EXCEPTION, Future, ThreadPoolExecutor, wait
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import Callable, Dict, List, Optional, Tuple
 from flask import jsonify
-import requests
-from moviepy import CompositeVideoClip, TextClip, VideoFileClip, ColorClip, concatenate_videoclips
-import tqdm
+import numpy as np
+from moviepy import TextClip, VideoFileClip, ColorClip
 from api.tts_client import TTSClient
+from services.background_cache import BackgroundCache
+from services.clip_cache import ClipCache
+from services.downloader import DownloadCancelled, DownloadError, RangedDownloader
+from services.drafts import DraftStore
+from services.ffmpeg_renderer import FFmpegRenderer
+from services.ffmpeg_utils import FASTSTART_ARGS, FFmpegError, run_ffmpeg
+from services.frame_loop import LoopedClip
+from services.frame_pipeline import FramePipeline
+from services.hls import HLSPackager
+from services.leases import FileLeases, use
+from services.memory import MemoryBudget, RSSMonitor, estimate_render_bytes
+from services.overlay import OverlayCache, QuoteOverlay
+from services.probe import VideoProbeError, probe_video
+from services.progress import ProgressBar, emit
+from services.renditions import select_rendition
+from services.segmented import SegmentedRenderer
+from services.thumbnails import ThumbnailCapture
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -20,7 +41,27 @@ class VideoGeneratorError(Exception):
 
 
 class VideoGenerator:
-    def __init__(self):
+    RENDER_ENGINES = ("moviepy", "ffmpeg", "pipeline")
+    # Aspect-ratio outputs generate_video_formats can produce, as (width, height)
+    OUTPUT_FORMATS = {
+        "9:16": (1080, 1920),
+        "1:1": (1080, 1080),
+        "16:9": (1920, 1080),
+    }
+
+    def __init__(
+        self,
+        cache_dir: Path = Path("cache"),
+        clip_cache_max_mb: int = 5120,
+        background_cache_max_mb: int = 5120,
+        render_engine: str = "moviepy",
+        downloader: Optional[RangedDownloader] = None,
+        partial_fetch: bool = True,
+        auto_finalize_drafts: bool = False,
+        memory_budget_mb: int = 0,
+        render_segments: int = 1,
+        hls_ladder: Tuple[int, ...] = ()
+    ):
         """Initialize video generator with default settings"""
         self.output_dir = Path("output")
         self.output_dir.mkdir(exist_ok=True)
@@ -28,6 +69,20 @@ class VideoGenerator:
         self.temp_dir = Path(tempfile.gettempdir()) / "reels_automator"
         self.temp_dir.mkdir(exist_ok=True)
 
+        # Downloaded source clips are reused across renders
+        self.cache_dir = Path(cache_dir)
+        self.clip_cache = ClipCache(self.cache_dir / "clips", max_bytes=clip_cache_max_mb * 1024 * 1024)
+        self.background_cache = BackgroundCache(
+            self.cache_dir / "backgrounds",
+            max_bytes=background_cache_max_mb * 1024 * 1024
+        )
+        self.overlay_cache = OverlayCache(self.cache_dir / "overlays")
+        # Files of running renders, in any process sharing cache_dir, so cleanup leaves them alone
+        self.leases = FileLeases(self.cache_dir / "leases")
+        self.downloader = downloader or RangedDownloader()
+        # Only fetch the leading seconds of a source that the render actually uses
+        self.partial_fetch = partial_fetch
+
         self.text_settings = {
             "font": "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
             "fontsize": 70,
@@ -42,9 +97,51 @@ class VideoGenerator:
         # Memory-saving settings
         self.target_fps = 30
         self.preview_scale = 0.5  # Reduce to 0.25 for more memory savings during preview
+        self.min_source_duration = 1.0  # seconds; shorter sources are rejected before decoding
+        self.loop_frame_cache_mb = 512  # decoded frames kept in RAM when looping a short source
+        self.capture_thumbnails = True  # poster/sprite JPEGs next to each final render
+
+        # "moviepy" composites frames in Python, "ffmpeg" renders in one native filtergraph,
+        # "pipeline" composites in Python through preallocated buffers piped between ffmpeg processes
+        if render_engine not in self.RENDER_ENGINES:
+            raise VideoGeneratorError(f"Unknown render engine: {render_engine}")
+        self.render_engine = render_engine
+        self.ffmpeg_renderer = FFmpegRenderer()
+        self.frame_pipeline = FramePipeline()
+        # >1 splits the timeline into segments composited/encoded in parallel processes
+        self.render_segments = max(1, render_segments)
+        self.segmented_renderer = SegmentedRenderer(self.render_segments, self.ffmpeg_renderer, self.frame_pipeline)
 
-    def _create_text_clip(self, quote: str, author: str, duration: float) -> TextClip:
-        """Create a text clip with the quote and author."""
+        # Draft previews: low resolution/fps, fast encode; the full render is deferred
+        self.preview_fps = 15
+        self.preview_renderer = FFmpegRenderer(preset="ultrafast", crf=30)
+        self.drafts = DraftStore(self.cache_dir / "drafts")
+        # Render approved-later drafts in the background at lower CPU priority
+        self.auto_finalize_drafts = auto_finalize_drafts
+        self.background_renderer = FFmpegRenderer(niceness=10)
+        self._final_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="final-render")
+        self._final_futures: Dict[str, Future] = {}
+        self._final_lock = threading.Lock()
+        # Runs a draft's final render as (draft_id, background) -> output path. Drafts are scheduled in
+        # this process; the render itself may be sent elsewhere, e.g. to a render worker process.
+        self.final_renderer: Callable[[str, bool], str] = self.render_draft
+
+        # Estimated render memory is reserved against this budget (0 disables it)
+        self.memory_budget = MemoryBudget(memory_budget_mb * 1024 * 1024) if memory_budget_mb else None
+        self._local = threading.local()
+
+        # Optional post-render HLS ladder (rung short sides, e.g. (360, 720, 1080)) for streamed previews
+        self.hls = HLSPackager(self.output_dir / "hls", hls_ladder) if hls_ladder else None
+
+    def _create_text_clip(
+        self,
+        quote: str,
+        author: str,
+        duration: float,
+        target_size: Optional[Tuple[int, int]] = None
+    ) -> TextClip:
+        """Create a text clip with the quote and author, wrapped to the frame width."""
+        target_size = target_size or self.target_size
         formatted_text = f'"{quote}"\n\n- {author}'
 
         # Updated for MoviePy v2.0 compatibility
@@ -57,7 +154,7 @@ class VideoGenerator:
                 stroke_color=self.text_settings["stroke_color"],
                 stroke_width=self.text_settings["stroke_width"],
                 method="caption",
-                size=(self.target_size[0] - 100, None),
+                size=(target_size[0] - 100, None),
                 text_align="center"
             )
             .with_position("center")
@@ -66,33 +163,148 @@ class VideoGenerator:
 
         return text_clip
 
-    def _download_video(self, url: str) -> Path:
-        """Download a video from a URL and return its temporary path."""
+    def _download_video(self, url: str, cancel_event: Optional[threading.Event] = None) -> Path:
+        """
+        Return a cached copy of the video at a URL, downloading it on a cache miss.
+
+        With partial_fetch enabled only the leading seconds the render uses are
+        fetched; the full file is downloaded only when that is not possible.
+        """
+        cached_path = self.clip_cache.get(url)
+        if cached_path:
+            logger.info(f"Using cached video: {cached_path} ({self.clip_cache.stats()})")
+            return cached_path
+
+        if self.partial_fetch:
+            leading_path = self._download_leading(url, cancel_event)
+            if leading_path:
+                return leading_path
+
+        partial_path = self.clip_cache.partial_path(url)
+        use(partial_path)
         try:
-            temp_path = self.temp_dir / f"temp_video_{int(time.time())}.mp4"
-
-            response = requests.get(url, stream=True)
-            response.raise_for_status()
-            total_size = int(response.headers.get("content-length", 0))
-
-            with tqdm.tqdm(
-                total=total_size,
-                unit="iB",
-                unit_scale=True,
-                desc="Downloading video"
-            ) as progress:
-                with open(temp_path, "wb") as f:
-                    for chunk in response.iter_content(chunk_size=8192):
-                        if chunk:
-                            size = f.write(chunk)
-                            progress.update(size)
-
-            logger.info(f"Video downloaded to: {temp_path}")
-            return temp_path
+            # Other workers download the same URL into the same partial file; one at a time
+            with self.downloader.lock(partial_path):
+                cached_path = self.clip_cache.get(url)
+                if cached_path:
+                    logger.info(f"Using video cached while waiting for its download: {cached_path}")
+                    return cached_path
+
+                with ProgressBar(
+                    unit="iB",
+                    unit_scale=True,
+                    desc="Downloading video"
+                ) as progress:
+                    self.downloader.download(url, partial_path, cancel_event=cancel_event, progress=progress.update)
+
+                video_path = self.clip_cache.put(url, partial_path)
+            logger.info(f"Video downloaded to: {video_path} ({self.clip_cache.stats()})")
+            return video_path
 
         except Exception as e:
+            # The partial file is kept so the next attempt resumes it
             raise VideoGeneratorError(f"Failed to download video: {str(e)}")
 
+    def _download_leading(self, url: str, cancel_event: Optional[threading.Event] = None) -> Optional[Path]:
+        """
+        Fetch only the first target_duration seconds (plus a second of margin) of a video.
+
+        Byte ranges are located through the MP4 index first; otherwise ffmpeg reads the
+        URL as a network input bounded to those seconds. Either way the video stream
+        of those seconds is stream-copied into a compact file for the clip cache.
+        Returns None when neither works, so the caller falls back to a full download.
+        """
+        seconds = self.target_duration + 1
+        cache_key = f"{url}#t=0,{seconds}"
+        cached_path = self.clip_cache.get(cache_key)
+        if cached_path:
+            logger.info(f"Using cached leading {seconds}s of video: {cached_path}")
+            return cached_path
+
+        partial_path = self.clip_cache.partial_path(cache_key)
+        use(partial_path)
+        # Other workers fetch the same URL into the same partial file; one at a time
+        with self.downloader.lock(partial_path):
+            cached_path = self.clip_cache.get(cache_key)
+            if cached_path:
+                logger.info(f"Using leading {seconds}s of video cached while waiting: {cached_path}")
+                return cached_path
+            return self._fetch_leading(url, cache_key, seconds, partial_path, cancel_event)
+
+    def _fetch_leading(
+        self,
+        url: str,
+        cache_key: str,
+        seconds: float,
+        partial_path: Path,
+        cancel_event: Optional[threading.Event]
+    ) -> Optional[Path]:
+        """Fetch and compact the leading seconds into the clip cache (partial_path's lock must be held)."""
+        try:
+            with ProgressBar(unit="iB", unit_scale=True, desc=f"Downloading first {seconds}s") as progress:
+                self.downloader.download_leading(
+                    url, partial_path, seconds, cancel_event=cancel_event, progress=progress.update
+                )
+            # The fetched file is sparse at the source's full size; only its leading seconds are kept
+            source, fetched = str(partial_path), True
+        except DownloadCancelled as e:
+            raise VideoGeneratorError(f"Failed to download video: {str(e)}")
+        except DownloadError as e:
+            logger.info(f"Byte-range partial fetch unavailable ({e}), bounding a network read instead")
+            source, fetched = url, False
+
+        # Stream-copy the leading seconds into a compact file, so the cache hashes and
+        # budgets what is actually stored rather than the sparse file's logical size
+        compact_path = self.clip_cache.new_temp_path(".mp4")
+        try:
+            run_ffmpeg([
+                "-t", str(seconds),
+                "-i", source,
+                "-map", "0:v:0",
+                "-c", "copy",
+                "-f", "mp4",
+                str(compact_path)
+            ])
+        except FFmpegError as e:
+            logger.warning(f"Reading the leading {seconds}s failed, downloading the full video: {e}")
+            compact_path.unlink(missing_ok=True)
+            return None
+        finally:
+            if fetched:
+                partial_path.unlink(missing_ok=True)
+
+        video_path = self.clip_cache.put(cache_key, compact_path)
+        logger.info(f"Leading {seconds}s of video stored at: {video_path}")
+        return video_path
+
+    def choose_video_url(self, video_urls: Optional[Dict]) -> Optional[str]:
+        """
+        Pick the source URL to render from an analyzer result.
+
+        Uses the smallest rendition that still covers the crop box at target_size,
+        falling back to the "high_quality" URL when no renditions are listed.
+        """
+        if not video_urls:
+            return None
+        rendition = select_rendition(video_urls.get("renditions") or [], self.target_size)
+        if rendition:
+            logger.info(
+                f"Selected {rendition.get('quality')} rendition "
+                f"{rendition.get('width')}x{rendition.get('height')}: {rendition['url']}"
+            )
+            return rendition["url"]
+        return video_urls.get("high_quality")
+
+    def _output_path(self, *suffixes) -> Path:
+        """
+        Return a new output path, e.g. quote_video_<time>_<id>_1x1.mp4.
+
+        Renders run concurrently (jobs, worker processes), so the time alone
+        does not keep outputs, thumbnails and HLS ladders apart; a random id does.
+        """
+        name = "_".join(["quote_video", str(int(time.time())), uuid.uuid4().hex[:12], *map(str, suffixes)])
+        return self.output_dir / f"{name}.mp4"
+
     def _cleanup_temp_files(self, *files: Path):
         """Remove temporary files."""
         for file in files:
@@ -140,93 +352,115 @@ class VideoGenerator:
         resized = cropped.resized(new_size=target_size)
         return resized
 
-    def generate_video(self, quote: str, author: str, video_url: str, tts_voice: str = None) -> Optional[str]:
-        """Memory-optimized video generation with optional TTS audio"""
-        temp_video_path = None
-        temp_audio_path = None
-        preview_clip = None
+    def _load_background(
+        self,
+        source_video_path: Path,
+        source_info: Dict,
+        loop_cache_bytes: Optional[int] = None
+    ) -> VideoFileClip:
+        """Return the background cropped, scaled and looped/trimmed to the target size and duration."""
+        if loop_cache_bytes is None:
+            loop_cache_bytes = self.loop_frame_cache_mb * 1024 * 1024
+        try:
+            background_path = self.background_cache.get_or_create(
+                source_video_path,
+                source_video_path.stem,
+                self.target_size,
+                self.target_fps,
+                self.target_duration,
+                source_duration=source_info["duration"]
+            )
+            return VideoFileClip(str(background_path), audio=False)
+        except FFmpegError as e:
+            logger.warning(f"Background normalization failed, processing source directly: {e}")
+
+        # Load video at target resolution with memory optimization settings
+        video = VideoFileClip(
+            str(source_video_path),
+            target_resolution=self.target_size,
+            audio=False  # Skip audio if not needed
+        )
+        
+        # Process video
+        video = self._resize_video(video, self.target_size)
+        
+        # Loop short sources by time remapping; decoded frames replay from a bounded in-memory ring
+        if video.duration < self.target_duration:
+            logger.info(f"Video duration too short ({video.duration}s), looping to {self.target_duration}s")
+            video = LoopedClip(video, self.target_duration, max_bytes=loop_cache_bytes)
+        else:
+            video = video.subclipped(0, self.target_duration)
+
+        return video
+
+    def _rasterize_text(self, quote: str, author: str, target_size: Optional[Tuple[int, int]] = None) -> np.ndarray:
+        """Render the quote/author text once to a straight-alpha RGBA array."""
+        text_clip = self._create_text_clip(quote, author, duration=1, target_size=target_size)
+        try:
+            rgb = text_clip.get_frame(0).astype("uint8")
+            alpha = (text_clip.mask.get_frame(0) * 255).round().astype("uint8")
+        finally:
+            text_clip.close()
+        return np.dstack([rgb, alpha])
+
+    def render_settings(self, render_engine: Optional[str] = None) -> Dict:
+        """Settings that change what a render looks like, e.g. for keying cached results."""
+        return {
+            "render_engine": render_engine or self.render_engine,
+            "target_size": list(self.target_size),
+            "target_fps": self.target_fps,
+            "target_duration": self.target_duration,
+            "text_settings": self.text_settings,
+            "preview_size": list(self._preview_size()),
+            "preview_fps": self.preview_fps,
+        }
+
+    def warm_up(self):
+        """Rasterize a sample quote so fonts and the text renderer are loaded before the first render."""
+        start = time.perf_counter()
+        self._rasterize_text("Warming up", "Render worker")
+        logger.info(f"Warmed up text rendering in {time.perf_counter() - start:.2f}s")
+
+    def _get_overlay(self, quote: str, author: str, target_size: Optional[Tuple[int, int]] = None) -> QuoteOverlay:
+        """Return the cached overlay for this quote and frame size, rasterizing it on first use."""
+        target_size = target_size or self.target_size
+        return self.overlay_cache.get_or_render(
+            quote,
+            author,
+            self.text_settings,
+            target_size,
+            lambda: self._rasterize_text(quote, author, target_size)
+        )
+
+    def _render_with_moviepy(
+        self,
+        quote: str,
+        author: str,
+        source_video_path: Path,
+        source_info: Dict,
+        audio_path: Optional[Path],
+        output_path: Path,
+        threads: int = 4,
+        loop_cache_bytes: Optional[int] = None,
+        thumbnails: Optional[ThumbnailCapture] = None
+    ):
+        """Composite frames in Python with MoviePy and encode them with libx264."""
         video = None
-        text_clip = None
         final_video = None
 
         try:
-            # Download video
-            temp_video_path = self._download_video(video_url)
-
-            # Generate TTS audio if voice is provided
-            if tts_voice:
-                temp_audio_path = self.temp_dir / f"temp_audio_{int(time.time())}.mp3"
-                tts_client = TTSClient()
-                tts_client.generate_voice(quote, tts_voice, str(temp_audio_path))
-
-            with tqdm.tqdm(total=5, desc="Generating video") as pbar:
-                # Load video at lower resolution first for preview
-                preview_size = (
-                    int(self.target_size[0] * self.preview_scale),
-                    int(self.target_size[1] * self.preview_scale)
-                )
-                
-                # First pass: Check video and generate a small preview
-                preview_clip = VideoFileClip(
-                    str(temp_video_path),
-                    target_resolution=preview_size,
-                    fps_source="fps"  # Only read fps, don't decode frames
-                )
-                
-                logger.info(f"Video loaded: {preview_clip.w}x{preview_clip.h} @ {preview_clip.fps}fps")
-                
-                # Close preview to free memory
-                preview_clip.close()
-                preview_clip = None
-                pbar.update(1)
-                
-                # Second pass: Load video at target resolution with memory optimization settings
-                video = VideoFileClip(
-                    str(temp_video_path),
-                    target_resolution=self.target_size,
-                    audio=False  # Skip audio if not needed
-                )
-                pbar.update(1)
+            with ProgressBar(total=4, desc="Generating video") as pbar:
+                # Load the background normalized to the target geometry
+                video = self._load_background(source_video_path, source_info, loop_cache_bytes)
+                pbar.update(3)
                 
-                # Process video
-                video = self._resize_video(video, self.target_size)
+                # Blend the pre-rasterized overlay into each frame's text region only
+                overlay = self._get_overlay(quote, author)
+                final_video = video.image_transform(overlay.blend)
+                if thumbnails:
+                    # Poster/sprite frames are taken from the composite on its way to the encoder
+                    final_video = final_video.transform(lambda get_frame, t: thumbnails.observe_time(t, get_frame(t)))
                 pbar.update(1)
-                
-                # Loop if needed (manual concatenation approach)
-                if video.duration < self.target_duration:
-                    # Manual looping implementation since loop() is unavailable
-                    logger.info(f"Video duration too short ({video.duration}s), extending to {self.target_duration}s")
-                    
-                    # Calculate how many times we need to loop
-                    repetitions = int(self.target_duration / video.duration) + 1
-                    
-                    # Create a list of repetitions of the same clip
-                    clips = [video] * repetitions
-                    
-                    # Concatenate them
-                    looped_video = concatenate_videoclips(clips)
-                    
-                    # Trim to exact duration
-                    video = looped_video.subclipped(0, self.target_duration)
-                    
-                    # Close the intermediate clip
-                    if hasattr(looped_video, 'close'):
-                        looped_video.close()
-                else:
-                    video = video.subclipped(0, self.target_duration)
-                pbar.update(1)
-                
-                # Create text overlay and final composition
-                text_clip = self._create_text_clip(quote, author, video.duration)
-
-                final_video = CompositeVideoClip(
-                    [video, text_clip],
-                    size=self.target_size
-                )
-                pbar.update(1)
-
-                # Generate output path
-                output_path = self.output_dir / f"quote_video_{int(time.time())}.mp4"
 
                 # Write video with audio if available
                 final_video.write_videofile(
@@ -234,32 +468,907 @@ class VideoGenerator:
                     fps=self.target_fps,
                     codec="libx264",
                     preset="ultrafast",
-                    audio=str(temp_audio_path) if temp_audio_path else False,
-                    audio_codec="aac" if temp_audio_path else None,
-                    threads=4,
-                    ffmpeg_params=["-tile-columns", "6", "-frame-parallel", "1"]
+                    audio=str(audio_path) if audio_path else False,
+                    audio_codec="aac" if audio_path else None,
+                    threads=threads,
+                    ffmpeg_params=FASTSTART_ARGS
                 )
 
-            logger.info(f"Video generated at: {output_path}")
-            return str(output_path)
-
-        except Exception as e:
-            logger.error("Error generating video", exc_info=True)
-            import traceback
-            logger.error(traceback.format_exc())
-            return None
-
         finally:
             # Clean up all resources
-            for clip in [preview_clip, video, text_clip, final_video]:
+            for clip in [video, final_video]:
                 if clip and hasattr(clip, 'close'):
                     try:
                         clip.close()
                     except:
                         pass
 
-            if temp_video_path:
-                self._cleanup_temp_files(temp_video_path)
-            if temp_audio_path and temp_audio_path.exists():
-                temp_audio_path.unlink()
+    def _render_with_ffmpeg(
+        self,
+        quote: str,
+        author: str,
+        source_video_path: Path,
+        source_info: Dict,
+        audio_path: Optional[Path],
+        output_path: Path,
+        renderer: Optional[FFmpegRenderer] = None,
+        thumbnails: Optional[ThumbnailCapture] = None
+    ):
+        """Crop, scale, loop, overlay and mux in a single native ffmpeg filtergraph."""
+        renderer = renderer or self.ffmpeg_renderer
+        with ProgressBar(total=2, desc="Generating video (ffmpeg)") as pbar:
+            overlay_path = self.overlay_cache.png_path(self._get_overlay(quote, author))
+            use(overlay_path)
+            pbar.update(1)
+
+            # Reuse an already normalized background when one exists
+            background_path = self.background_cache.lookup(
+                source_video_path.stem,
+                self.target_size,
+                self.target_fps,
+                self.target_duration
+            )
+            renderer.render(
+                background_path or source_video_path,
+                overlay_path,
+                audio_path,
+                output_path,
+                target_size=self.target_size,
+                fps=self.target_fps,
+                duration=self.target_duration,
+                loop=background_path is None and source_info["duration"] < self.target_duration,
+                thumbnails=thumbnails
+            )
+            pbar.update(1)
+
+    def _render_with_pipeline(
+        self,
+        quote: str,
+        author: str,
+        source_video_path: Path,
+        source_info: Dict,
+        audio_path: Optional[Path],
+        output_path: Path,
+        pipeline: Optional[FramePipeline] = None,
+        thumbnails: Optional[ThumbnailCapture] = None
+    ) -> Dict:
+        """Composite frames in Python through reused buffers, piping raw frames between ffmpeg processes."""
+        pipeline = pipeline or self.frame_pipeline
+        with ProgressBar(total=2, desc="Generating video (pipeline)") as pbar:
+            overlay = self._get_overlay(quote, author)
+            try:
+                source_path = self.background_cache.get_or_create(
+                    source_video_path,
+                    source_video_path.stem,
+                    self.target_size,
+                    self.target_fps,
+                    self.target_duration,
+                    source_duration=source_info["duration"]
+                )
+                source_size, loop = self.target_size, False
+            except FFmpegError as e:
+                logger.warning(f"Background normalization failed, decoding source directly: {e}")
+                source_path = source_video_path
+                source_size = (source_info["width"], source_info["height"])
+                loop = source_info["duration"] < self.target_duration
+            pbar.update(1)
+
+            stats = pipeline.render(
+                source_path,
+                source_size,
+                overlay,
+                audio_path,
+                output_path,
+                target_size=self.target_size,
+                fps=self.target_fps,
+                duration=self.target_duration,
+                loop=loop,
+                thumbnails=thumbnails
+            )
+            pbar.update(1)
+        return stats
+
+    def _plan_render_memory(
+        self,
+        source_info: Dict,
+        render_engine: str,
+        renderer: Optional[FFmpegRenderer] = None
+    ) -> Dict:
+        """
+        Estimate a render's memory and pick thread counts and loop cache size for it.
+
+        When the estimate does not fit the remaining memory budget the render
+        is planned tight: a single segment, one decoder thread, two encoder
+        threads (fewer frames in flight) and a loop ring trimmed to what is
+        left of the budget.
+        """
+        cpus = min(os.cpu_count() or 1, 16)
+        source_size = (source_info["width"], source_info["height"])
+        renderer = renderer or self.ffmpeg_renderer
+        plan = {
+            "decoder_threads": renderer.decoder_threads or cpus,
+            "encoder_threads": (renderer.threads or cpus) if render_engine == "ffmpeg" else 4,
+            "loop_cache_bytes": self.loop_frame_cache_mb * 1024 * 1024,
+            "segments": self.render_segments,
+            "tight": False,
+        }
+
+        # The loop ring is only filled when background normalization fails, so it is not reserved.
+        # Every segment of a segmented render is a full decode/composite/encode pipeline.
+        def estimate(p):
+            return p["segments"] * estimate_render_bytes(
+                source_size, self.target_size, render_engine, p["decoder_threads"], p["encoder_threads"]
+            )
+
+        plan["estimated_bytes"] = estimate(plan)
+        if self.memory_budget and plan["estimated_bytes"] > self.memory_budget.available():
+            plan.update(decoder_threads=1, encoder_threads=2, segments=1, tight=True)
+            plan["estimated_bytes"] = estimate(plan)
+            headroom = self.memory_budget.available() - plan["estimated_bytes"]
+            plan["loop_cache_bytes"] = max(0, min(headroom, plan["loop_cache_bytes"]))
+            logger.info(
+                f"Render memory tight ({self.memory_budget.available() / 1024 ** 2:.0f} MB free): "
+                f"capping frames in flight, estimate {plan['estimated_bytes'] / 1024 ** 2:.0f} MB"
+            )
+        return plan
+
+    def _render_within_budget(
+        self,
+        quote: str,
+        author: str,
+        source_video_path: Path,
+        source_info: Dict,
+        audio_path: Optional[Path],
+        output_path: Path,
+        render_engine: str,
+        renderer: Optional[FFmpegRenderer] = None
+    ) -> Dict:
+        """
+        Render with the given engine inside the memory budget and record its stats.
+
+        A poster and sprite sheet are captured from the composited frames as
+        they are encoded and stored next to output_path.
+
+        Returns:
+            Render stats (estimate, tight mode, peak RSS, duration), also available
+            afterwards from last_render_stats on the calling thread
+        """
+        plan = self._plan_render_memory(source_info, render_engine, renderer)
+        reservation = (
+            self.memory_budget.reserve(plan["estimated_bytes"]) if self.memory_budget else contextlib.nullcontext()
+        )
+
+        thumbnails = (
+            ThumbnailCapture(output_path, self.target_size, self.target_fps, self.target_duration)
+            if self.capture_thumbnails else None
+        )
+
+        render_start = time.perf_counter()
+        try:
+            with reservation, RSSMonitor() as rss:
+                args = (quote, author, source_video_path, source_info, audio_path, output_path)
+                segmented = plan["segments"] > 1 and self._render_segmented(
+                    *args, render_engine, plan["segments"], renderer
+                )
+                if not segmented and render_engine == "ffmpeg":
+                    renderer = renderer or self.ffmpeg_renderer
+                    if plan["tight"]:
+                        renderer = FFmpegRenderer(
+                            preset=renderer.preset,
+                            crf=renderer.crf,
+                            niceness=renderer.niceness,
+                            threads=plan["encoder_threads"],
+                            decoder_threads=plan["decoder_threads"]
+                        )
+                    self._render_with_ffmpeg(*args, renderer=renderer, thumbnails=thumbnails)
+                elif not segmented and render_engine == "pipeline":
+                    pipeline = self.frame_pipeline
+                    if plan["tight"]:
+                        pipeline = FramePipeline(
+                            buffers=2, preset=pipeline.preset, crf=pipeline.crf, threads=plan["encoder_threads"]
+                        )
+                    self._render_with_pipeline(*args, pipeline=pipeline, thumbnails=thumbnails)
+                elif not segmented:
+                    self._render_with_moviepy(
+                        *args,
+                        threads=plan["encoder_threads"],
+                        loop_cache_bytes=plan["loop_cache_bytes"],
+                        thumbnails=thumbnails
+                    )
+        except Exception:
+            if thumbnails:
+                thumbnails.discard()
+            raise
+        if not segmented:
+            plan["segments"] = 1
+        thumbnail_files = self._finish_thumbnails(thumbnails, output_path, segmented)
+
+        stats = {
+            "render_engine": render_engine,
+            "render_seconds": round(time.perf_counter() - render_start, 3),
+            "estimated_bytes": plan["estimated_bytes"],
+            "peak_rss_bytes": rss.peak_bytes,
+            "baseline_rss_bytes": rss.baseline_bytes,
+            "rss_scope": rss.scope,
+            "memory_tight": plan["tight"],
+            "segments": plan["segments"],
+            "thumbnails": sorted(thumbnail_files),
+        }
+        self._local.render_stats = stats
+        logger.info(
+            f"Render memory: peak {rss.scope} RSS {rss.peak_bytes / 1024 ** 2:.0f} MB "
+            f"(+{(rss.peak_bytes - rss.baseline_bytes) / 1024 ** 2:.0f} MB), "
+            f"estimated {plan['estimated_bytes'] / 1024 ** 2:.0f} MB{' (tight)' if plan['tight'] else ''}"
+        )
+        return stats
+
+    def _finish_thumbnails(self, thumbnails: Optional[ThumbnailCapture], output_path: Path, segmented: bool) -> Dict:
+        """Write the captured thumbnails; a missing thumbnail never fails the render."""
+        if not thumbnails:
+            return {}
+        # Segments are joined by a stream copy, so their frames never pass through one place
+        if segmented:
+            try:
+                thumbnails.extract(output_path)
+            except FFmpegError as e:
+                logger.warning(f"Thumbnail extraction for {output_path.name} failed: {e}")
+        return thumbnails.finish()
+
+    def _render_segmented(
+        self,
+        quote: str,
+        author: str,
+        source_video_path: Path,
+        source_info: Dict,
+        audio_path: Optional[Path],
+        output_path: Path,
+        render_engine: str,
+        segments: int,
+        renderer: Optional[FFmpegRenderer] = None
+    ) -> bool:
+        """
+        Composite and encode the timeline as parallel segments joined by a stream copy.
+
+        Segments seek into the normalized background, so it is built first.
+        Returns False when normalization fails and the caller should render in one piece.
+        """
+        try:
+            background_path = self.background_cache.get_or_create(
+                source_video_path,
+                source_video_path.stem,
+                self.target_size,
+                self.target_fps,
+                self.target_duration,
+                source_duration=source_info["duration"]
+            )
+        except FFmpegError as e:
+            logger.warning(f"Background normalization failed, rendering without segments: {e}")
+            return False
+
+        overlay_path = self.overlay_cache.png_path(self._get_overlay(quote, author))
+        use(overlay_path)
+        with ProgressBar(total=1, desc=f"Generating video ({segments} segments, {render_engine})") as pbar:
+            # Background/draft renders pass their renderer, so every render shares one MoviePy process pool
+            self.segmented_renderer.render(
+                render_engine,
+                background_path,
+                overlay_path,
+                audio_path,
+                output_path,
+                target_size=self.target_size,
+                fps=self.target_fps,
+                duration=self.target_duration,
+                segments=segments,
+                ffmpeg_renderer=renderer
+            )
+            pbar.update(1)
+        return True
+
+    def _package_hls(self, output_path: Path) -> Optional[Path]:
+        """Segment a finished render into the HLS ladder; the MP4 stays usable if this fails."""
+        if not self.hls:
+            return None
+        start = time.perf_counter()
+        try:
+            playlist = self.hls.package(output_path)
+        except (FFmpegError, VideoProbeError) as e:
+            logger.warning(f"HLS packaging of {output_path.name} failed, serving the MP4 only: {e}")
+            return None
+        logger.info(f"Packaged HLS ladder in {time.perf_counter() - start:.2f}s")
+        return playlist
+
+    @property
+    def last_render_stats(self) -> Optional[Dict]:
+        """Stats of the last render completed on the calling thread, including peak RSS."""
+        return getattr(self._local, "render_stats", None)
+
+    @staticmethod
+    def _timed_stage(name: str, fn: Callable, timings: Dict[str, float]):
+        """Run one pre-render stage and record its duration."""
+        emit(f"Preparing {name}", 0, 1)
+        start = time.perf_counter()
+        try:
+            return fn()
+        finally:
+            timings[name] = time.perf_counter() - start
+            emit(f"Preparing {name}", 1, 1)
+
+    def _prepare_inputs(
+        self,
+        quote: str,
+        author: str,
+        video_url: str,
+        tts_voice: Optional[str],
+        audio_path: Optional[Path],
+        timings: Dict[str, float]
+    ) -> Tuple[Path, Dict]:
+        """
+        Fetch and probe the background, synthesize the voiceover and rasterize
+        the overlay concurrently. If any stage fails the download is cancelled
+        and the first error is raised once the other stages have stopped.
+
+        Returns:
+            Tuple of (local source path, probed source info)
+        """
+        cancel_event = threading.Event()
+
+        def fetch():
+            path = self._download_video(video_url, cancel_event=cancel_event)
+
+            # Read only the headers; reject unusable sources before any decoding
+            info = probe_video(path, min_duration=self.min_source_duration)
+            logger.info(
+                f"Video probed: {info['width']}x{info['height']} @ {info['fps']}fps, "
+                f"{info['duration']}s, {info['codec']}"
+            )
+            return path, info
+
+        stages = {
+            "fetch": fetch,
+            "overlay": lambda: self._get_overlay(quote, author),
+        }
+        if tts_voice:
+            stages["tts"] = lambda: TTSClient().generate_voice(quote, tts_voice, str(audio_path))
+
+        start = time.perf_counter()
+        executor = ThreadPoolExecutor(max_workers=len(stages), thread_name_prefix="prerender")
+        try:
+            # Each stage runs in a copy of this context so its progress reaches the caller's listener
+            futures = {
+                name: executor.submit(contextvars.copy_context().run, self._timed_stage, name, fn, timings)
+                for name, fn in stages.items()
+            }
+            wait(futures.values(), return_when=FIRST_EXCEPTION)
+            for name, future in futures.items():
+                if future.done() and future.exception() is not None:
+                    logger.error(f"Pre-render stage '{name}' failed, cancelling the others")
+                    cancel_event.set()
+                    raise future.exception()
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+        wall = time.perf_counter() - start
+        stage_times = ", ".join(f"{name} {timings[name]:.2f}s" for name in stages if name in timings)
+        logger.info(
+            f"Pre-render stages: {stage_times}; wall {wall:.2f}s "
+            f"(saved {sum(timings[name] for name in stages) - wall:.2f}s by overlapping)"
+        )
+        timings["prepare"] = wall
+        return futures["fetch"].result()
+
+    def generate_video(
+        self,
+        quote: str,
+        author: str,
+        video_url: str,
+        tts_voice: str = None,
+        render_engine: Optional[str] = None
+    ) -> Optional[str]:
+        """
+        Memory-optimized video generation with optional TTS audio
+
+        Args:
+            quote: Quote text to overlay
+            author: Quote author
+            video_url: Background video URL
+            tts_voice: Optional edge-tts voice used for the voiceover
+            render_engine: "moviepy" or "ffmpeg"; defaults to the generator's render_engine
+
+        Returns:
+            Path of the generated video, or None on failure. Render stats including
+            peak RSS are available from last_render_stats afterwards.
+        """
+        temp_audio_path = None
+        render_engine = render_engine or self.render_engine
+        timings = {}
+        self._local.render_stats = None
+
+        with self.leases.hold():
+            try:
+                if render_engine not in self.RENDER_ENGINES:
+                    raise VideoGeneratorError(f"Unknown render engine: {render_engine}")
+
+                if tts_voice:
+                    temp_audio_path = self.temp_dir / f"temp_audio_{uuid.uuid4().hex}.mp3"
+                    use(temp_audio_path)
+
+                source_video_path, source_info = self._prepare_inputs(
+                    quote, author, video_url, tts_voice, temp_audio_path, timings
+                )
+
+                # Generate output path
+                output_path = self._output_path()
+                use(output_path)
+
+                stats = self._render_within_budget(
+                    quote, author, source_video_path, source_info, temp_audio_path, output_path, render_engine
+                )
+                timings["render"] = stats["render_seconds"]
+                self._package_hls(output_path)
+
+                logger.info(f"Video generated at: {output_path} (render {timings['render']:.2f}s)")
+                return str(output_path)
+
+            except Exception as e:
+                logger.error("Error generating video", exc_info=True)
+                import traceback
+                logger.error(traceback.format_exc())
+                return None
+
+            finally:
+                if temp_audio_path and temp_audio_path.exists():
+                    temp_audio_path.unlink()
+
+    def _preview_size(self) -> Tuple[int, int]:
+        """Return target_size scaled by preview_scale, rounded down to even dimensions for yuv420p."""
+        return tuple(int(side * self.preview_scale) // 2 * 2 for side in self.target_size)
+
+    def generate_preview(
+        self,
+        quote: str,
+        author: str,
+        video_url: str,
+        tts_voice: str = None,
+        render_engine: Optional[str] = None
+    ) -> Optional[Dict]:
+        """
+        Render a fast low-resolution draft and record its inputs for the final render.
+
+        The preview is encoded at preview_scale and preview_fps with a fast
+        preset, reusing the full-size overlay scaled down so the text layout
+        matches the final video. The full-resolution render only happens via
+        approve_draft, or in the background when auto_finalize_drafts is set.
+
+        Args:
+            quote: Quote text to overlay
+            author: Quote author
+            video_url: Background video URL
+            tts_voice: Optional edge-tts voice used for the voiceover
+            render_engine: Engine for the final render; defaults to the generator's render_engine
+
+        Returns:
+            The recorded draft (with "id" and "preview_path"), or None on failure
+        """
+        draft_id = self.drafts.new_id()
+        audio_path = self.drafts.asset_path(draft_id, ".mp3") if tts_voice else None
+        timings = {}
+
+        with self.leases.hold(audio_path):
+            try:
+                render_engine = render_engine or self.render_engine
+                if render_engine not in self.RENDER_ENGINES:
+                    raise VideoGeneratorError(f"Unknown render engine: {render_engine}")
+
+                source_video_path, source_info = self._prepare_inputs(
+                    quote, author, video_url, tts_voice, audio_path, timings
+                )
+                overlay_path = self.overlay_cache.png_path(self._get_overlay(quote, author))
+                preview_path = self.output_dir / f"preview_{draft_id}.mp4"
+                use(overlay_path, preview_path)
+
+                render_start = time.perf_counter()
+                self.preview_renderer.render(
+                    source_video_path,
+                    overlay_path,
+                    audio_path,
+                    preview_path,
+                    target_size=self._preview_size(),
+                    fps=self.preview_fps,
+                    duration=self.target_duration,
+                    loop=source_info["duration"] < self.target_duration,
+                    overlay_scale=self.preview_scale
+                )
+                timings["render"] = time.perf_counter() - render_start
+
+                draft = self.drafts.create(
+                    draft_id,
+                    quote=quote,
+                    author=author,
+                    video_url=video_url,
+                    tts_voice=tts_voice,
+                    audio_path=str(audio_path) if audio_path else None,
+                    render_engine=render_engine,
+                    preview_path=str(preview_path)
+                )
+                logger.info(
+                    f"Draft {draft_id} preview at: {preview_path} "
+                    f"(prepare {timings['prepare']:.2f}s, render {timings['render']:.2f}s)"
+                )
+
+                if self.auto_finalize_drafts:
+                    self.schedule_draft(draft_id)
+                return draft
+
+            except Exception as e:
+                logger.error("Error generating preview", exc_info=True)
+                if audio_path:
+                    self._cleanup_temp_files(audio_path)
+                return None
+
+    def render_draft(self, draft_id: str, background: bool = False) -> str:
+        """
+        Render the full-resolution video for a draft from its recorded inputs.
+
+        Use approve_draft or schedule_draft to coordinate with other renders of
+        the same draft; this renders unconditionally (normally via final_renderer).
+        """
+        draft = self.drafts.update(draft_id, status="rendering")
+        with self.leases.hold():
+            try:
+                # The source is normally still in the clip cache from the preview
+                source_video_path = self._download_video(draft["video_url"])
+                source_info = probe_video(source_video_path, min_duration=self.min_source_duration)
+                audio_path = Path(draft["audio_path"]) if draft.get("audio_path") else None
+                output_path = self._output_path(draft_id[:8])
+                use(audio_path, output_path)
+
+                # Background finals always use a niced ffmpeg process so they yield to previews
+                stats = self._render_within_budget(
+                    draft["quote"], draft["author"], source_video_path, source_info, audio_path, output_path,
+                    "ffmpeg" if background else draft["render_engine"],
+                    renderer=self.background_renderer if background else None
+                )
+                playlist = self._package_hls(output_path)
+            except Exception:
+                self.drafts.update(draft_id, status="failed")
+                raise
+
+            self.drafts.update(
+                draft_id,
+                status="done",
+                output_path=str(output_path),
+                hls_path=str(playlist) if playlist else None,
+                render_stats=stats
+            )
+            logger.info(
+                f"Draft {draft_id} final render at: {output_path} "
+                f"({'background' if background else 'foreground'}, {stats['render_seconds']:.2f}s)"
+            )
+            return str(output_path)
+
+    def shutdown(self, wait: bool = False):
+        """Stop queued background draft renders and the segment worker pool."""
+        self._final_executor.shutdown(wait=wait, cancel_futures=True)
+        self.segmented_renderer.close()
+
+    def schedule_draft(self, draft_id: str) -> Future:
+        """Queue the full-resolution render of a draft on the low-priority background worker."""
+        with self._final_lock:
+            future = self._final_futures.get(draft_id)
+            if future is None:
+                future = self._final_executor.submit(self.final_renderer, draft_id, True)
+                future.add_done_callback(lambda _: self._final_futures.pop(draft_id, None))
+                self._final_futures[draft_id] = future
+            return future
+
+    def approve_draft(self, draft_id: str) -> Optional[str]:
+        """
+        Return the full-resolution video for a draft, rendering it now if needed.
+
+        A finished background render is returned immediately and a running one
+        is awaited; a queued one is cancelled and rendered at normal priority.
+
+        Returns:
+            Path of the final video, or None if the draft is unknown or rendering failed
+        """
+        draft = self.drafts.get(draft_id)
+        if draft is None:
+            logger.error(f"Unknown draft: {draft_id}")
+            return None
+        if draft["status"] == "done" and draft.get("output_path") and Path(draft["output_path"]).exists():
+            return draft["output_path"]
+
+        with self._final_lock:
+            future = self._final_futures.get(draft_id)
+            if future is not None and future.cancel():
+                future = None
+
+        try:
+            if future is not None:
+                return future.result()
+            return self.final_renderer(draft_id, False)
+        except Exception as e:
+            logger.error(f"Error rendering draft {draft_id}", exc_info=True)
+            return None
+
+    def discard_draft(self, draft_id: str) -> bool:
+        """Drop a draft, its preview and voiceover, cancelling a queued final render."""
+        with self._final_lock:
+            future = self._final_futures.get(draft_id)
+            if future is not None:
+                future.cancel()
+
+        draft = self.drafts.delete(draft_id)
+        if draft is None:
+            return False
+        self._cleanup_temp_files(Path(draft["preview_path"]))
+        logger.info(f"Discarded draft {draft_id}")
+        return True
+
+    def generate_video_formats(
+        self,
+        quote: str,
+        author: str,
+        video_url: str,
+        formats: Tuple[str, ...] = ("9:16", "1:1", "16:9"),
+        tts_voice: str = None
+    ) -> Optional[Dict[str, str]]:
+        """
+        Render the same reel in several aspect ratios from one decode of the source.
+
+        The source is decoded once and each frame is split to a per-format
+        crop/scale/overlay branch and encoder, so an extra format costs only its
+        encode. Always uses the ffmpeg filtergraph.
+
+        Args:
+            quote: Quote text to overlay
+            author: Quote author
+            video_url: Background video URL
+            formats: Keys of OUTPUT_FORMATS to render
+            tts_voice: Optional edge-tts voice used for the voiceover
+
+        Returns:
+            Mapping of format to output path, or None on failure
+        """
+        temp_audio_path = None
+        timings = {}
+        self._local.render_stats = None
+
+        with self.leases.hold():
+            try:
+                unknown = [name for name in formats if name not in self.OUTPUT_FORMATS]
+                if unknown or not formats:
+                    raise VideoGeneratorError(f"Unknown output formats: {unknown or formats}")
+
+                if tts_voice:
+                    temp_audio_path = self.temp_dir / f"temp_audio_{uuid.uuid4().hex}.mp3"
+                    use(temp_audio_path)
+
+                source_video_path, source_info = self._prepare_inputs(
+                    quote, author, video_url, tts_voice, temp_audio_path, timings
+                )
+
+                # One id for the whole set, so its formats sort together
+                base = self._output_path()
+                outputs = {}
+                for name in formats:
+                    target_size = self.OUTPUT_FORMATS[name]
+                    overlay_path = self.overlay_cache.png_path(self._get_overlay(quote, author, target_size))
+                    output_path = base.with_name(f"{base.stem}_{name.replace(':', 'x')}.mp4")
+                    outputs[name] = (target_size, overlay_path, output_path)
+                    use(overlay_path, output_path)
+
+                stats = self._render_formats_within_budget(
+                    source_video_path, source_info, outputs, temp_audio_path
+                )
+                timings["render"] = stats["render_seconds"]
+                for _, _, output_path in outputs.values():
+                    self._package_hls(output_path)
+
+                logger.info(f"Rendered {len(outputs)} formats in {timings['render']:.2f}s")
+                return {name: str(output_path) for name, (_, _, output_path) in outputs.items()}
+
+            except Exception as e:
+                logger.error("Error generating multi-format video", exc_info=True)
+                return None
+
+            finally:
+                if temp_audio_path and temp_audio_path.exists():
+                    temp_audio_path.unlink()
+
+    def _render_formats_within_budget(
+        self,
+        source_video_path: Path,
+        source_info: Dict,
+        outputs: Dict[str, Tuple[Tuple[int, int], Path, Path]],
+        audio_path: Optional[Path]
+    ) -> Dict:
+        """
+        Render every format in one ffmpeg process inside the memory budget and record its stats.
+
+        The reservation covers one render estimate per format, since each
+        format has its own frames and encoder. A poster and sprite sheet are
+        split off each format's composited frames by the same process.
+
+        Returns:
+            Render stats, also available afterwards from last_render_stats on the calling thread
+        """
+        cpus = min(os.cpu_count() or 1, 16)
+        source_size = (source_info["width"], source_info["height"])
+        renderer = self.ffmpeg_renderer
+        estimated_bytes = sum(
+            estimate_render_bytes(
+                source_size, target_size, "ffmpeg", renderer.decoder_threads or cpus, renderer.threads or cpus
+            )
+            for target_size, _, _ in outputs.values()
+        )
+        reservation = self.memory_budget.reserve(estimated_bytes) if self.memory_budget else contextlib.nullcontext()
+
+        thumbnails = [
+            ThumbnailCapture(output_path, target_size, self.target_fps, self.target_duration, label=f"thumb{index}")
+            for index, (target_size, _, output_path) in enumerate(outputs.values())
+        ] if self.capture_thumbnails else []
+
+        render_start = time.perf_counter()
+        try:
+            with reservation, RSSMonitor() as rss:
+                renderer.render_multi_format(
+                    source_video_path,
+                    list(outputs.values()),
+                    audio_path,
+                    fps=self.target_fps,
+                    duration=self.target_duration,
+                    loop=source_info["duration"] < self.target_duration,
+                    thumbnails=thumbnails or None
+                )
+        except Exception:
+            for capture in thumbnails:
+                capture.discard()
+            raise
+        thumbnail_files = {
+            name: sorted(self._finish_thumbnails(capture, output_path, False))
+            for capture, (name, (_, _, output_path)) in zip(thumbnails, outputs.items())
+        }
+
+        stats = {
+            "render_engine": "ffmpeg",
+            "render_seconds": round(time.perf_counter() - render_start, 3),
+            "estimated_bytes": estimated_bytes,
+            "peak_rss_bytes": rss.peak_bytes,
+            "baseline_rss_bytes": rss.baseline_bytes,
+            "rss_scope": rss.scope,
+            "memory_tight": False,
+            "segments": 1,
+            "formats": len(outputs),
+            "thumbnails": thumbnail_files,
+        }
+        self._local.render_stats = stats
+        logger.info(
+            f"Render memory: peak {rss.scope} RSS {rss.peak_bytes / 1024 ** 2:.0f} MB "
+            f"(+{(rss.peak_bytes - rss.baseline_bytes) / 1024 ** 2:.0f} MB), "
+            f"estimated {estimated_bytes / 1024 ** 2:.0f} MB for {len(outputs)} formats"
+        )
+        return stats
+
+    def _prepare_batch_item(self, quote: str, author: str, tts_voice: Optional[str]) -> Tuple[Path, Optional[Path]]:
+        """Rasterize one batch item's overlay and synthesize its voiceover."""
+        overlay_path = self.overlay_cache.png_path(self._get_overlay(quote, author))
+        audio_path = self.temp_dir / f"temp_audio_{uuid.uuid4().hex}.mp3" if tts_voice else None
+        use(overlay_path, audio_path)
+        if audio_path:
+            TTSClient().generate_voice(quote, tts_voice, str(audio_path))
+        return overlay_path, audio_path
+
+    def generate_videos(
+        self,
+        items: List[Tuple[str, str, Optional[str]]],
+        video_url: str,
+        max_workers: int = 2,
+        outputs_per_process: int = 8
+    ) -> List[Optional[str]]:
+        """
+        Render many quotes over the same background clip.
+
+        The clip is fetched, probed and normalized once. Each ffmpeg process then
+        decodes the normalized background a single time and splits it to one
+        overlay and libx264 encoder per reel; up to max_workers processes run in
+        parallel. Batches always use the ffmpeg filtergraph regardless of
+        render_engine, since MoviePy cannot share one decode between outputs.
+
+        Args:
+            items: (quote, author, tts_voice or None) per reel
+            video_url: Background video URL shared by every reel
+            max_workers: Concurrent ffmpeg processes (and overlay/TTS workers)
+            outputs_per_process: Reels encoded by one ffmpeg process
+
+        Returns:
+            Output path per item in input order, None for items that failed
+        """
+        results: List[Optional[str]] = [None] * len(items)
+        audio_paths: List[Optional[Path]] = [None] * len(items)
+        if not items:
+            return results
+
+        with self.leases.hold():
+            try:
+                start = time.perf_counter()
+                source_video_path = self._download_video(video_url)
+                source_info = probe_video(source_video_path, min_duration=self.min_source_duration)
+
+                try:
+                    background_path = self.background_cache.get_or_create(
+                        source_video_path,
+                        source_video_path.stem,
+                        self.target_size,
+                        self.target_fps,
+                        self.target_duration,
+                        source_duration=source_info["duration"]
+                    )
+                    loop = False
+                except FFmpegError as e:
+                    logger.warning(f"Background normalization failed, rendering batch from source: {e}")
+                    background_path = source_video_path
+                    loop = source_info["duration"] < self.target_duration
+                logger.info(f"Batch background ready in {time.perf_counter() - start:.2f}s")
+
+                with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="batch") as executor:
+                    # Overlays and voiceovers for every item
+                    prepared = {}
+                    futures = {
+                        executor.submit(
+                            contextvars.copy_context().run, self._prepare_batch_item, quote, author, tts_voice
+                        ): index
+                        for index, (quote, author, tts_voice) in enumerate(items)
+                    }
+                    for future, index in futures.items():
+                        try:
+                            prepared[index] = future.result()
+                            audio_paths[index] = prepared[index][1]
+                        except Exception as e:
+                            logger.error(f"Batch item {index} failed to prepare: {e}")
+
+                    # Shared-decode encodes, outputs_per_process reels per ffmpeg process
+                    base = self._output_path()
+                    jobs = [
+                        (index, *prepared[index], base.with_name(f"{base.stem}_{index}.mp4"))
+                        for index in sorted(prepared)
+                    ]
+                    use(*(output_path for *_, output_path in jobs))
+                    groups = [jobs[i:i + outputs_per_process] for i in range(0, len(jobs), outputs_per_process)]
+                    render_start = time.perf_counter()
+                    futures = {
+                        executor.submit(
+                            self.ffmpeg_renderer.render_batch,
+                            background_path,
+                            [(overlay_path, audio_path, output_path) for _, overlay_path, audio_path, output_path in group],
+                            self.target_size,
+                            self.target_fps,
+                            self.target_duration,
+                            loop
+                        ): group
+                        for group in groups
+                    }
+                    for future, group in futures.items():
+                        try:
+                            future.result()
+                        except FFmpegError as e:
+                            logger.error(f"Batch encode of {len(group)} reels failed: {e}")
+                            continue
+                        for index, _, _, output_path in group:
+                            results[index] = str(output_path)
+
+                done = sum(1 for path in results if path)
+                logger.info(
+                    f"Batch rendered {done}/{len(items)} videos in {time.perf_counter() - start:.2f}s "
+                    f"(encode {time.perf_counter() - render_start:.2f}s)"
+                )
+                return results
+
+            except Exception as e:
+                logger.error("Error generating video batch", exc_info=True)
+                return results
 
+            finally:
+                for audio_path in audio_paths:
+                    if audio_path:
+                        self._cleanup_temp_files(audio_path)
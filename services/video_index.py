@@ -0,0 +1,265 @@
+import base64
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS videos (
+    filename TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    quote TEXT,
+    author TEXT,
+    provider TEXT,
+    voice TEXT,
+    render_engine TEXT,
+    metadata TEXT
+);
+CREATE INDEX IF NOT EXISTS videos_created ON videos (created, filename);
+CREATE INDEX IF NOT EXISTS videos_size ON videos (size, filename);
+CREATE INDEX IF NOT EXISTS videos_author ON videos (author COLLATE NOCASE, created);
+CREATE INDEX IF NOT EXISTS videos_provider ON videos (provider, created);
+CREATE INDEX IF NOT EXISTS videos_voice ON videos (voice, created);
+"""
+
+# Render metadata stored in their own (filterable) columns; anything else goes into the metadata JSON
+COLUMNS = ("quote", "author", "provider", "voice", "render_engine")
+
+
+class VideoIndexError(Exception):
+    """Custom exception for video index errors"""
+    pass
+
+
+class VideoIndex:
+    """
+    SQLite index of rendered videos and their render metadata.
+
+    Renders record their outputs as they finish (from any process; the
+    database is shared), and ``reconcile`` brings the index in line with the
+    output directory for files written or deleted behind its back. Listings
+    are served from the index with keyset (cursor) pagination, so a page
+    costs the same however many videos exist.
+    """
+
+    # Sort name -> SQL expression; filename breaks ties so cursors are stable
+    SORTS = {
+        "created": "created",
+        "size": "size",
+        "author": "COALESCE(author, '')",
+        "filename": "filename",
+    }
+    MAX_LIMIT = 200
+
+    def __init__(self, db_path: Path, output_dir: Path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.output_dir = Path(output_dir)
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        # One connection per thread and process; connections must not cross a fork
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def record(self, video_path: Path, **metadata):
+        """
+        Add or replace the entry of a finished video.
+
+        Args:
+            video_path: Rendered file inside the output directory
+            **metadata: quote, author, provider, voice, render_engine and any
+                other JSON-serializable render details (e.g. render_stats)
+        """
+        video_path = Path(video_path)
+        stat = video_path.stat()
+        extra = {name: value for name, value in metadata.items() if name not in COLUMNS}
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO videos (filename, size, created, quote, author, provider, voice, render_engine, metadata) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    video_path.name, stat.st_size, time.time(),
+                    *(metadata.get(name) for name in COLUMNS),
+                    json.dumps(extra) if extra else None
+                )
+            )
+
+    def get(self, filename: str) -> Optional[Dict]:
+        """Return the entry of a video, or None if it is not indexed."""
+        row = self._connect().execute("SELECT * FROM videos WHERE filename = ?", (filename,)).fetchone()
+        return self._entry(row) if row else None
+
+    def remove(self, filename: str):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM videos WHERE filename = ?", (filename,))
+
+    def reconcile(self) -> Dict[str, int]:
+        """
+        Sync the index with the MP4s in the output directory.
+
+        Files missing from the index are added (without render metadata),
+        entries whose file is gone are removed and changed sizes are updated.
+
+        Returns:
+            Counts of added, removed and updated entries
+        """
+        scan_started = time.time()
+        on_disk = {}
+        with os.scandir(self.output_dir) as entries:
+            for entry in entries:
+                if entry.name.endswith(".mp4") and entry.is_file():
+                    stat = entry.stat()
+                    on_disk[entry.name] = (stat.st_size, stat.st_ctime)
+
+        with self._connect() as conn:
+            indexed = {
+                name: (size, created)
+                for name, size, created in conn.execute("SELECT filename, size, created FROM videos")
+            }
+            added = [(name, size, created) for name, (size, created) in on_disk.items() if name not in indexed]
+            # Entries recorded after the scan began may be for files the scan missed
+            removed = [
+                (name,) for name, (_, created) in indexed.items()
+                if name not in on_disk and created < scan_started
+            ]
+            updated = [
+                (on_disk[name][0], name) for name, (size, _) in indexed.items()
+                if name in on_disk and on_disk[name][0] != size
+            ]
+            # A render may record its file between the SELECT and here; its entry wins
+            conn.executemany("INSERT OR IGNORE INTO videos (filename, size, created) VALUES (?, ?, ?)", added)
+            conn.executemany("DELETE FROM videos WHERE filename = ?", removed)
+            conn.executemany("UPDATE videos SET size = ? WHERE filename = ?", updated)
+
+        counts = {"added": len(added), "removed": len(removed), "updated": len(updated)}
+        if any(counts.values()):
+            logger.info(f"Reconciled video index with {self.output_dir}: {counts}")
+        return counts
+
+    def start_reconciler(self, interval: float) -> threading.Event:
+        """Reconcile now and then every interval seconds on a daemon thread; set the returned event to stop."""
+        stop = threading.Event()
+
+        def run():
+            while True:
+                try:
+                    self.reconcile()
+                except Exception as e:
+                    logger.error(f"Video index reconcile failed: {e}")
+                if stop.wait(interval):
+                    return
+
+        threading.Thread(target=run, name="video-index", daemon=True).start()
+        return stop
+
+    @staticmethod
+    def _entry(row: sqlite3.Row) -> Dict:
+        entry = {name: row[name] for name in ("filename", "size", "created", *COLUMNS)}
+        entry.update(json.loads(row["metadata"]) if row["metadata"] else {})
+        return entry
+
+    @staticmethod
+    def _encode_cursor(sort: str, order: str, value, filename: str) -> str:
+        payload = json.dumps([sort, order, value, filename]).encode("utf-8")
+        return base64.urlsafe_b64encode(payload).decode("ascii")
+
+    @staticmethod
+    def _decode_cursor(cursor: str, sort: str, order: str) -> Tuple:
+        try:
+            cursor_sort, cursor_order, value, filename = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        except (ValueError, TypeError) as e:
+            raise VideoIndexError(f"Invalid cursor: {e}")
+        if (cursor_sort, cursor_order) != (sort, order):
+            raise VideoIndexError("Cursor was issued for a different sort order")
+        return value, filename
+
+    def query(
+        self,
+        sort: str = "created",
+        order: str = "desc",
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        author: Optional[str] = None,
+        provider: Optional[str] = None,
+        voice: Optional[str] = None
+    ) -> Tuple[List[Dict], Optional[str]]:
+        """
+        Return one page of videos and the cursor of the next page (None on the last page).
+
+        Args:
+            sort: "created", "size", "author" or "filename"
+            order: "asc" or "desc"
+            limit: Page size, capped at MAX_LIMIT
+            cursor: next_cursor of the previous page (same sort and order)
+            since: Only videos created at or after this timestamp
+            until: Only videos created before this timestamp
+            author: Only this author (case-insensitive)
+            provider: Only backgrounds from this provider (coverr, pexels, pixabay)
+            voice: Only this TTS voice
+
+        Raises:
+            VideoIndexError: If sort, order, limit or cursor is invalid
+        """
+        if sort not in self.SORTS:
+            raise VideoIndexError(f"Unknown sort: {sort}")
+        if order not in ("asc", "desc"):
+            raise VideoIndexError(f"Unknown order: {order}")
+        if limit < 1:
+            raise VideoIndexError(f"Invalid limit: {limit}")
+        limit = min(limit, self.MAX_LIMIT)
+        expression = self.SORTS[sort]
+
+        clauses, params = [], []
+        if since is not None:
+            clauses.append("created >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("created < ?")
+            params.append(until)
+        if author:
+            clauses.append("author = ? COLLATE NOCASE")
+            params.append(author)
+        if provider:
+            clauses.append("provider = ?")
+            params.append(provider)
+        if voice:
+            clauses.append("voice = ?")
+            params.append(voice)
+        if cursor:
+            value, filename = self._decode_cursor(cursor, sort, order)
+            clauses.append(f"({expression}, filename) {'<' if order == 'desc' else '>'} (?, ?)")
+            params += [value, filename]
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self._connect().execute(
+            f"SELECT *, {expression} AS sort_value FROM videos {where} "
+            f"ORDER BY {expression} {order}, filename {order} LIMIT ?",
+            (*params, limit + 1)
+        ).fetchall()
+
+        videos = [self._entry(row) for row in rows[:limit]]
+
+        next_cursor = None
+        if len(rows) > limit:
+            last = rows[limit - 1]
+            next_cursor = self._encode_cursor(sort, order, last["sort_value"], last["filename"])
+        return videos, next_cursor
@@ -0,0 +1,64 @@
+import logging
+import mimetypes
+import os
+
+from flask import Response, send_from_directory
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Rendered files get a new name on every render, so clients may reuse them for this long
+DEFAULT_VIDEO_MAX_AGE = 3600
+# HLS types the platform mimetypes table lacks or gets wrong (.ts is often TypeScript/Qt)
+MIMETYPES = {
+    ".m3u8": "application/vnd.apple.mpegurl",
+    ".ts": "video/mp2t",
+}
+
+
+def send_video(
+    directory: str,
+    filename: str,
+    as_attachment: bool = False,
+    max_age: int = DEFAULT_VIDEO_MAX_AGE
+) -> Response:
+    """
+    Serve a rendered file with the headers players and caches rely on.
+
+    Byte ranges are answered with 206 (416 when unsatisfiable), the response
+    carries a strong ETag and Last-Modified so If-None-Match/If-Modified-Since
+    revalidate with a 304 and If-Range resumes safely, and Cache-Control is
+    public with max_age. The body is streamed through the server's
+    wsgi.file_wrapper (sendfile under gunicorn), or handed to the front proxy
+    when the app sets USE_X_SENDFILE.
+
+    Args:
+        directory: Directory the file must be inside
+        filename: Path relative to directory
+        as_attachment: Send Content-Disposition: attachment (downloads)
+        max_age: Cache lifetime in seconds
+
+    Returns:
+        The response (200, 206 or 304)
+
+    Raises:
+        werkzeug.exceptions.NotFound: If the file does not exist or escapes directory
+        werkzeug.exceptions.RequestedRangeNotSatisfiable: If the Range lies outside the file
+    """
+    mimetype = (
+        MIMETYPES.get(os.path.splitext(filename)[1].lower())
+        or mimetypes.guess_type(filename)[0]
+        or "application/octet-stream"
+    )
+    response = send_from_directory(
+        directory,
+        filename,
+        mimetype=mimetype,
+        as_attachment=as_attachment,
+        download_name=os.path.basename(filename) if as_attachment else None,
+        conditional=True,
+        etag=True,
+        max_age=max_age
+    )
+    response.headers["Accept-Ranges"] = "bytes"
+    return response
@@ -0,0 +1,374 @@
+import logging
+import multiprocessing
+import os
+import pickle
+import signal
+import sys
+import threading
+import uuid
+from collections import deque
+from concurrent.futures import Future
+from multiprocessing.connection import Connection, wait
+from typing import Callable, Deque, Dict, Optional, Set, Tuple
+
+from services.progress import ProgressListener, current_listener, report_progress
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Seconds the fork server waits for a message before reaping exited workers
+REAP_INTERVAL = 0.5
+
+
+class WorkerPoolError(Exception):
+    """Custom exception for render worker pool errors"""
+    pass
+
+
+def fork_available() -> bool:
+    """Whether worker processes can be forked from the loaded server (not on Windows/macOS spawn-only setups)."""
+    return "fork" in multiprocessing.get_all_start_methods()
+
+
+def _worker_loop(conn: Connection):
+    # Runs in a worker: one call at a time over its own pipe; its progress, then its result, go back on it
+    while True:
+        task = conn.recv()
+        if task is None:
+            return
+        token, payload = task
+        conn.send(("started", token, None))
+
+        def forward(stage: str, n: float, total: Optional[float]):
+            conn.send(("progress", token, (stage, n, total)))
+
+        try:
+            fn, args, kwargs = pickle.loads(payload)
+            with report_progress(forward):
+                message = ("done", token, fn(*args, **kwargs))
+        except Exception as e:
+            message = ("failed", token, e)
+        try:
+            conn.send(message)
+        except Exception as e:
+            conn.send(("failed", token, WorkerPoolError(f"Render result could not be sent back: {e}")))
+
+
+def _fork_server(server: Connection, workers: int, warm_up: Optional[Callable[[], None]]):
+    """
+    Fork, feed, reap and replace render workers until told to stop.
+
+    Runs in a process forked from the server before the server started any
+    threads and never starts one itself, so every worker is forked from a
+    single-threaded process. Each worker has its own pipe to this process,
+    which hands it one queued call at a time and relays its messages to the
+    server; no lock is shared with a worker, so one killed mid-message breaks
+    only its own pipe.
+    """
+    children: Set[int] = set()
+    pipes: Dict[int, Connection] = {}
+    idle: Deque[int] = deque()
+    # Call each worker was handed, and the workers that acknowledged theirs
+    busy: Dict[int, Tuple[str, bytes]] = {}
+    started: Set[int] = set()
+    pending: Deque[Tuple[str, bytes]] = deque()
+
+    def spawn():
+        parent_end, child_end = multiprocessing.Pipe()
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                signal.signal(signal.SIGTERM, signal.SIG_DFL)
+                server.close()
+                parent_end.close()
+                for pipe in pipes.values():
+                    pipe.close()
+                _worker_loop(child_end)
+            except BaseException:
+                logger.error(f"Render worker {os.getpid()} failed", exc_info=True)
+                code = 1
+            finally:
+                os._exit(code)
+        child_end.close()
+        children.add(pid)
+        pipes[pid] = parent_end
+        idle.append(pid)
+
+    def stop(*_):
+        raise SystemExit(0)
+
+    signal.signal(signal.SIGTERM, stop)
+    if warm_up is not None:
+        # Once, here, so every worker (and every replacement) starts warm
+        try:
+            warm_up()
+        except Exception as e:
+            logger.warning(f"Render worker warm-up failed: {e}")
+    for _ in range(workers):
+        spawn()
+    logger.info(f"Render workers ready: {sorted(pipes)}")
+    server.send(("ready", None, None))
+
+    graceful, stopping = False, False
+    try:
+        while not stopping or (graceful and (pending or busy)):
+            readers = [*pipes.values()] if stopping else [server, *pipes.values()]
+            for conn in wait(readers, REAP_INTERVAL):
+                if conn is server:
+                    try:
+                        command, token, payload = server.recv()
+                    except EOFError:
+                        # The server is gone
+                        command = "kill"
+                    if command == "run":
+                        pending.append((token, payload))
+                    else:
+                        stopping, graceful = True, command == "stop"
+                    continue
+
+                pid = next(pid for pid, pipe in pipes.items() if pipe is conn)
+                try:
+                    message = conn.recv()
+                except (EOFError, OSError):
+                    # The worker died; its call is settled once it is reaped
+                    pipes.pop(pid).close()
+                    if pid in idle:
+                        idle.remove(pid)
+                    continue
+                except Exception as e:
+                    token = busy[pid][0] if pid in busy else None
+                    message = ("failed", token, WorkerPoolError(f"Render result could not be read: {e}"))
+                if message[0] == "started":
+                    started.add(pid)
+                    continue
+                server.send(message)
+                if message[0] in ("done", "failed"):
+                    busy.pop(pid, None)
+                    started.discard(pid)
+                    idle.append(pid)
+
+            while children:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+                if pid == 0:
+                    break
+                children.discard(pid)
+                code = os.waitstatus_to_exitcode(status)
+                pipe = pipes.pop(pid, None)
+                if pipe is not None:
+                    pipe.close()
+                if pid in idle:
+                    idle.remove(pid)
+                logger.warning(f"Render worker {pid} exited ({code}); starting a replacement")
+                call = busy.pop(pid, None)
+                if call is not None and pid not in started:
+                    # Died before it took the call (e.g. killed while idle); another worker runs it
+                    pending.appendleft(call)
+                    call = None
+                started.discard(pid)
+                server.send(("exited", call[0] if call else None, (pid, code)))
+                spawn()
+
+            while pending and idle:
+                pid = idle.popleft()
+                token, payload = pending[0]
+                try:
+                    pipes[pid].send((token, payload))
+                except OSError:
+                    # Died while idle; reaped and replaced on a later pass
+                    continue
+                busy[pid] = pending.popleft()
+    finally:
+        if graceful:
+            for pipe in pipes.values():
+                try:
+                    pipe.send(None)
+                except OSError:
+                    pass
+        else:
+            for pid in children:
+                try:
+                    os.kill(pid, signal.SIGTERM)
+                except ProcessLookupError:
+                    pass
+        for pid in children:
+            os.waitpid(pid, 0)
+        try:
+            server.send(("stopped", None, None))
+        except OSError:
+            pass
+
+
+class _Call:
+    def __init__(self, listener: Optional[ProgressListener]):
+        self.listener = listener
+        self.future: Future = Future()
+
+
+class RenderWorkerPool:
+    """
+    Pre-forked pool of render worker processes.
+
+    A fork server is forked from the loaded server, so MoviePy, NumPy and the
+    render services are already imported; it runs ``warm_up`` (e.g.
+    rasterizing a sample quote to load fonts) once and forks the workers from
+    that warm, single-threaded state. Renders then run in separate processes:
+    a burst cannot push the server process past its GIL or memory, and a
+    crashed render takes down only its worker, which the fork server replaces
+    without the multithreaded server ever forking again. Stage progress
+    reported inside a worker is relayed to the listener that was current when
+    ``run`` was called. Workers talk to the fork server over pipes of their
+    own and share no locks, so a worker killed at any point (e.g. by the OOM
+    killer) cannot block the others.
+
+    The pool must be created at startup, before the server starts threads.
+    """
+
+    def __init__(
+        self,
+        workers: int = 2,
+        warm_up: Optional[Callable[[], None]] = None,
+        on_worker_exit: Optional[Callable[[int], None]] = None
+    ):
+        """
+        Args:
+            workers: Worker processes kept running
+            warm_up: Called once in the fork server before the workers are forked
+            on_worker_exit: Called with the pid of a worker that died (e.g. to
+                release what it held); runs on the pool's dispatch thread
+        """
+        if not fork_available():
+            raise WorkerPoolError("Render worker processes need the fork start method")
+        self.workers = workers
+        self.on_worker_exit = on_worker_exit
+        self._conn, server_end = multiprocessing.Pipe()
+        self._calls: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+        # Job threads send calls concurrently; only the dispatch thread receives
+        self._send_lock = threading.Lock()
+        self._closed = False
+
+        self._server_pid = os.fork()
+        if self._server_pid == 0:
+            code = 0
+            try:
+                self._conn.close()
+                _fork_server(server_end, workers, warm_up)
+            except BaseException:
+                logger.error("Render fork server failed", exc_info=True)
+                code = 1
+            finally:
+                sys.stdout.flush()
+                os._exit(code)
+        server_end.close()
+
+        try:
+            kind, _, _ = self._conn.recv()
+        except EOFError:
+            kind = "exited"
+        if kind != "ready":
+            raise WorkerPoolError(f"Render fork server failed to start ({kind})")
+        self._dispatcher = threading.Thread(target=self._dispatch, name="render-results", daemon=True)
+        self._dispatcher.start()
+
+    def run(self, fn: Callable, *args, **kwargs):
+        """
+        Run fn(*args, **kwargs) in a worker process and return its result.
+
+        fn must be importable by name (a module-level function); its arguments
+        and result are pickled. Exceptions raised by fn are re-raised here.
+
+        Raises:
+            WorkerPoolError: If the call cannot be sent, the worker running it
+                died or the pool shut down first
+        """
+        try:
+            payload = pickle.dumps((fn, args, kwargs))
+        except Exception as e:
+            raise WorkerPoolError(f"Cannot send {getattr(fn, '__name__', fn)} to a render worker: {e}")
+
+        token = uuid.uuid4().hex
+        call = _Call(current_listener())
+        with self._lock:
+            if self._closed:
+                raise WorkerPoolError("Render worker pool is shut down")
+            self._calls[token] = call
+        try:
+            try:
+                with self._send_lock:
+                    self._conn.send(("run", token, payload))
+            except OSError as e:
+                raise WorkerPoolError(f"Render fork server is gone: {e}")
+            return call.future.result()
+        finally:
+            with self._lock:
+                self._calls.pop(token, None)
+
+    def _dispatch(self):
+        # Messages of one worker arrive in order, so a call's progress always precedes its result
+        while True:
+            try:
+                kind, token, value = self._conn.recv()
+            except (EOFError, OSError):
+                kind, token, value = "stopped", None, None
+
+            if kind == "stopped":
+                with self._lock:
+                    self._closed = True
+                    calls = list(self._calls.values())
+                for call in calls:
+                    if not call.future.done():
+                        call.future.set_exception(WorkerPoolError("Render worker pool shut down"))
+                self._conn.close()
+                return
+
+            if kind == "exited":
+                pid, code = value
+                with self._lock:
+                    call = self._calls.get(token) if token else None
+                if call is not None:
+                    call.future.set_exception(WorkerPoolError(f"Render worker {pid} died (exit code {code})"))
+                if self.on_worker_exit is not None:
+                    try:
+                        self.on_worker_exit(pid)
+                    except Exception as e:
+                        logger.warning(f"Worker exit handler failed: {e}")
+                continue
+
+            with self._lock:
+                call = self._calls.get(token)
+            if call is None:
+                continue
+            if kind == "progress":
+                if call.listener is not None:
+                    try:
+                        call.listener(*value)
+                    except Exception as e:
+                        logger.debug(f"Progress listener failed: {e}")
+            elif kind == "done":
+                call.future.set_result(value)
+            elif kind == "failed":
+                call.future.set_exception(value)
+
+    def shutdown(self, wait: bool = False):
+        """
+        Stop the workers.
+
+        Args:
+            wait: Let queued calls finish and wait for the processes to exit;
+                otherwise workers are terminated and pending calls fail
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        try:
+            with self._send_lock:
+                self._conn.send(("stop" if wait else "kill", None, None))
+        except OSError:
+            pass
+        if wait:
+            os.waitpid(self._server_pid, 0)
+            self._dispatcher.join()
+        else:
+            threading.Thread(target=os.waitpid, args=(self._server_pid, 0), name="render-reaper", daemon=True).start()
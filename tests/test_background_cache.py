@@ -0,0 +1,79 @@
+import os
+import time
+
+import pytest
+
+from services.background_cache import BackgroundCache
+
+
+@pytest.fixture
+def encodes(monkeypatch):
+    """Replace ffmpeg with a stub that writes 100 bytes to the output path and records each call."""
+    calls = []
+
+    def fake_run_ffmpeg(args, niceness=0):
+        calls.append(args)
+        with open(args[-1], "wb") as f:
+            f.write(b"x" * 100)
+
+    monkeypatch.setattr("services.background_cache.run_ffmpeg", fake_run_ffmpeg)
+    return calls
+
+
+def _age(path, seconds):
+    mtime = time.time() - seconds
+    os.utime(path, (mtime, mtime))
+
+
+def test_key_covers_source_and_geometry(tmp_path):
+    cache = BackgroundCache(tmp_path)
+    key = cache.key("clip-a", (1080, 1920), 30, 15)
+
+    assert key == BackgroundCache(tmp_path / "other").key("clip-a", (1080, 1920), 30, 15.0)
+    assert len({
+        key,
+        cache.key("clip-b", (1080, 1920), 30, 15),
+        cache.key("clip-a", (1920, 1080), 30, 15),
+        cache.key("clip-a", (1080, 1920), 25, 15),
+        cache.key("clip-a", (1080, 1920), 30, 10),
+    }) == 5
+
+
+def test_lookup_misses_until_built_then_hits(tmp_path, encodes):
+    cache = BackgroundCache(tmp_path)
+    assert cache.lookup("clip-a", (180, 320), 30, 2) is None
+
+    path = cache.get_or_create(tmp_path / "source.mp4", "clip-a", (180, 320), 30, 2)
+
+    assert cache.lookup("clip-a", (180, 320), 30, 2) == path
+    assert cache.lookup("clip-a", (320, 180), 30, 2) is None
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert not list(tmp_path.glob("*.part"))
+
+
+def test_get_or_create_reuses_an_existing_background(tmp_path, encodes):
+    cache = BackgroundCache(tmp_path)
+    first = cache.get_or_create(tmp_path / "source.mp4", "clip-a", (180, 320), 30, 2, source_duration=1)
+    second = cache.get_or_create(tmp_path / "source.mp4", "clip-a", (180, 320), 30, 2, source_duration=1)
+
+    assert first == second and len(encodes) == 1
+    # A source shorter than the output is looped; a long enough one is not
+    assert encodes[0][:2] == ["-stream_loop", "-1"]
+    cache.get_or_create(tmp_path / "source.mp4", "clip-b", (180, 320), 30, 2, source_duration=5)
+    assert "-stream_loop" not in encodes[1]
+
+
+def test_eviction_removes_least_recently_used(tmp_path, encodes):
+    cache = BackgroundCache(tmp_path, max_bytes=250)
+    old = cache.get_or_create(tmp_path / "source.mp4", "old", (180, 320), 30, 2)
+    used = cache.get_or_create(tmp_path / "source.mp4", "used", (180, 320), 30, 2)
+    _age(old, 60)
+    _age(used, 120)
+    # A lookup marks the entry as recently used
+    cache.lookup("used", (180, 320), 30, 2)
+
+    new = cache.get_or_create(tmp_path / "source.mp4", "new", (180, 320), 30, 2)
+
+    assert not old.exists()
+    assert used.exists() and new.exists()
+    assert len(encodes) == 3
@@ -0,0 +1,83 @@
+from services.clip_cache import ClipCache
+
+
+def _write(path, data):
+    path.write_bytes(data)
+    return path
+
+
+def test_hit_after_put(tmp_path):
+    cache = ClipCache(tmp_path / "clips")
+    assert cache.get("https://example.com/a.mp4") is None
+
+    blob = cache.put("https://example.com/a.mp4", _write(cache.new_temp_path(), b"clip-a"))
+
+    assert cache.get("https://example.com/a.mp4") == blob
+    assert blob.read_bytes() == b"clip-a"
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_identical_content_is_deduplicated(tmp_path):
+    cache = ClipCache(tmp_path / "clips")
+    first = cache.put("https://cdn-1.example.com/a.mp4", _write(cache.new_temp_path(), b"same"))
+    second = cache.put("https://cdn-2.example.com/a.mp4", _write(cache.new_temp_path(), b"same"))
+
+    assert first == second
+    assert cache.stats()["entries"] == 1
+    assert cache.stats()["urls"] == 2
+
+
+def test_lru_eviction_respects_budget(tmp_path):
+    cache = ClipCache(tmp_path / "clips", max_bytes=10)
+    cache.put("a", _write(cache.new_temp_path(), b"aaaaa"))
+    cache.put("b", _write(cache.new_temp_path(), b"bbbbb"))
+    cache.get("a")
+    cache.put("c", _write(cache.new_temp_path(), b"ccccc"))
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+    assert cache.stats()["bytes"] <= 10
+
+
+def test_index_survives_restart(tmp_path):
+    cache = ClipCache(tmp_path / "clips")
+    blob = cache.put("a", _write(cache.new_temp_path(), b"persisted"))
+
+    assert ClipCache(tmp_path / "clips").get("a") == blob
+
+
+def test_put_indexes_blob_already_on_disk(tmp_path):
+    writer = ClipCache(tmp_path / "clips")
+    other = ClipCache(tmp_path / "clips")
+    writer.put("a", _write(writer.new_temp_path(), b"shared"))
+
+    # Same content from a second instance that never saw the blob indexed
+    blob = other.put("b", _write(other.new_temp_path(), b"shared"))
+    assert other.get("b") == blob
+    assert other.stats()["bytes"] == len(b"shared")
+
+    # An unreadable index loses every entry but the blobs remain
+    (tmp_path / "clips" / "index.json").write_text("{truncated")
+    reopened = ClipCache(tmp_path / "clips")
+    assert reopened.put("a", _write(reopened.new_temp_path(), b"shared")) == blob
+    assert reopened.get("a") == blob
+
+
+def test_instances_sharing_a_directory_see_each_others_entries(tmp_path):
+    # Like render worker processes, each holding its own ClipCache on one directory
+    first = ClipCache(tmp_path / "clips", max_bytes=10)
+    second = ClipCache(tmp_path / "clips", max_bytes=10)
+
+    blob_a = first.put("a", _write(first.new_temp_path(), b"aaaaa"))
+    assert second.get("a") == blob_a
+    second.put("b", _write(second.new_temp_path(), b"bbbbb"))
+    first.get("a")
+
+    # The budget covers both instances' blobs; b is least recently used across them
+    first.put("c", _write(first.new_temp_path(), b"ccccc"))
+    assert second.get("b") is None
+    assert second.get("a") == blob_a
+    assert second.stats()["bytes"] <= 10
+    assert sorted(ClipCache(tmp_path / "clips").stats()[key] for key in ("entries", "urls")) == [2, 2]
@@ -0,0 +1,248 @@
+import json
+import multiprocessing
+import os
+import re
+import signal
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from services.downloader import DownloadCancelled, DownloadError, PartialFetchUnsupported, RangedDownloader
+from services.ffmpeg_utils import run_ffmpeg
+from services.probe import probe_video
+from services.video_generator import VideoGenerator
+
+
+class RangeHandler(BaseHTTPRequestHandler):
+    """Minimal stand-in for a CDN: serves server.payload with optional Range support and faults."""
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        payload = server.payload
+        server.requests.append(self.headers.get("Range"))
+
+        match = re.match(r"bytes=(\d+)-(\d*)", self.headers.get("Range") or "")
+        if match and server.ranges:
+            start = int(match.group(1))
+            end = int(match.group(2)) if match.group(2) else len(payload) - 1
+            body = payload[start:end + 1]
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(payload)}")
+        else:
+            body = payload
+            self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", '"v1"')
+        self.end_headers()
+
+        # Send the start of the body, then hang until released
+        if server.stall_after is not None:
+            self.wfile.write(body[:server.stall_after])
+            self.wfile.flush()
+            server.release.wait(10)
+            return
+
+        # Drop the connection part-way through while faults remain
+        with server.lock:
+            fail = len(body) > 1 and server.faults > 0
+            if fail:
+                server.faults -= 1
+        if fail:
+            self.wfile.write(body[:len(body) // 2])
+            self.wfile.flush()
+            self.connection.shutdown(2)
+            return
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), RangeHandler)
+    httpd.payload = os.urandom(256 * 1024)
+    httpd.ranges = True
+    httpd.faults = 0
+    httpd.requests = []
+    httpd.lock = threading.Lock()
+    httpd.stall_after = None
+    httpd.release = threading.Event()
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.release.set()
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _url(server):
+    return f"http://127.0.0.1:{server.server_address[1]}/clip.mp4"
+
+
+def _downloader(**kwargs):
+    kwargs.setdefault("segments", 4)
+    kwargs.setdefault("chunk_size", 8 * 1024)
+    kwargs.setdefault("min_segment_size", 16 * 1024)
+    return RangedDownloader(read_timeout=5, **kwargs)
+
+
+def test_parallel_ranges_reassemble_file(server, tmp_path):
+    dest = _downloader().download(_url(server), tmp_path / "clip.part")
+
+    assert dest.read_bytes() == server.payload
+    segment_requests = [r for r in server.requests if r != "bytes=0-0"]
+    assert len(segment_requests) == 4
+    assert not (tmp_path / "clip.part.state").exists()
+
+
+def test_dropped_connections_resume_from_offset(server, tmp_path):
+    server.faults = 3
+    progress = []
+
+    dest = _downloader().download(_url(server), tmp_path / "clip.part", progress=progress.append)
+
+    assert dest.read_bytes() == server.payload
+    # Every byte is written exactly once even though segments were retried
+    assert sum(progress) == len(server.payload)
+
+
+def test_partial_download_resumes_in_later_call(server, tmp_path):
+    dest = tmp_path / "clip.part"
+    server.faults = 100
+    with pytest.raises(DownloadError):
+        _downloader(segments=1, max_retries=0).download(_url(server), dest)
+
+    server.faults = 0
+    server.requests.clear()
+    _downloader(segments=1).download(_url(server), dest)
+
+    assert dest.read_bytes() == server.payload
+    resumed_from = int(re.match(r"bytes=(\d+)-", server.requests[-1]).group(1))
+    assert resumed_from > 0
+
+
+def _download_small_writes(url, dest):
+    # Small writes stay in the file buffer between checkpoints
+    downloader = _downloader(segments=2, chunk_size=1000)
+    downloader.checkpoint_bytes = 16 * 1024
+    downloader.download(url, dest)
+
+
+def test_killed_download_resumes_byte_identical(server, tmp_path):
+    dest = tmp_path / "clip.part"
+    state_path = tmp_path / "clip.part.state"
+    server.stall_after = 100_000
+    worker = multiprocessing.get_context("fork").Process(target=_download_small_writes, args=(_url(server), dest))
+    worker.start()
+    # Wait until both segments have checkpointed everything they will receive, then kill mid-segment
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        try:
+            if all(segment["done"] >= 80_000 for segment in json.loads(state_path.read_text())["segments"]):
+                break
+        except (OSError, ValueError):
+            pass
+        time.sleep(0.02)
+    time.sleep(0.2)
+    os.kill(worker.pid, signal.SIGKILL)
+    worker.join()
+    server.release.set()
+
+    server.stall_after = None
+    server.requests.clear()
+    _downloader(segments=2).download(_url(server), dest)
+
+    assert dest.read_bytes() == server.payload
+    assert all(int(re.match(r"bytes=(\d+)-", r).group(1)) > 0 for r in server.requests if r != "bytes=0-0")
+
+
+def test_concurrent_downloads_of_one_url_share_the_partial_file(server, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    # Separate downloaders, as in separate worker processes, so only the lock file orders them
+    generators = [
+        VideoGenerator(cache_dir=tmp_path / "cache", downloader=_downloader(), partial_fetch=False)
+        for _ in range(2)
+    ]
+    results, errors = [], []
+
+    def fetch(generator):
+        try:
+            results.append(generator._download_video(_url(server)))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=fetch, args=(generator,)) for generator in generators]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    assert len(results) == 2 and results[0] == results[1]
+    assert results[0].read_bytes() == server.payload
+    # The second caller found the clip cached once it got the lock
+    assert server.requests.count("bytes=0-0") == 1
+
+
+def test_server_without_ranges_falls_back_to_single_get(server, tmp_path):
+    server.ranges = False
+
+    dest = _downloader().download(_url(server), tmp_path / "clip.part")
+
+    assert dest.read_bytes() == server.payload
+
+
+def test_cancel_event_aborts_download(server, tmp_path):
+    cancel_event = threading.Event()
+    cancel_event.set()
+
+    with pytest.raises(DownloadCancelled):
+        _downloader().download(_url(server), tmp_path / "clip.part", cancel_event=cancel_event)
+
+
+@pytest.fixture(params=["moov_at_end", "faststart"])
+def mp4_payload(request, tmp_path_factory):
+    path = tmp_path_factory.mktemp("mp4") / f"{request.param}.mp4"
+    args = ["-f", "lavfi", "-i", "testsrc2=size=320x240:rate=25", "-t", "20", "-c:v", "libx264", "-g", "25"]
+    if request.param == "faststart":
+        args += ["-movflags", "+faststart"]
+    run_ffmpeg(args + [str(path)])
+    return path.read_bytes()
+
+
+def test_leading_fetch_transfers_only_first_seconds(server, tmp_path, mp4_payload):
+    server.payload = mp4_payload
+    dest = tmp_path / "clip.part"
+
+    fetched = _downloader().download_leading(_url(server), dest, seconds=5)
+
+    assert fetched < len(mp4_payload) * 0.5
+    assert dest.stat().st_size == len(mp4_payload)
+    # The leading seconds (less the safety margin the generator adds) decode cleanly
+    run_ffmpeg(["-xerror", "-t", "4", "-i", str(dest), "-f", "null", "-"])
+
+
+def test_generator_caches_only_the_leading_seconds(server, tmp_path, mp4_payload, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    server.payload = mp4_payload
+    generator = VideoGenerator(cache_dir=tmp_path / "cache", downloader=_downloader())
+    generator.target_duration = 4
+
+    path = generator._download_video(_url(server))
+
+    # A compact file, not the sparse one at the source's full size
+    assert path.stat().st_size < len(mp4_payload) * 0.5
+    assert generator.clip_cache.stats()["bytes"] == path.stat().st_size
+    assert 4.5 <= probe_video(path)["duration"] < 6
+    assert not [path for path in generator.clip_cache.tmp_dir.iterdir() if path.suffix != ".lock"]
+
+
+def test_leading_fetch_needs_range_support(server, tmp_path, mp4_payload):
+    server.payload = mp4_payload
+    server.ranges = False
+
+    with pytest.raises(PartialFetchUnsupported):
+        _downloader().download_leading(_url(server), tmp_path / "clip.part", seconds=5)
@@ -0,0 +1,576 @@
+import subprocess
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pytest
+from moviepy.video.io.ffmpeg_reader import ffmpeg_parse_infos
+from PIL import Image
+
+from services.ffmpeg_renderer import FFmpegRenderer
+from services.ffmpeg_utils import FFmpegError, ffmpeg_command, run_ffmpeg
+from services.frame_loop import FrameRing, LoopedClip
+from services.frame_pipeline import FramePipeline
+from services.hls import HLSPackager, ladder_sizes
+from services.memory import MemoryBudget
+from services.overlay import OverlayCache, QuoteOverlay
+from services.probe import VideoProbeError, probe_video
+from services.renditions import crop_efficiency, rank_by_crop_efficiency, select_rendition
+from services.segmented import segment_bounds
+from services.thumbnails import thumbnail_paths
+from services.video_generator import VideoGenerator
+
+
+def test_run_ffmpeg_lowers_priority_through_nice(monkeypatch):
+    commands = []
+    monkeypatch.setattr(
+        "services.ffmpeg_utils.subprocess.run",
+        lambda cmd, **kwargs: commands.append((cmd, kwargs)) or subprocess.CompletedProcess(cmd, 0, b"", b"")
+    )
+    monkeypatch.setattr("services.ffmpeg_utils.shutil.which", lambda name: "/usr/bin/nice")
+
+    run_ffmpeg(["-version"], niceness=10)
+    run_ffmpeg(["-version"])
+
+    assert commands[0][0][:3] == ["/usr/bin/nice", "-n", "10"]
+    assert commands[0][0][3:] == ffmpeg_command(["-version"])
+    assert commands[1][0] == ffmpeg_command(["-version"])
+    assert all("preexec_fn" not in kwargs for _, kwargs in commands)
+
+
+def test_ffmpeg_command_loops_background_and_muxes_audio():
+    args = FFmpegRenderer().build_command(
+        Path("bg.mp4"), Path("overlay.png"), Path("voice.mp3"), Path("out.mp4"),
+        target_size=(1080, 1920), fps=30, duration=15
+    )
+
+    assert args[:4] == ["-stream_loop", "-1", "-i", "bg.mp4"]
+    assert args[args.index("-t") + 1] == "15.000"
+    assert ["-map", "2:a"] == args[args.index("2:a") - 1:args.index("2:a") + 1]
+    assert "scale=1080:1920" in args[args.index("-filter_complex") + 1]
+    assert args[-1] == "out.mp4"
+
+
+def test_ffmpeg_command_without_audio():
+    args = FFmpegRenderer().build_command(
+        Path("bg.mp4"), Path("overlay.png"), None, Path("out.mp4"),
+        target_size=(1080, 1920), fps=30, duration=15
+    )
+
+    assert "2:a" not in args
+    assert args.count("-i") == 2
+
+
+def test_ffmpeg_batch_command_shares_one_background_decode():
+    outputs = [
+        (Path("a.png"), Path("a.mp3"), Path("a.mp4")),
+        (Path("b.png"), None, Path("b.mp4")),
+        (Path("c.png"), Path("c.mp3"), Path("c.mp4")),
+    ]
+    args = FFmpegRenderer().build_batch_command(
+        Path("bg.mp4"), outputs, target_size=(1080, 1920), fps=30, duration=15, loop=False
+    )
+    graph = args[args.index("-filter_complex") + 1]
+
+    assert args.count("bg.mp4") == 1
+    assert graph.count("scale=1080:1920") == 1
+    assert "split=3[b0][b1][b2]" in graph
+    # Inputs: background, three overlays, then audio for the first and third reels only
+    assert [args[i + 1] for i, arg in enumerate(args) if arg == "-i"][4:] == ["a.mp3", "c.mp3"]
+    assert ["-map", "4:a"] == args[args.index("4:a") - 1:args.index("4:a") + 1]
+    assert ["-map", "5:a"] == args[args.index("5:a") - 1:args.index("5:a") + 1]
+    assert args.count("libx264") == 3
+
+
+def test_ffmpeg_multi_format_command_splits_before_crop():
+    outputs = [
+        ((1080, 1920), Path("tall.png"), Path("tall.mp4")),
+        ((1080, 1080), Path("square.png"), Path("square.mp4")),
+    ]
+    args = FFmpegRenderer().build_multi_format_command(
+        Path("src.mp4"), outputs, Path("voice.mp3"), fps=30, duration=15, loop=False
+    )
+    graph = args[args.index("-filter_complex") + 1]
+
+    assert args.count("src.mp4") == 1
+    assert graph.startswith("[0:v]fps=30,split=2[s0][s1]")
+    assert "scale=1080:1920" in graph and "scale=1080:1080" in graph
+    # The single voiceover input is muxed into every output
+    assert args.count("3:a") == 2
+
+
+def _naive_composite(frame, rgba):
+    """Full-frame straight-alpha composite of a centered overlay."""
+    frame_h, frame_w = frame.shape[:2]
+    h, w = rgba.shape[:2]
+    x, y = (frame_w - w) // 2, (frame_h - h) // 2
+    out = frame.astype(np.float64)
+    alpha = rgba[..., 3:4] / 255.0
+    out[y:y + h, x:x + w] = rgba[..., :3] * alpha + out[y:y + h, x:x + w] * (1 - alpha)
+    return np.rint(out).astype(np.uint8)
+
+
+def test_overlay_blend_matches_full_frame_composite():
+    rng = np.random.default_rng(0)
+    frame = rng.integers(0, 256, size=(64, 48, 3), dtype=np.uint8)
+    rgba = np.zeros((20, 30, 4), dtype=np.uint8)
+    rgba[5:15, 4:25] = rng.integers(0, 256, size=(10, 21, 4), dtype=np.uint8)
+
+    overlay = QuoteOverlay("key", rgba, frame_size=(48, 64))
+    blended = overlay.blend(frame.copy())
+
+    assert (overlay.w, overlay.h) == (21, 10)
+    assert np.abs(blended.astype(int) - _naive_composite(frame, rgba).astype(int)).max() <= 1
+
+
+def test_overlay_cache_reuses_rendered_overlay(tmp_path):
+    cache = OverlayCache(tmp_path)
+    calls = []
+
+    def render():
+        calls.append(1)
+        return np.zeros((4, 4, 4), dtype=np.uint8)
+
+    first = cache.get_or_render("quote", "author", {"fontsize": 70}, (1080, 1920), render)
+    second = cache.get_or_render("quote", "author", {"fontsize": 70}, (1080, 1920), render)
+    other = cache.get_or_render("quote", "author", {"fontsize": 60}, (1080, 1920), render)
+
+    assert first is second
+    assert other is not first
+    assert len(calls) == 2
+    assert cache.png_path(first).exists()
+
+
+def _make_clip(path, duration, size="320x240"):
+    run_ffmpeg(["-f", "lavfi", "-i", f"testsrc2=size={size}:rate=25", "-t", str(duration), str(path)])
+    return path
+
+
+def test_probe_reads_headers(tmp_path):
+    info = probe_video(_make_clip(tmp_path / "clip.mp4", 2))
+
+    assert (info["width"], info["height"]) == (320, 240)
+    assert info["fps"] == 25
+    assert info["codec"] == "h264"
+
+
+def test_probe_rejects_short_sources(tmp_path):
+    with pytest.raises(VideoProbeError):
+        probe_video(_make_clip(tmp_path / "clip.mp4", 0.4))
+
+
+def test_select_rendition_prefers_smallest_covering_crop():
+    renditions = [
+        {"url": "4k", "width": 3840, "height": 2160, "quality": "hd"},
+        {"url": "1080p", "width": 1920, "height": 1080, "quality": "hd"},
+        {"url": "portrait", "width": 1080, "height": 1920, "quality": "hd"},
+        {"url": "720p", "width": 1280, "height": 720, "quality": "sd"},
+    ]
+
+    # A 16:9 source needs 3414x1920 to crop 1080x1920 without upscaling
+    assert select_rendition(renditions[:2] + renditions[3:], (1080, 1920))["url"] == "4k"
+    assert select_rendition(renditions, (1080, 1920))["url"] == "portrait"
+    # Nothing covers: take the largest known rendition
+    assert select_rendition(renditions[1:2] + renditions[3:], (1080, 1920))["url"] == "1080p"
+
+
+def test_select_rendition_without_dimensions_keeps_order():
+    renditions = [{"url": "download"}, {"url": "standard"}]
+
+    assert select_rendition(renditions, (1080, 1920))["url"] == "download"
+    assert select_rendition([], (1080, 1920)) is None
+
+
+def test_rank_by_crop_efficiency_prefers_portrait_sources():
+    assert crop_efficiency(1080, 1920, (1080, 1920)) == pytest.approx(1.0)
+    assert crop_efficiency(1920, 1080, (1080, 1920)) == pytest.approx(0.316, abs=0.001)
+
+    hits = [
+        {"id": "landscape", "width": 3840, "height": 2160},
+        {"id": "unknown"},
+        {"id": "small-portrait", "width": 720, "height": 1280},
+        {"id": "portrait", "width": 1080, "height": 1920},
+    ]
+    ranked = rank_by_crop_efficiency(hits, lambda h: (h.get("width"), h.get("height")), (1080, 1920))
+
+    # A covering source outranks a better-shaped one that would need upscaling
+    assert [hit["id"] for _, hit in ranked] == ["portrait", "landscape", "small-portrait", "unknown"]
+
+
+def test_rank_by_crop_efficiency_prefers_covering_landscape_to_upscaled_portrait():
+    hits = [
+        {"id": "tiny-portrait", "width": 360, "height": 640},
+        {"id": "landscape", "width": 3840, "height": 2160},
+    ]
+    ranked = rank_by_crop_efficiency(hits, lambda h: (h["width"], h["height"]), (1080, 1920))
+
+    assert crop_efficiency(360, 640, (1080, 1920)) == pytest.approx(1.0)
+    assert [hit["id"] for _, hit in ranked] == ["landscape", "tiny-portrait"]
+
+
+def test_generate_videos_renders_batch_from_one_background(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    generator = VideoGenerator(cache_dir=tmp_path / "cache")
+    generator.target_size = (180, 320)
+    generator.target_duration = 2
+    url = "https://example.com/clip.mp4"
+    generator.clip_cache.put(url, _make_clip(tmp_path / "source.mp4", 1.5))
+
+    items = [("First quote", "A", None), ("Second quote", "B", None), ("Third quote", "C", None)]
+    outputs = generator.generate_videos(items, url, outputs_per_process=2)
+
+    assert all(outputs) and len(set(outputs)) == 3
+    for output in outputs:
+        info = probe_video(Path(output), min_size=0)
+        assert (info["width"], info["height"]) == (180, 320)
+        assert info["duration"] == pytest.approx(2, abs=0.1)
+
+
+def test_generate_video_formats_renders_each_aspect_ratio(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    generator = VideoGenerator(cache_dir=tmp_path / "cache")
+    generator.OUTPUT_FORMATS = {"9:16": (180, 320), "1:1": (240, 240), "16:9": (320, 180)}
+    generator.target_size = (180, 320)
+    generator.target_duration = 2
+    url = "https://example.com/clip.mp4"
+    generator.clip_cache.put(url, _make_clip(tmp_path / "source.mp4", 3))
+
+    generator.memory_budget = MemoryBudget(1 << 40)
+    reservations = []
+    reserve = generator.memory_budget.reserve
+    monkeypatch.setattr(generator.memory_budget, "reserve", lambda size: reservations.append(size) or reserve(size))
+
+    outputs = generator.generate_video_formats("Quote", "Author", url)
+
+    assert set(outputs) == {"9:16", "1:1", "16:9"}
+    for name, output in outputs.items():
+        info = probe_video(Path(output), min_size=0)
+        assert (info["width"], info["height"]) == generator.OUTPUT_FORMATS[name]
+        # Each format gets its own poster, split off in the same ffmpeg process
+        poster = thumbnail_paths(Path(output))["poster"]
+        assert Image.open(poster).size == generator.OUTPUT_FORMATS[name]
+
+    stats = generator.last_render_stats
+    assert stats["formats"] == 3 and stats["peak_rss_bytes"] > 0
+    assert stats["thumbnails"] == {name: ["poster", "sprite", "sprite_vtt"] for name in outputs}
+    # One reservation covers every format's frames and encoder
+    assert reservations == [stats["estimated_bytes"]]
+
+
+def test_draft_preview_then_approve(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    generator = VideoGenerator(cache_dir=tmp_path / "cache", render_engine="ffmpeg")
+    generator.target_size = (180, 320)
+    generator.target_duration = 2
+    url = "https://example.com/clip.mp4"
+    generator.clip_cache.put(url, _make_clip(tmp_path / "source.mp4", 3))
+
+    draft = generator.generate_preview("Quote", "Author", url)
+    preview = probe_video(Path(draft["preview_path"]), min_size=0)
+    assert (preview["width"], preview["height"]) == (90, 160)
+    assert preview["fps"] == generator.preview_fps
+    assert generator.drafts.get(draft["id"])["status"] == "preview"
+
+    output = generator.approve_draft(draft["id"])
+    final = probe_video(Path(output), min_size=0)
+    assert (final["width"], final["height"]) == (180, 320)
+    assert generator.drafts.get(draft["id"])["status"] == "done"
+    stats = generator.drafts.get(draft["id"])["render_stats"]
+    assert stats["peak_rss_bytes"] > 0 and stats["rss_scope"] == "process"
+    # Approving again returns the same render
+    assert generator.approve_draft(draft["id"]) == output
+
+    assert generator.discard_draft(draft["id"])
+    assert generator.drafts.get(draft["id"]) is None
+    assert not Path(draft["preview_path"]).exists()
+
+
+class _StubTTS:
+    def __init__(self, generate_voice):
+        self.generate_voice = generate_voice
+
+
+def test_prepare_inputs_runs_stages_concurrently(tmp_path, monkeypatch):
+    generator = VideoGenerator(cache_dir=tmp_path / "cache")
+    # Every stage waits for the other two; run one after another, the barrier would time out
+    barrier = threading.Barrier(3, timeout=5)
+    source = tmp_path / "source.mp4"
+
+    def download(url, cancel_event=None):
+        barrier.wait()
+        return source
+
+    monkeypatch.setattr(generator, "_download_video", download)
+    monkeypatch.setattr(generator, "_get_overlay", lambda quote, author: barrier.wait())
+    monkeypatch.setattr("services.video_generator.TTSClient", lambda: _StubTTS(lambda *args: barrier.wait()))
+    monkeypatch.setattr("services.video_generator.probe_video", lambda path, min_duration: {
+        "width": 320, "height": 240, "fps": 25, "duration": 3, "codec": "h264"
+    })
+
+    timings = {}
+    path, info = generator._prepare_inputs(
+        "Quote", "Author", "https://example.com/clip.mp4", "voice", tmp_path / "a.mp3", timings
+    )
+
+    assert path == source and info["duration"] == 3
+    assert {"fetch", "overlay", "tts", "prepare"} <= set(timings)
+
+
+def test_prepare_inputs_cancels_fetch_when_tts_fails(tmp_path, monkeypatch):
+    generator = VideoGenerator(cache_dir=tmp_path / "cache")
+    cancelled = []
+
+    def download(url, cancel_event=None):
+        cancelled.append(cancel_event.wait(5))
+        raise RuntimeError("download cancelled")
+
+    def fail_tts(*args):
+        raise RuntimeError("TTS service unavailable")
+
+    monkeypatch.setattr(generator, "_download_video", download)
+    monkeypatch.setattr(generator, "_get_overlay", lambda quote, author: None)
+    monkeypatch.setattr("services.video_generator.TTSClient", lambda: _StubTTS(fail_tts))
+
+    with pytest.raises(RuntimeError, match="TTS service unavailable"):
+        generator._prepare_inputs("Quote", "Author", "https://example.com/clip.mp4", "voice", tmp_path / "a.mp3", {})
+    assert cancelled == [True]
+
+
+def test_frame_ring_replays_loops_from_memory_within_budget():
+    decoded = []
+
+    def frame_function(t):
+        decoded.append(t)
+        return np.full((2, 2, 3), int(t * 10), dtype=np.uint8)
+
+    # 10 frames of 12 bytes each; room for 4
+    ring = FrameRing(frame_function, fps=10, duration=1.0, max_bytes=48)
+    for i in range(30):
+        frame = ring.get_frame(i / 10)
+        assert frame[0, 0, 0] == i % 10
+
+    stats = ring.stats()
+    assert stats["frames"] == 4
+    # First pass decodes everything; later passes decode only the 6 uncached frames
+    assert len(decoded) == 10 + 2 * 6
+    assert stats["hits"] == 2 * 4
+    assert not ring.get_frame(0).flags.writeable
+
+
+def test_looped_clip_maps_time_modulo_source_duration(tmp_path):
+    from moviepy import VideoFileClip
+
+    source = VideoFileClip(str(_make_clip(tmp_path / "clip.mp4", 1)), audio=False)
+    looped = LoopedClip(source, duration=3.5)
+    try:
+        assert looped.duration == 3.5
+        assert np.array_equal(looped.get_frame(0.2), looped.get_frame(2.2))
+        assert looped.ring.stats()["hits"] == 1
+    finally:
+        looped.close()
+
+
+def test_render_plan_goes_tight_when_budget_is_short(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    source_info = {"width": 3840, "height": 2160, "duration": 4, "fps": 30}
+
+    roomy = VideoGenerator(cache_dir=tmp_path / "cache", memory_budget_mb=64 * 1024)
+    assert not roomy._plan_render_memory(source_info, "moviepy")["tight"]
+
+    tight = VideoGenerator(cache_dir=tmp_path / "cache", memory_budget_mb=400)
+    with tight.memory_budget.reserve(200 * 1024 * 1024):
+        plan = tight._plan_render_memory(source_info, "moviepy")
+    assert plan["tight"]
+    assert (plan["decoder_threads"], plan["encoder_threads"]) == (1, 2)
+    assert plan["loop_cache_bytes"] < tight.loop_frame_cache_mb * 1024 * 1024
+
+
+def test_segment_bounds_cover_every_frame_once():
+    bounds = segment_bounds(450, 4)
+
+    assert bounds == [(0, 112), (112, 113), (225, 112), (337, 113)]
+    assert segment_bounds(3, 8) == [(0, 1), (1, 1), (2, 1)]
+
+
+@pytest.mark.parametrize("engine", ["ffmpeg", "moviepy", "pipeline"])
+def test_segmented_render_joins_segments_without_gaps(tmp_path, monkeypatch, engine):
+    monkeypatch.chdir(tmp_path)
+    generator = VideoGenerator(cache_dir=tmp_path / "cache", render_engine=engine, render_segments=3)
+    generator.target_size = (180, 320)
+    generator.target_duration = 2
+    source = _make_clip(tmp_path / "source.mp4", 3)
+    audio = tmp_path / "voice.mp3"
+    run_ffmpeg(["-f", "lavfi", "-i", "sine=duration=2", str(audio)])
+    output = tmp_path / "out.mp4"
+
+    try:
+        stats = generator._render_within_budget(
+            "Quote", "Author", source, probe_video(source), audio, output, engine
+        )
+    finally:
+        generator.segmented_renderer.close()
+
+    assert stats["segments"] == 3
+    assert stats["thumbnails"] == ["poster", "sprite", "sprite_vtt"]
+    info = probe_video(output, min_size=0)
+    assert info["duration"] == pytest.approx(2, abs=0.05)
+    run_ffmpeg(["-xerror", "-i", str(output), "-f", "null", "-"])
+
+
+def test_background_segmented_renders_share_one_process_pool(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    generator = VideoGenerator(cache_dir=tmp_path / "cache", render_engine="moviepy", render_segments=2)
+    generator.target_size = (180, 320)
+    generator.target_duration = 1
+    source = _make_clip(tmp_path / "source.mp4", 2)
+    pools = []
+    monkeypatch.setattr(
+        "services.segmented.ProcessPoolExecutor",
+        lambda *args, **kwargs: pools.append(ProcessPoolExecutor(*args, **kwargs)) or pools[-1]
+    )
+    concats = []
+    concat_segments = FFmpegRenderer.concat_segments
+    monkeypatch.setattr(
+        FFmpegRenderer, "concat_segments", lambda self, *args: concats.append(self) or concat_segments(self, *args)
+    )
+
+    try:
+        generator._render_within_budget(
+            "Quote", "Author", source, probe_video(source), None, tmp_path / "first.mp4", "moviepy"
+        )
+        generator._render_within_budget(
+            "Quote", "Author", source, probe_video(source), None, tmp_path / "second.mp4", "moviepy",
+            renderer=generator.background_renderer
+        )
+        assert len(pools) == 1 and generator.segmented_renderer._pool is pools[0]
+        assert concats == [generator.ffmpeg_renderer, generator.background_renderer]
+    finally:
+        generator.shutdown(wait=True)
+
+    assert generator.segmented_renderer._pool is None
+
+
+def test_frame_pipeline_reuses_buffers_for_strided_crop(tmp_path):
+    # 320x240 decodes at 427x320, so the 180px-wide crop is a strided view that gets packed
+    source = _make_clip(tmp_path / "source.mp4", 1)
+    rgba = np.zeros((40, 100, 4), dtype=np.uint8)
+    rgba[10:30, 10:90] = 255
+    overlay = QuoteOverlay("key", rgba, frame_size=(180, 320))
+    output = tmp_path / "out.mp4"
+
+    stats = FramePipeline().render(
+        source, (320, 240), overlay, None, output, (180, 320), fps=25, duration=2, loop=True, trace_allocations=True
+    )
+
+    assert stats["frames"] == 50
+    # Only queue bookkeeping is allocated per frame, no frame or overlay-region arrays
+    assert stats["alloc_bytes_per_frame_max"] < 4096
+    info = probe_video(output, min_size=0)
+    assert (info["width"], info["height"]) == (180, 320)
+    assert info["duration"] == pytest.approx(2, abs=0.05)
+    run_ffmpeg(["-xerror", "-i", str(output), "-f", "null", "-"])
+
+
+def test_frame_pipeline_drains_a_verbose_encoder(tmp_path, monkeypatch):
+    # The encoder logs far more than a pipe buffer holds before reading any frame, then fails
+    verbose_encoder = [
+        sys.executable, "-c",
+        "import sys\n"
+        "for i in range(20000): sys.stderr.write(f'warning {i}: {\"x\" * 40}\\n')\n"
+        "sys.stderr.flush(); sys.stdin.buffer.read(); sys.exit(1)"
+    ]
+    monkeypatch.setattr(
+        "services.frame_pipeline.ffmpeg_command",
+        lambda args: verbose_encoder if args[args.index("-i") + 1] == "-" else ffmpeg_command(args)
+    )
+    source = _make_clip(tmp_path / "source.mp4", 1)
+    overlay = QuoteOverlay("key", np.zeros((40, 100, 4), dtype=np.uint8), frame_size=(180, 320))
+
+    with pytest.raises(FFmpegError, match="warning 19999:"):
+        FramePipeline().render(source, (320, 240), overlay, None, tmp_path / "out.mp4", (180, 320), fps=25, duration=1)
+
+
+def test_pipeline_engine_renders_with_audio(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    generator = VideoGenerator(cache_dir=tmp_path / "cache", render_engine="pipeline")
+    generator.target_size = (180, 320)
+    generator.target_duration = 2
+    source = _make_clip(tmp_path / "source.mp4", 3)
+    audio = tmp_path / "voice.mp3"
+    run_ffmpeg(["-f", "lavfi", "-i", "sine=duration=2", str(audio)])
+    output = tmp_path / "out.mp4"
+
+    stats = generator._render_within_budget("Quote", "Author", source, probe_video(source), audio, output, "pipeline")
+
+    assert stats["render_engine"] == "pipeline"
+    info = probe_video(output, min_size=0)
+    assert (info["width"], info["height"]) == (180, 320)
+    assert info["duration"] == pytest.approx(2, abs=0.05)
+    assert ffmpeg_parse_infos(str(output))["audio_found"]
+
+
+def test_rendered_outputs_are_faststart(tmp_path):
+    background = _make_clip(tmp_path / "source.mp4", 1)
+    overlay = tmp_path / "overlay.png"
+    Image.new("RGBA", (40, 20), (255, 255, 255, 255)).save(overlay)
+    output = tmp_path / "out.mp4"
+
+    FFmpegRenderer().render(background, overlay, None, output, target_size=(180, 320), fps=25, duration=1)
+
+    # The moov atom precedes the media data, so playback can start from the first bytes
+    data = output.read_bytes()
+    assert 0 <= data.find(b"moov") < data.find(b"mdat")
+
+
+def test_ladder_sizes_keep_aspect_and_skip_upscales():
+    assert ladder_sizes((1080, 1920), (360, 720, 1080, 1440)) == [
+        ("360p", 360, 640), ("720p", 720, 1280), ("1080p", 1080, 1920)
+    ]
+    assert ladder_sizes((1920, 1080), (360,)) == [("360p", 640, 360)]
+    assert ladder_sizes((180, 320), (360, 720)) == [("180p", 180, 320)]
+
+
+def test_hls_packager_writes_ladder_with_audio(tmp_path):
+    video = tmp_path / "reel.mp4"
+    run_ffmpeg([
+        "-f", "lavfi", "-i", "testsrc2=size=180x320:rate=25",
+        "-f", "lavfi", "-i", "sine=duration=3",
+        "-t", "3", str(video)
+    ])
+    packager = HLSPackager(tmp_path / "hls", ladder=(90, 180), segment_seconds=1)
+
+    master = packager.package(video)
+
+    assert master == packager.lookup(video)
+    playlist = master.read_text()
+    assert "RESOLUTION=90x160" in playlist and "RESOLUTION=180x320" in playlist
+    assert "mp4a" in playlist
+    media = (master.parent / "180p" / "index.m3u8").read_text()
+    assert "#EXT-X-ENDLIST" in media
+    assert len(list((master.parent / "90p").glob("segment_*.ts"))) == 3
+    # Only the finished ladder is left behind
+    assert [path.name for path in (tmp_path / "hls").iterdir()] == ["reel"]
+
+
+@pytest.mark.parametrize("engine", ["moviepy", "ffmpeg", "pipeline"])
+def test_render_captures_poster_and_sprite(tmp_path, monkeypatch, engine):
+    monkeypatch.chdir(tmp_path)
+    generator = VideoGenerator(cache_dir=tmp_path / "cache", render_engine=engine)
+    generator.target_size = (180, 320)
+    generator.target_duration = 3
+    # A 2s source is looped, so the sprite must stop at the render's last frame
+    source = _make_clip(tmp_path / "source.mp4", 2)
+    output = tmp_path / "out.mp4"
+
+    stats = generator._render_within_budget("Quote", "Author", source, probe_video(source), None, output, engine)
+
+    assert stats["thumbnails"] == ["poster", "sprite", "sprite_vtt"]
+    paths = thumbnail_paths(output)
+    assert Image.open(paths["poster"]).size == (180, 320)
+    # 3 tiles of 108x192, one per second
+    assert Image.open(paths["sprite"]).size == (3 * 108, 192)
+    vtt = paths["sprite_vtt"].read_text()
+    assert vtt.startswith("WEBVTT")
+    assert "00:00:02.000 --> 00:00:03.000\nout.sprite.jpg#xywh=216,0,108,192" in vtt
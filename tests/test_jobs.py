@@ -0,0 +1,179 @@
+import os
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from services.jobs import JobQueue, JobQueueError, JobQueueFullError
+from services.progress import ProgressBar, emit, report_progress
+from services.workers import RenderWorkerPool, WorkerPoolError, fork_available
+
+
+@pytest.fixture
+def queue():
+    queue = JobQueue(max_workers=1)
+    yield queue
+    queue.shutdown(wait=True)
+
+
+def _wait_finished(queue, job_id):
+    after = 0
+    events = []
+    while not queue.is_finished(job_id):
+        batch = queue.wait_events(job_id, after=after, timeout=5)
+        events += batch
+        after = batch[-1]["seq"] if batch else after
+    return events + queue.wait_events(job_id, after=after, timeout=0)
+
+
+def test_job_reports_progress_and_result_in_order(queue):
+    def render(name):
+        emit("Finding background video", 0, 1)
+        with ProgressBar(total=2, desc="Generating video") as pbar:
+            pbar.update(1)
+            pbar.update(1)
+        return {"video_path": f"{name}.mp4"}
+
+    job = queue.submit("render", render, "quote")
+    assert job["status"] in ("queued", "running")
+
+    events = _wait_finished(queue, job["id"])
+
+    assert [event["seq"] for event in events] == list(range(1, len(events) + 1))
+    assert events[0]["data"] == {"status": "queued"}
+    assert events[1]["data"] == {"status": "running"}
+    progress = [(e["data"]["stage"], e["data"]["n"]) for e in events if e["event"] == "progress"]
+    assert progress[0] == ("Finding background video", 0)
+    assert progress[-1] == ("Generating video", 2)
+    assert events[-1]["data"] == {"status": "done", "result": {"video_path": "quote.mp4"}}
+
+    finished = queue.get(job["id"])
+    assert finished["result"] == {"video_path": "quote.mp4"}
+    assert finished["progress"] == {"stage": "Generating video", "n": 2, "total": 2}
+    assert queue.stats()["done"] == 1
+
+
+def test_failed_job_records_error_and_events_resume_after_sequence(queue):
+    release = threading.Event()
+
+    def render():
+        release.wait(5)
+        raise RuntimeError("Failed to find matching video")
+
+    job = queue.submit("render", render)
+    # A second job waits for the single worker
+    queued = queue.submit("render", lambda: {})
+    assert queue.get(queued["id"])["status"] == "queued"
+    release.set()
+
+    events = _wait_finished(queue, job["id"])
+    assert events[-1]["data"] == {"status": "failed", "error": "Failed to find matching video"}
+    assert queue.get(job["id"])["error"] == "Failed to find matching video"
+    assert queue.wait_events(job["id"], after=events[-2]["seq"], timeout=0) == events[-1:]
+
+    with pytest.raises(JobQueueError):
+        queue.wait_events("missing", timeout=0)
+
+
+def test_full_queue_rejects_jobs_with_retry_after():
+    queue = JobQueue(max_workers=1, max_queue=1)
+    release = threading.Event()
+    try:
+        queue.submit("render", release.wait, 5)
+        queued = queue.submit("render", lambda: {})
+        with pytest.raises(JobQueueFullError) as error:
+            queue.submit("render", lambda: {})
+        assert error.value.retry_after >= 1
+
+        stats = queue.stats()
+        assert stats["queue_depth"] == 1 and stats["max_queue"] == 1
+        assert stats["running"] + stats["queued"] == 2
+        assert stats["estimated_wait_seconds"] > 0
+
+        time.sleep(0.05)
+        release.set()
+        _wait_finished(queue, queued["id"])
+        assert queue.stats()["wait_seconds_mean"] > 0
+    finally:
+        release.set()
+        queue.shutdown(wait=True)
+
+
+def test_same_key_shares_unfinished_job(queue):
+    release = threading.Event()
+    calls = []
+
+    def render():
+        calls.append(1)
+        release.wait(5)
+        return {"video_path": "quote.mp4"}
+
+    first = queue.submit("render", render, key="quote")
+    second = queue.submit("render", render, key="quote")
+    assert second["id"] == first["id"] and second["requests"] == 2
+    assert queue.submit("render", lambda: {}, key="other")["id"] != first["id"]
+
+    release.set()
+    _wait_finished(queue, first["id"])
+    assert calls == [1]
+    # A finished job no longer absorbs new submissions
+    assert queue.submit("render", render, key="quote")["id"] != first["id"]
+
+
+def _render_in_worker(name):
+    emit("Generating video", 1, 2)
+    return {"video_path": f"{name}.mp4", "pid": os.getpid()}
+
+
+def _crash_worker():
+    os._exit(1)
+
+
+def _worker_pid():
+    return os.getpid()
+
+
+def _flood_progress_then_die():
+    for n in range(2000):
+        emit("Generating video", n, 2000)
+    os.kill(os.getpid(), signal.SIGKILL)
+
+
+@pytest.mark.skipif(not fork_available(), reason="needs the fork start method")
+def test_worker_pool_survives_workers_killed_idle_or_mid_message():
+    pool = RenderWorkerPool(workers=1)
+    calls = ThreadPoolExecutor(max_workers=1)
+    try:
+        # Killed while idle, waiting for a call
+        os.kill(calls.submit(pool.run, _worker_pid).result(timeout=10), signal.SIGKILL)
+        assert calls.submit(pool.run, _render_in_worker, "after idle").result(timeout=10)["video_path"] == "after idle.mp4"
+
+        # Killed while streaming progress back
+        with pytest.raises(WorkerPoolError):
+            calls.submit(pool.run, _flood_progress_then_die).result(timeout=10)
+        assert calls.submit(pool.run, _render_in_worker, "after flood").result(timeout=10)["video_path"] == "after flood.mp4"
+    finally:
+        calls.shutdown()
+        pool.shutdown(wait=True)
+
+
+@pytest.mark.skipif(not fork_available(), reason="needs the fork start method")
+def test_worker_pool_runs_in_warm_processes_and_relays_progress():
+    pool = RenderWorkerPool(workers=1, warm_up=lambda: None)
+    progress = []
+    try:
+        with report_progress(lambda stage, n, total: progress.append((stage, n, total))):
+            result = pool.run(_render_in_worker, "quote")
+        assert result["video_path"] == "quote.mp4"
+        assert result["pid"] != os.getpid()
+
+        # A crashed worker fails only its own job and is replaced
+        with pytest.raises(WorkerPoolError):
+            pool.run(_crash_worker)
+        assert pool.run(_render_in_worker, "again")["video_path"] == "again.mp4"
+    finally:
+        pool.shutdown(wait=True)
+
+    assert progress == [("Generating video", 1, 2)]
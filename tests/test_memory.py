@@ -0,0 +1,81 @@
+import multiprocessing
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from services.memory import MemoryBudget, MemoryBudgetError, RSSMonitor, estimate_render_bytes
+
+
+def test_budget_blocks_until_reservation_fits():
+    budget = MemoryBudget(100)
+    order = []
+
+    def second():
+        with budget.reserve(60):
+            order.append("second")
+
+    with budget.reserve(60):
+        thread = threading.Thread(target=second)
+        thread.start()
+        time.sleep(0.1)
+        order.append("first done")
+    thread.join(timeout=5)
+
+    assert order == ["first done", "second"]
+    assert budget.available() == 100
+
+
+def test_budget_admits_oversized_render_alone_and_times_out():
+    budget = MemoryBudget(100)
+    with budget.reserve(500):
+        assert budget.available() == 0
+        with pytest.raises(MemoryBudgetError):
+            with budget.reserve(1, timeout=0.05):
+                pass
+
+
+def test_estimate_grows_with_source_resolution_and_threads():
+    small = estimate_render_bytes((1920, 1080), (1080, 1920), "ffmpeg", decoder_threads=1, encoder_threads=2)
+    uhd = estimate_render_bytes((3840, 2160), (1080, 1920), "ffmpeg", decoder_threads=1, encoder_threads=2)
+    threaded = estimate_render_bytes((3840, 2160), (1080, 1920), "ffmpeg", decoder_threads=16, encoder_threads=16)
+
+    assert small < uhd < threaded
+
+
+def test_rss_monitor_includes_child_processes():
+    allocate = "b = bytearray(200 * 1024 * 1024); import time; time.sleep(0.6)"
+    with RSSMonitor(interval=0.05) as rss:
+        subprocess.run([sys.executable, "-c", allocate], check=True)
+
+    assert rss.peak_bytes > 200 * 1024 * 1024
+
+
+def test_budget_is_shared_with_forked_processes():
+    budget = MemoryBudget(100)
+    context = multiprocessing.get_context("fork")
+    reserved = context.Event()
+
+    def hold():
+        with budget.reserve(70):
+            reserved.set()
+            time.sleep(60)
+
+    child = context.Process(target=hold, daemon=True)
+    child.start()
+    try:
+        assert reserved.wait(5)
+        assert budget.available() == 30
+        with pytest.raises(MemoryBudgetError):
+            with budget.reserve(50, timeout=0.05):
+                pass
+    finally:
+        child.kill()
+        child.join()
+
+    # A worker that died mid-render no longer holds its reservation once released
+    assert budget.release_process(child.pid) == 70
+    with budget.reserve(100, timeout=1):
+        assert budget.available() == 0
@@ -0,0 +1,47 @@
+import time
+
+from services.result_cache import ResultCache
+
+
+def test_result_cache_keys_normalized_inputs_and_requires_output_files(tmp_path):
+    cache = ResultCache(tmp_path / "results")
+    video = tmp_path / "quote_video.mp4"
+    video.write_bytes(b"video")
+
+    key = ResultCache.key(quote="Be yourself", author="Oscar Wilde", settings={"fps": 30})
+    assert key == ResultCache.key(quote="  Be   yourself ", author="Oscar Wilde\n", settings={"fps": 30})
+    assert key != ResultCache.key(quote="Be yourself", author="Oscar Wilde", settings={"fps": 15})
+
+    cache.put(key, {"video_path": video.name}, [video])
+    assert cache.get(key) == {"video_path": video.name}
+    assert ResultCache(tmp_path / "results").get(key) == {"video_path": video.name}
+
+    video.unlink()
+    assert cache.get(key) is None
+    assert not list((tmp_path / "results").glob("*.json"))
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_result_cache_entries_expire_after_ttl(tmp_path):
+    cache = ResultCache(tmp_path / "results", ttl=0.05)
+    video = tmp_path / "quote_video.mp4"
+    video.write_bytes(b"video")
+    key = ResultCache.key(quote="q", author="a")
+
+    cache.put(key, {"video_path": video.name}, [video])
+    assert cache.get(key) is not None
+    time.sleep(0.1)
+    assert cache.get(key) is None
+    assert video.exists()
+
+
+def test_result_cache_drops_malformed_entries(tmp_path):
+    cache = ResultCache(tmp_path / "results")
+    keys = [ResultCache.key(quote=str(i)) for i in range(3)]
+    (tmp_path / "results" / f"{keys[0]}.json").write_text('{"files": [], "result": {}}')
+    (tmp_path / "results" / f"{keys[1]}.json").write_text('{"created": null, "files": [], "result": {}}')
+    (tmp_path / "results" / f"{keys[2]}.json").write_text('[]')
+
+    assert [cache.get(key) for key in keys] == [None, None, None]
+    assert not list((tmp_path / "results").glob("*.json"))
+    assert cache.stats()["misses"] == 3
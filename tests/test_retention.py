@@ -0,0 +1,116 @@
+import os
+import time
+
+import pytest
+
+from services.drafts import DraftStore
+from services.leases import FileLeases, use
+from services.result_cache import ResultCache
+from services.retention import RetentionManager
+from services.video_index import VideoIndex
+
+HOUR = 3600
+
+
+def _write(path, size, age=0.0):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"x" * size)
+    mtime = time.time() - age
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+@pytest.fixture
+def dirs(tmp_path):
+    output_dir = tmp_path / "output"
+    output_dir.mkdir()
+    return {
+        "output_dir": output_dir,
+        "temp_dir": tmp_path / "temp",
+        "drafts": DraftStore(tmp_path / "cache" / "drafts"),
+        "hls_dir": output_dir / "hls",
+    }
+
+
+def test_sweep_removes_orphans_and_stale_temp_files_but_not_files_in_use(dirs, tmp_path):
+    output_dir, temp_dir = dirs["output_dir"], dirs["temp_dir"]
+    video = _write(output_dir / "quote_video_1.mp4", 100, age=2 * HOUR)
+    _write(output_dir / "quote_video_1.poster.jpg", 10, age=2 * HOUR)
+    orphan_poster = _write(output_dir / "quote_video_0.poster.jpg", 10, age=2 * HOUR)
+    orphan_ladder = _write(dirs["hls_dir"] / "quote_video_0" / "master.m3u8", 5, age=2 * HOUR)
+    os.utime(orphan_ladder.parent, (time.time() - 2 * HOUR,) * 2)
+    crashed_audio = _write(temp_dir / "temp_audio_crashed.mp3", 50, age=2 * HOUR)
+    running_audio = _write(temp_dir / "temp_audio_running.mp3", 50, age=2 * HOUR)
+    fresh_audio = _write(temp_dir / "temp_audio_fresh.mp3", 50)
+
+    retention = RetentionManager(**dirs, in_use=lambda: [running_audio])
+    report = retention.sweep()
+
+    assert not orphan_poster.exists() and not orphan_ladder.parent.exists() and not crashed_audio.exists()
+    assert video.exists() and running_audio.exists() and fresh_audio.exists()
+    assert report["temp"] == {"files": 1, "bytes": 50}
+    assert report["orphans"] == {"files": 2, "bytes": 15}
+    assert report["reclaimed_bytes"] == 65
+    assert retention.stats()["total_reclaimed_bytes"] == 65
+
+
+def test_sweep_enforces_output_budgets_and_expires_drafts(dirs, tmp_path):
+    output_dir, drafts = dirs["output_dir"], dirs["drafts"]
+    index = VideoIndex(tmp_path / "videos.db", output_dir)
+    results = ResultCache(tmp_path / "results")
+    old = _write(output_dir / "old.mp4", 400, age=48 * HOUR)
+    _write(output_dir / "old.sprite.jpg", 20, age=48 * HOUR)
+    older = _write(output_dir / "older.mp4", 400, age=72 * HOUR)
+    new = _write(output_dir / "new.mp4", 400, age=2 * HOUR)
+    recent = _write(output_dir / "recent.mp4", 400)
+    for video in (old, older, new, recent):
+        index.record(video)
+    results.put(ResultCache.key(quote="old"), {"video_path": old.name}, [old])
+
+    draft_id = drafts.new_id()
+    stale_preview = _write(output_dir / f"preview_{draft_id}.mp4", 30, age=10 * 24 * HOUR)
+    drafts.create(draft_id, quote="q", author="a", preview_path=str(stale_preview))
+    drafts.update(draft_id, created=time.time() - 10 * 24 * HOUR)
+    orphan_preview = _write(output_dir / "preview_0123abcd.mp4", 30, age=2 * HOUR)
+    for preview in (stale_preview, orphan_preview):
+        index.record(preview)
+
+    retention = RetentionManager(
+        **dirs,
+        result_cache=results,
+        video_index=index,
+        max_output_bytes=1000,
+        max_output_age=60 * HOUR
+    )
+    report = retention.sweep()
+
+    # older is past the age budget; old is the oldest left once over the size budget
+    assert not older.exists() and not old.exists() and not (output_dir / "old.sprite.jpg").exists()
+    assert new.exists() and recent.exists()
+    assert report["outputs"] == {"files": 3, "bytes": 820}
+    assert report["output_bytes"] <= 1000
+    assert {video["filename"] for video in index.query()[0]} == {"new.mp4", "recent.mp4"}
+    assert drafts.get(draft_id) is None and not stale_preview.exists() and not orphan_preview.exists()
+    assert report["caches"]["files"] == 1
+
+
+def test_leased_files_of_running_renders_survive_output_budgets(dirs, tmp_path):
+    output_dir, temp_dir = dirs["output_dir"], dirs["temp_dir"]
+    leases = FileLeases(tmp_path / "cache" / "leases")
+    rendering = _write(output_dir / "quote_video_2.mp4", 400, age=72 * HOUR)
+    poster = _write(output_dir / "quote_video_2.poster.jpg", 10, age=72 * HOUR)
+    segments = _write(output_dir / ".segments_quote_video_2.abc" / "segment_000.mp4", 10, age=2 * HOUR)
+    audio = _write(temp_dir / "temp_audio_running.mp3", 50, age=2 * HOUR)
+    finished = _write(output_dir / "quote_video_20.mp4", 400, age=72 * HOUR)
+    stale_segments = _write(output_dir / ".segments_quote_video_20.def" / "segment_000.mp4", 10, age=2 * HOUR)
+    os.utime(segments.parent, (time.time() - 2 * HOUR,) * 2)
+    os.utime(stale_segments.parent, (time.time() - 2 * HOUR,) * 2)
+
+    retention = RetentionManager(**dirs, max_output_bytes=100, max_output_age=60 * HOUR, in_use=leases.paths)
+    with leases.hold(audio):
+        use(rendering)
+        retention.sweep()
+
+    assert rendering.exists() and poster.exists() and segments.exists() and audio.exists()
+    assert not finished.exists() and not stale_segments.exists()
+    assert leases.paths() == set()
@@ -0,0 +1,93 @@
+import pytest
+
+from services.video_index import VideoIndex, VideoIndexError
+
+
+@pytest.fixture
+def index(tmp_path):
+    output_dir = tmp_path / "output"
+    output_dir.mkdir()
+    return VideoIndex(tmp_path / "videos.db", output_dir)
+
+
+def _write(index, name, size):
+    path = index.output_dir / name
+    path.write_bytes(b"x" * size)
+    return path
+
+
+def test_query_pages_with_cursor_and_filters(index):
+    for i in range(5):
+        index.record(
+            _write(index, f"video_{i}.mp4", 10 + i),
+            quote=f"Quote {i}",
+            author="Oscar Wilde" if i % 2 else "Seneca",
+            provider="pexels",
+            voice="en-US-Wavenet-D",
+            render_stats={"render_seconds": i}
+        )
+
+    page, cursor = index.query(sort="size", order="asc", limit=2)
+    assert [video["filename"] for video in page] == ["video_0.mp4", "video_1.mp4"]
+    assert page[1]["author"] == "Oscar Wilde" and page[1]["render_stats"] == {"render_seconds": 1}
+    page, cursor = index.query(sort="size", order="asc", limit=2, cursor=cursor)
+    assert [video["filename"] for video in page] == ["video_2.mp4", "video_3.mp4"]
+    page, cursor = index.query(sort="size", order="asc", limit=2, cursor=cursor)
+    assert [video["filename"] for video in page] == ["video_4.mp4"] and cursor is None
+
+    authors, _ = index.query(author="oscar wilde")
+    assert {video["filename"] for video in authors} == {"video_1.mp4", "video_3.mp4"}
+    assert index.query(provider="pixabay")[0] == []
+    assert len(index.query(since=page[0]["created"])[0]) == 1
+
+    with pytest.raises(VideoIndexError):
+        index.query(sort="created", cursor=index.query(sort="size", limit=1)[1])
+
+
+def test_reconcile_adds_untracked_files_and_drops_deleted_ones(index):
+    tracked = _write(index, "quote_video_1.mp4", 10)
+    index.record(tracked, author="Seneca", provider="coverr")
+    _write(index, "quote_video_2.mp4", 20)
+    (index.output_dir / "notes.txt").write_text("not a video")
+
+    assert index.reconcile() == {"added": 1, "removed": 0, "updated": 0}
+    tracked.unlink()
+    assert index.reconcile() == {"added": 0, "removed": 1, "updated": 0}
+
+    videos, _ = index.query()
+    assert [video["filename"] for video in videos] == ["quote_video_2.mp4"]
+    assert videos[0]["author"] is None and videos[0]["size"] == 20
+
+
+def test_reconcile_keeps_entry_recorded_during_the_pass(index, monkeypatch):
+    video = _write(index, "quote_video_1.mp4", 10)
+    worker = VideoIndex(index.db_path, index.output_dir)
+    connect = index._connect
+
+    class RacingConnection:
+        """A render worker records the video right after reconcile read the index."""
+
+        def __init__(self, conn):
+            self.conn = conn
+
+        def __enter__(self):
+            self.conn.__enter__()
+            return self
+
+        def __exit__(self, *exc_info):
+            return self.conn.__exit__(*exc_info)
+
+        def execute(self, sql, *args):
+            rows = self.conn.execute(sql, *args).fetchall()
+            if sql.startswith("SELECT filename"):
+                worker.record(video, author="Seneca")
+            return rows
+
+        def executemany(self, sql, rows):
+            return self.conn.executemany(sql, rows)
+
+    monkeypatch.setattr(index, "_connect", lambda: RacingConnection(connect()))
+    index.reconcile()
+    monkeypatch.undo()
+
+    assert index.get("quote_video_1.mp4")["author"] == "Seneca"
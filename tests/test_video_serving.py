@@ -0,0 +1,41 @@
+import pytest
+from flask import Flask
+
+from services.video_serving import send_video
+
+
+@pytest.fixture
+def client(tmp_path):
+    (tmp_path / "clip.mp4").write_bytes(bytes(range(256)) * 4)
+    app = Flask(__name__)
+
+    @app.route("/video/<path:filename>")
+    def video(filename):
+        return send_video(str(tmp_path), filename)
+
+    with app.test_client() as client:
+        yield client
+
+
+def test_send_video_answers_ranges_with_partial_content(client):
+    response = client.get("/video/clip.mp4", headers={"Range": "bytes=100-199"})
+
+    assert response.status_code == 206
+    assert response.headers["Content-Range"] == "bytes 100-199/1024"
+    assert response.data == bytes(range(100, 200))
+    assert response.headers["Accept-Ranges"] == "bytes"
+    assert response.mimetype == "video/mp4"
+
+
+def test_send_video_revalidates_with_etag_and_rejects_bad_ranges(client):
+    full = client.get("/video/clip.mp4")
+    assert full.status_code == 200
+    assert full.headers["ETag"] and full.headers["Last-Modified"]
+    assert "public" in full.headers["Cache-Control"]
+
+    assert client.get("/video/clip.mp4", headers={"If-None-Match": full.headers["ETag"]}).status_code == 304
+    # A stale If-Range validator gets the whole file rather than a mismatched slice
+    stale = client.get("/video/clip.mp4", headers={"Range": "bytes=0-9", "If-Range": '"stale"'})
+    assert stale.status_code == 200 and len(stale.data) == 1024
+    assert client.get("/video/clip.mp4", headers={"Range": "bytes=5000-"}).status_code == 416
+    assert client.get("/video/missing.mp4").status_code == 404